@@ -1,3 +1,115 @@
-from django.contrib import admin
+import json
+import logging
 
-# Register your models here.
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections, router, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .analitica import COLUMNAS_ANALITICA, FILAS_POR_LOTE, bloques_csv
+from .busqueda import construir_filtro_busqueda
+from .contribuyentes import actualizar_totales
+from .models import Recibo
+
+logger = logging.getLogger(__name__)
+
+# ADMINISTRACIÓN DE RECIBOS
+# El changelist por defecto de Django no escala con la tabla de recibos: cuenta
+# el total sin filtros en cada página, busca con icontains en todas las
+# columnas y pagina con COUNT(*) exacto. Aquí:
+#   - Sin conteo total (show_full_result_count) ni facetas.
+#   - Búsqueda con los mismos filtros indexables del dashboard (busqueda.py).
+#   - Paginador con conteo estimado por el planificador en PostgreSQL.
+#   - Acciones por lote: anulación con un solo UPDATE y exportación CSV
+#     transmitida por bloques.
+
+# Por debajo de esta estimación se hace el COUNT(*) exacto (es barato y evita
+# mostrar una cifra aproximada en resultados pequeños).
+UMBRAL_CONTEO_EXACTO = 10_000
+
+
+# I. PAGINACIÓN CON CONTEO ESTIMADO
+
+def estimar_filas(queryset):
+    """
+    Filas que el planificador de PostgreSQL estima para `queryset` (EXPLAIN, sin
+    ejecutar la consulta). None en otras bases de datos o si no se pudo estimar.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    try:
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.warning(f"No se pudo estimar la cantidad de recibos: {e}")
+        return None
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginator cuyo `count` es la estimación del planificador cuando el resultado
+    es grande: las últimas páginas pueden quedar vacías o faltar, a cambio de no
+    recorrer la tabla completa en cada página del changelist.
+    """
+
+    @cached_property
+    def count(self):
+        estimado = estimar_filas(self.object_list)
+        if estimado is None or estimado < UMBRAL_CONTEO_EXACTO:
+            return super().count
+        return estimado
+
+
+# II. ACCIONES POR LOTE
+
+@admin.action(description="Anular recibos seleccionados", permissions=['change'])
+def anular_seleccionados(modeladmin, request, queryset):
+    using = router.db_for_write(Recibo)
+    vigentes = queryset.using(using).filter(anulado=False).order_by()
+    with transaction.atomic(using=using):
+        contribuyentes = set(vigentes.values_list('contribuyente_id', flat=True).distinct())
+        # QuerySet.update() registra fecha_modificacion, la secuencia de cambios y la versión de datos.
+        anulados = vigentes.update(anulado=True, fecha_anulacion=timezone.now())
+        actualizar_totales(contribuyentes, using)
+    logger.info(f"Admin: {request.user} anuló {anulados} recibos.")
+    modeladmin.message_user(request, f"{anulados} recibo(s) anulados.", messages.WARNING)
+
+
+@admin.action(description="Exportar seleccionados a CSV")
+def exportar_csv(modeladmin, request, queryset):
+    filas = queryset.order_by('pk').values_list(*COLUMNAS_ANALITICA).iterator(chunk_size=FILAS_POR_LOTE)
+    response = StreamingHttpResponse(bloques_csv(filas), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="recibos_{timezone.localdate():%Y%m%d}.csv"'
+    return response
+
+
+# III. REGISTRO
+
+@admin.register(Recibo)
+class ReciboAdmin(admin.ModelAdmin):
+    list_display = (
+        'numero_recibo', 'fecha', 'nombre', 'rif_cedula_identidad', 'estado', 'total_monto_bs', 'anulado',
+    )
+    list_display_links = ('numero_recibo',)
+    list_filter = ('anulado',)
+    list_per_page = 50
+    ordering = ('-fecha', '-numero_recibo')
+    date_hierarchy = 'fecha'
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    paginator = PaginadorEstimado
+    actions = [anular_seleccionados, exportar_csv]
+    readonly_fields = ('fecha_anulacion', 'fecha_creacion', 'fecha_modificacion')
+
+    # El cuadro de búsqueda solo aparece si hay search_fields; la búsqueda real
+    # la hace get_search_results() sobre las columnas normalizadas e indexadas.
+    search_fields = ('nombre_normalizado',)
+    search_help_text = "N° de recibo o ID exacto, cédula/RIF o inicio del nombre."
+
+    def get_search_results(self, request, queryset, search_term):
+        filtro = construir_filtro_busqueda(search_term)
+        if filtro is None:
+            return queryset, False
+        return queryset.filter(filtro), False
@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin control de admisión entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# CONTROL DE ADMISIÓN DE OPERACIONES PESADAS
+# Importaciones de Excel, ZIP/PDF masivos y reportes comparten un cupo de
+# RECIBOS_PESADAS_MAX operaciones simultáneas entre TODOS los procesos del
+# servidor (semáforo de archivos con flock, una "ranura" por operación). Si el
+# cupo está lleno la petición espera en cola hasta RECIBOS_PESADAS_ESPERA_SEGUNDOS;
+# si la cola ya está llena o se agota la espera, se rechaza. Quien espera ocupa
+# un worker síncrono, así que la cola admite RECIBOS_PESADAS_COLA_MAX peticiones
+# pero nunca tantas que las ranuras más la cola alcancen los RECIBOS_WORKERS_WEB
+# workers: siempre queda al menos uno libre para el dashboard.
+# El semáforo es local a la máquina (los archivos viven en el directorio de
+# artefactos); flock libera las ranuras automáticamente si un proceso muere.
+
+INTERVALO_SONDEO = 0.05
+
+
+class OperacionRechazada(Exception):
+    """El cupo de operaciones pesadas está lleno y no se pudo esperar turno."""
+
+    def __init__(self, tipo, estado):
+        self.tipo = tipo
+        self.estado = estado
+        super().__init__(
+            f"El servidor está ocupado: {estado['activas']}/{estado['capacidad']} operaciones "
+            f"pesadas en curso y {estado['en_cola']} en espera. Inténtelo de nuevo en unos segundos."
+        )
+
+
+def _directorio():
+    directorio = Path(settings.RECIBOS_ARTEFACTOS_DIR) / '.admision'
+    (directorio / 'cola').mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def _capacidad():
+    return max(1, settings.RECIBOS_PESADAS_MAX)
+
+
+def cola_maxima():
+    """Peticiones que pueden esperar turno: el ajuste, acotado para dejar un worker libre."""
+    return max(0, min(settings.RECIBOS_PESADAS_COLA_MAX, settings.RECIBOS_WORKERS_WEB - _capacidad() - 1))
+
+
+def _intentar_ranura(directorio, tipo):
+    """Toma la primera ranura libre sin bloquear. Retorna el archivo abierto o None."""
+    for indice in range(_capacidad()):
+        archivo = open(directorio / f'ranura-{indice}.lock', 'a+')
+        try:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            archivo.close()
+            continue
+        archivo.seek(0)
+        archivo.truncate()
+        archivo.write(json.dumps({'pid': os.getpid(), 'tipo': tipo, 'desde': time.time()}))
+        archivo.flush()
+        return archivo
+    return None
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _contar_cola(directorio):
+    """Peticiones esperando turno; se limpian las de procesos que ya no existen."""
+    en_cola = 0
+    for entrada in os.scandir(directorio / 'cola'):
+        pid = entrada.name.split('-', 1)[0]
+        if pid.isdigit() and _proceso_vivo(int(pid)):
+            en_cola += 1
+        else:
+            try:
+                os.unlink(entrada.path)
+            except FileNotFoundError:
+                pass
+    return en_cola
+
+
+def estado_admision():
+    """Ocupación actual del cupo: {'capacidad', 'activas', 'en_cola', 'cola_maxima', 'habilitado'}."""
+    capacidad = _capacidad()
+    if fcntl is None:
+        return {'capacidad': capacidad, 'activas': 0, 'en_cola': 0, 'cola_maxima': 0, 'habilitado': False}
+
+    directorio = _directorio()
+    activas = 0
+    for indice in range(capacidad):
+        ruta = directorio / f'ranura-{indice}.lock'
+        if not ruta.exists():
+            continue
+        with open(ruta, 'a+') as archivo:
+            # Una ranura tomada no admite ni siquiera un bloqueo compartido.
+            try:
+                fcntl.flock(archivo, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                activas += 1
+            else:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+
+    return {
+        'capacidad': capacidad,
+        'activas': activas,
+        'en_cola': _contar_cola(directorio),
+        'cola_maxima': cola_maxima(),
+        'habilitado': True,
+    }
+
+
+# MÉTRICAS (acumuladas por tipo de operación, compartidas entre procesos)
+
+@contextmanager
+def _metricas_bloqueadas(nombre='metricas.json'):
+    """Dict de métricas del archivo `nombre`, bajo flock; se guarda al salir del bloque."""
+    ruta = _directorio() / nombre
+    with open(ruta, 'a+') as archivo:
+        fcntl.flock(archivo, fcntl.LOCK_EX)
+        try:
+            archivo.seek(0)
+            contenido = archivo.read()
+            metricas = json.loads(contenido) if contenido else {}
+            yield metricas
+            archivo.seek(0)
+            archivo.truncate()
+            json.dump(metricas, archivo)
+            archivo.flush()
+        finally:
+            fcntl.flock(archivo, fcntl.LOCK_UN)
+
+
+def _registrar(tipo, espera, rechazada):
+    with _metricas_bloqueadas() as metricas:
+        datos = metricas.setdefault(tipo, {
+            'admitidas': 0, 'rechazadas': 0, 'encoladas': 0,
+            'espera_total_s': 0.0, 'espera_max_s': 0.0,
+        })
+        datos['rechazadas' if rechazada else 'admitidas'] += 1
+        if espera > INTERVALO_SONDEO:
+            datos['encoladas'] += 1
+        datos['espera_total_s'] = round(datos['espera_total_s'] + espera, 4)
+        datos['espera_max_s'] = round(max(datos['espera_max_s'], espera), 4)
+
+
+def metricas_admision():
+    """Métricas acumuladas por tipo: admitidas, rechazadas, encoladas y espera."""
+    if fcntl is None:
+        return {}
+    with _metricas_bloqueadas() as metricas:
+        return {tipo: dict(datos) for tipo, datos in metricas.items()}
+
+
+@contextmanager
+def operacion_pesada(tipo):
+    """
+    Ejecuta el bloque ocupando una ranura del cupo de operaciones pesadas.
+    Lanza OperacionRechazada si no hay lugar en la cola o se agota la espera.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    directorio = _directorio()
+    inicio = time.monotonic()
+    ranura = _intentar_ranura(directorio, tipo)
+
+    if ranura is None:
+        if _contar_cola(directorio) >= cola_maxima():
+            _registrar(tipo, 0.0, rechazada=True)
+            logger.warning(f"Operación pesada '{tipo}' rechazada: la cola está llena.")
+            raise OperacionRechazada(tipo, estado_admision())
+
+        turno = directorio / 'cola' / f'{os.getpid()}-{uuid.uuid4().hex}'
+        turno.touch()
+        try:
+            limite = inicio + settings.RECIBOS_PESADAS_ESPERA_SEGUNDOS
+            while ranura is None and time.monotonic() < limite:
+                time.sleep(INTERVALO_SONDEO)
+                ranura = _intentar_ranura(directorio, tipo)
+        finally:
+            turno.unlink(missing_ok=True)
+
+        if ranura is None:
+            espera = time.monotonic() - inicio
+            _registrar(tipo, espera, rechazada=True)
+            logger.warning(f"Operación pesada '{tipo}' rechazada tras esperar {espera:.1f}s.")
+            raise OperacionRechazada(tipo, estado_admision())
+
+    try:
+        espera = time.monotonic() - inicio
+        _registrar(tipo, espera, rechazada=False)
+        if espera > INTERVALO_SONDEO:
+            logger.info(f"Operación pesada '{tipo}' admitida tras {espera:.2f}s en cola.")
+
+        yield
+    finally:
+        fcntl.flock(ranura, fcntl.LOCK_UN)
+        ranura.close()
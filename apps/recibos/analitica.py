@@ -0,0 +1,154 @@
+import csv
+import io
+import logging
+from datetime import date, datetime
+
+from django.conf import settings
+
+from .admision import operacion_pesada
+from .archivo_frio import (
+    ArchivoFrioError, anios_archivados, esquema_arrow, lote_arrow, lotes_archivados, parquet_disponible,
+    _pyarrow,
+)
+from .artefactos import calcular_etag, depurar_artefactos, escribir_artefacto, recuperar_artefacto, ruta_artefacto
+from .filtros import filtrar_recibos_reporte, firma_filtros_reporte, parsear_fecha
+from .versiones import obtener_version_datos
+
+logger = logging.getLogger(__name__)
+
+# EXPORTACIÓN PARA ANÁLISIS (CSV / Parquet)
+# Datos crudos y tipados para el equipo de BI, con los mismos filtros del
+# dashboard y de los reportes. Nunca se arma un DataFrame con todo el resultado:
+#   - CSV: se transmite por bloques de filas leídas con values_list().iterator().
+#     Fechas en ISO 8601, decimales exactos (sin redondeo ni separador de miles)
+#     y booleanos como true/false.
+#   - Parquet: RecordBatches de Arrow con tipos explícitos (date32, decimal128,
+#     bool, timestamp UTC) escritos lote a lote; el archivo se guarda en el
+#     almacenamiento de artefactos y se reutiliza mientras los datos no cambien.
+# Si el período incluye años archivados, sus filas se agregan al final.
+
+COLUMNAS_ANALITICA = [
+    'id', 'numero_recibo', 'fecha', 'estado', 'nombre', 'rif_cedula_identidad',
+    'direccion_inmueble', 'ente_liquidado',
+    *[f'categoria{i}' for i in range(1, 11)],
+    'gastos_administrativos', 'tasa_dia', 'total_monto_bs',
+    'numero_transferencia', 'conciliado', 'concepto',
+    'fecha_creacion', 'fecha_modificacion',
+]
+
+# formato -> (extensión, content type)
+FORMATOS_ANALITICA = {
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+FILAS_POR_LOTE = 10_000
+
+# Filas por bloque transmitido en el CSV.
+FILAS_POR_BLOQUE_CSV = 1_000
+
+
+def etag_analitica(formato, params):
+    return calcular_etag('analitica', formato, obtener_version_datos(), firma_filtros_reporte(params))
+
+
+def verificar_fuentes(params):
+    """Lanza ArchivoFrioError si el período incluye años archivados y no hay pyarrow."""
+    fecha_inicio = parsear_fecha(params.get('fecha_inicio'))
+    fecha_fin = parsear_fecha(params.get('fecha_fin'))
+    if anios_archivados(fecha_inicio, fecha_fin) and not parquet_disponible():
+        raise ArchivoFrioError(
+            "El período incluye años archivados y leerlos requiere pyarrow (pip install pyarrow)."
+        )
+
+
+def _filas_base(params):
+    queryset, _ = filtrar_recibos_reporte(params)
+    return queryset.values_list(*COLUMNAS_ANALITICA).iterator(chunk_size=FILAS_POR_LOTE)
+
+
+# I. CSV
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'true' if valor else 'false'
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    # Decimal -> str(): conserva todos los decimales de la base.
+    return valor
+
+
+def bloques_csv(filas, columnas=COLUMNAS_ANALITICA):
+    """Bloques de texto CSV (encabezado incluido) de las tuplas `filas`, para StreamingHttpResponse."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator='\n')
+    escritor.writerow(columnas)
+    for indice, fila in enumerate(filas, start=1):
+        escritor.writerow([_valor_csv(valor) for valor in fila])
+        if indice % FILAS_POR_BLOQUE_CSV == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def filas_csv(params):
+    """Generador de bloques CSV de los recibos filtrados (y de los años archivados del período)."""
+    def fuentes():
+        yield from _filas_base(params)
+        for lote in lotes_archivados(params, COLUMNAS_ANALITICA, FILAS_POR_LOTE):
+            columnas = [lote.column(nombre).to_pylist() for nombre in COLUMNAS_ANALITICA]
+            yield from zip(*columnas)
+
+    return bloques_csv(fuentes())
+
+
+# II. PARQUET
+
+def construir_parquet(params, destino):
+    """Escribe el Parquet de los recibos filtrados en `destino`. Retorna la cantidad de filas."""
+    pa = _pyarrow()
+    esquema = esquema_arrow(COLUMNAS_ANALITICA)
+    filas = 0
+    with pa.parquet.ParquetWriter(destino, esquema, compression=settings.RECIBOS_ARCHIVO_COMPRESION) as escritor:
+        lote = []
+        for fila in _filas_base(params):
+            lote.append(fila)
+            if len(lote) == FILAS_POR_LOTE:
+                escritor.write_batch(lote_arrow(esquema, lote))
+                filas += len(lote)
+                lote = []
+        if lote:
+            escritor.write_batch(lote_arrow(esquema, lote))
+            filas += len(lote)
+
+        for lote_archivado in lotes_archivados(params, COLUMNAS_ANALITICA, FILAS_POR_LOTE):
+            escritor.write_batch(lote_archivado)
+            filas += lote_archivado.num_rows
+    return filas
+
+
+def obtener_parquet(params, etag=None):
+    """
+    Ruta del Parquet para los filtros `params`: de la caché de artefactos si los
+    datos no cambiaron, o generado dentro del cupo de operaciones pesadas.
+    """
+    etag = etag or etag_analitica('parquet', params)
+    ruta = ruta_artefacto('analitica', etag, 'parquet')
+    if recuperar_artefacto(ruta):
+        return ruta
+
+    filas = 0
+
+    def construir(destino):
+        nonlocal filas
+        filas = construir_parquet(params, destino)
+
+    with operacion_pesada('exportacion_parquet'):
+        escribir_artefacto(ruta, construir)
+    logger.info(f"Exportación Parquet generada: {filas} filas ({ruta.stat().st_size / 1024:.0f} KB).")
+
+    depurar_artefactos('analitica', settings.RECIBOS_CACHE_REPORTES_MAX_MB * 1024 * 1024, conservar=ruta)
+    return ruta
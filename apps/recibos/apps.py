@@ -3,3 +3,12 @@ from django.apps import AppConfig
 class RecibosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.recibos' 
+
+    def ready(self):
+        # Registra las señales que mantienen la versión global de los datos.
+        from . import signals  # noqa: F401
+
+        # Medición de todas las consultas para el registro de consultas lentas.
+        from django.db.backends.signals import connection_created
+        from .consultas_lentas import instalar_medicion
+        connection_created.connect(instalar_medicion, dispatch_uid='recibos_consultas_lentas')
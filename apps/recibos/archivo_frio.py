@@ -0,0 +1,429 @@
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.utils import timezone
+
+from .constants import CATEGORY_CHOICES
+from .busqueda import construir_filtro_busqueda
+from .contribuyentes import actualizar_totales
+from .filtros import campo_de_busqueda, parsear_fecha
+from .models import Recibo
+from .versiones import incrementar_version_datos
+
+logger = logging.getLogger(__name__)
+
+# ARCHIVO FRÍO DE AÑOS CERRADOS (Parquet)
+# Los recibos de años fiscales cerrados se exportan a un archivo Parquet por año
+# (comprimido, columnar, ordenado por fecha) en RECIBOS_ARCHIVO_DIR y se eliminan
+# de `recibos_pago`: la tabla y sus índices quedan con los años vivos.
+#   - El catálogo (catalogo.json) registra los años archivados; consultarlo no
+#     toca la base de datos, así que las vistas no pagan consultas extra.
+#   - Los reportes cuyo período incluye años archivados combinan las filas de la
+#     base con las del archivo (ver combinar_con_archivo).
+#   - El PDF de un recibo archivado se sigue generando por su pk.
+# pyarrow se importa solo al leer o escribir el archivo (no en el arranque).
+
+CATALOGO = 'catalogo.json'
+
+# Filas por grupo (row group) del Parquet: también es el tamaño de cada lote
+# leído de la base al archivar, así la memoria queda acotada.
+FILAS_POR_GRUPO = 50_000
+
+# Lote de ids por DELETE (por debajo del límite de parámetros de SQLite).
+IDS_POR_DELETE = 500
+
+
+class ArchivoFrioError(Exception):
+    """El archivo frío no puede leerse o escribirse (año abierto, pyarrow ausente...)."""
+
+
+def parquet_disponible():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def _pyarrow():
+    if not parquet_disponible():
+        raise ArchivoFrioError(
+            "Se requiere pyarrow para leer o escribir el archivo de años cerrados (pip install pyarrow)."
+        )
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.dataset
+    import pyarrow.parquet
+    return pyarrow
+
+
+def directorio_archivo():
+    return Path(settings.RECIBOS_ARCHIVO_DIR)
+
+
+def ruta_anio(anio):
+    return directorio_archivo() / f'recibos_{anio}.parquet'
+
+
+# I. CATÁLOGO DE AÑOS ARCHIVADOS
+
+_catalogo_cache = (None, {})
+
+
+def leer_catalogo():
+    """{anio: datos del archivo}. Se relee solo cuando cambia el archivo del catálogo."""
+    global _catalogo_cache
+    ruta = directorio_archivo() / CATALOGO
+    try:
+        firma = (str(ruta), os.stat(ruta).st_mtime_ns)
+    except FileNotFoundError:
+        return {}
+    if _catalogo_cache[0] != firma:
+        with open(ruta, encoding='utf-8') as archivo:
+            _catalogo_cache = (firma, {int(anio): datos for anio, datos in json.load(archivo).items()})
+    return _catalogo_cache[1]
+
+
+def _guardar_catalogo(catalogo):
+    directorio = directorio_archivo()
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix='.tmp-', suffix='.json')
+    with os.fdopen(descriptor, 'w', encoding='utf-8') as archivo:
+        json.dump({str(anio): datos for anio, datos in sorted(catalogo.items())}, archivo, indent=2)
+    os.replace(temporal, directorio / CATALOGO)
+
+
+def anios_archivados(fecha_inicio=None, fecha_fin=None):
+    """Años archivados que se solapan con el período [fecha_inicio, fecha_fin]."""
+    return sorted(
+        anio for anio in leer_catalogo()
+        if (fecha_inicio is None or anio >= fecha_inicio.year)
+        and (fecha_fin is None or anio <= fecha_fin.year)
+    )
+
+
+def numero_maximo_archivado():
+    """Mayor numero_recibo archivado: la numeración nueva debe continuar después."""
+    return max((datos['numero_max'] or 0 for datos in leer_catalogo().values()), default=None)
+
+
+# II. ESQUEMA: columnas de Recibo con tipos explícitos
+
+def _campos():
+    return Recibo._meta.concrete_fields
+
+
+def _tipo_arrow(pa, campo):
+    tipo = campo.get_internal_type()
+    if tipo == 'ForeignKey':
+        return _tipo_arrow(pa, campo.target_field)
+    if tipo in ('AutoField', 'BigAutoField', 'SmallAutoField') or tipo.endswith('IntegerField'):
+        return pa.int64()
+    if tipo == 'BooleanField':
+        return pa.bool_()
+    if tipo == 'DateField':
+        return pa.date32()
+    if tipo == 'DateTimeField':
+        return pa.timestamp('us', tz='UTC')
+    if tipo == 'DecimalField':
+        return pa.decimal128(campo.max_digits, campo.decimal_places)
+    return pa.string()
+
+
+def esquema_arrow(columnas=None):
+    """Esquema Arrow de todas las columnas de Recibo, o solo de `columnas` (en ese orden)."""
+    pa = _pyarrow()
+    campos = _campos() if columnas is None else [Recibo._meta.get_field(c) for c in columnas]
+    return pa.schema([pa.field(c.attname, _tipo_arrow(pa, c)) for c in campos])
+
+
+def lote_arrow(esquema, filas):
+    """RecordBatch tipado a partir de tuplas de values_list en el orden del esquema."""
+    pa = _pyarrow()
+    columnas = list(zip(*filas)) or [[] for _ in esquema]
+    return pa.record_batch(
+        [pa.array(columna, type=campo.type) for columna, campo in zip(columnas, esquema)],
+        schema=esquema,
+    )
+
+
+def _fila_a_recibo(fila):
+    """Recibo (no guardado) a partir de una fila del archivo; marcado como archivado."""
+    valores = {c.attname: fila[c.attname] for c in _campos() if fila.get(c.attname) is not None}
+    recibo = Recibo(**valores)
+    recibo.archivado = True
+    return recibo
+
+
+# III. ARCHIVAR UN AÑO
+
+def _sha256(ruta):
+    digest = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def _eliminar_filas(ids, using):
+    """DELETE por lotes de ids, sin señales por fila (la versión se invalida una vez)."""
+    tabla = connections[using].ops.quote_name(Recibo._meta.db_table)
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for i in range(0, len(ids), IDS_POR_DELETE):
+            lote = ids[i:i + IDS_POR_DELETE]
+            cursor.execute(
+                f"DELETE FROM {tabla} WHERE id IN ({', '.join(['%s'] * len(lote))})", lote
+            )
+
+
+def archivar_anio(anio, eliminar=True, using='default'):
+    """
+    Exporta los recibos de `anio` (vigentes y anulados) a Parquet, verifica el
+    archivo (filas y suma de montos) y, con `eliminar`, los borra de la tabla.
+    Si el año ya estaba archivado, las filas nuevas se agregan al archivo
+    existente. Retorna los datos del catálogo del año.
+    """
+    if anio >= date.today().year:
+        raise ArchivoFrioError(f"El año {anio} no está cerrado: solo se archivan años anteriores al actual.")
+
+    pa = _pyarrow()
+    pq, pc = pa.parquet, pa.compute
+    esquema = esquema_arrow()
+    nombres = esquema.names
+    ruta = ruta_anio(anio)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+
+    queryset = (
+        Recibo.objects.using(using)
+        .filter(fecha__gte=date(anio, 1, 1), fecha__lt=date(anio + 1, 1, 1))
+        .order_by('fecha', 'numero_recibo')
+        .values_list(*nombres)
+    )
+
+    ids_archivados, contribuyentes, filas, total = [], set(), 0, Decimal(0)
+    numeros = []
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, prefix='.tmp-', suffix='.parquet')
+    os.close(descriptor)
+    try:
+        indice_id = nombres.index('id')
+        indice_total = nombres.index('total_monto_bs')
+        indice_numero = nombres.index('numero_recibo')
+        indice_contribuyente = nombres.index('contribuyente_id')
+
+        with pq.ParquetWriter(temporal, esquema, compression=settings.RECIBOS_ARCHIVO_COMPRESION) as escritor:
+            def escribir(lote):
+                nonlocal filas, total
+                escritor.write_batch(lote_arrow(esquema, lote))
+                filas += len(lote)
+                total += sum((fila[indice_total] for fila in lote), Decimal(0))
+                numeros.extend(fila[indice_numero] for fila in lote if fila[indice_numero] is not None)
+
+            # Filas archivadas antes (importaciones tardías del mismo año); las
+            # que siguen en la base se reemplazan por su versión actual.
+            if ruta.exists():
+                calientes = set(queryset.values_list('id', flat=True).order_by())
+                for lote in pq.ParquetFile(ruta).iter_batches(batch_size=FILAS_POR_GRUPO):
+                    previas = [
+                        tuple(fila.get(n) for n in nombres)
+                        for fila in lote.to_pylist() if fila['id'] not in calientes
+                    ]
+                    if previas:
+                        escribir(previas)
+
+            lote = []
+            for fila in queryset.iterator(chunk_size=FILAS_POR_GRUPO):
+                lote.append(fila)
+                ids_archivados.append(fila[indice_id])
+                contribuyentes.add(fila[indice_contribuyente])
+                if len(lote) == FILAS_POR_GRUPO:
+                    escribir(lote)
+                    lote = []
+            if lote:
+                escribir(lote)
+
+        # Verificación antes de publicar el archivo y de borrar nada.
+        verificado = pq.read_table(temporal, columns=['total_monto_bs'])
+        suma = pc.sum(verificado['total_monto_bs']).as_py() or Decimal(0)
+        if verificado.num_rows != filas or suma != total:
+            raise ArchivoFrioError(
+                f"Verificación fallida del año {anio}: {verificado.num_rows}/{filas} filas, {suma}/{total} Bs."
+            )
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+
+    catalogo = dict(leer_catalogo())
+    catalogo[anio] = {
+        'archivo': ruta.name,
+        'filas': filas,
+        'total_monto_bs': str(total),
+        'numero_min': min(numeros, default=None),
+        'numero_max': max(numeros, default=None),
+        'sha256': _sha256(ruta),
+        'archivado_en': timezone.now().isoformat(),
+    }
+    _guardar_catalogo(catalogo)
+
+    if eliminar and ids_archivados:
+        _eliminar_filas(ids_archivados, using)
+        # Los totales de cada contribuyente cuentan solo los recibos de la base.
+        actualizar_totales(contribuyentes, using)
+        incrementar_version_datos()
+    logger.info(
+        f"Año {anio} archivado en {ruta.name}: {filas} filas ({len(ids_archivados)} desde la base"
+        f"{', eliminadas' if eliminar else ''})."
+    )
+    return catalogo[anio]
+
+
+# IV. LECTURA: PDF unitario y reportes
+
+def _dataset(anios):
+    pa = _pyarrow()
+    rutas = [str(ruta_anio(anio)) for anio in anios]
+    # El esquema actual permite leer archivos de versiones anteriores del
+    # modelo: las columnas que no existían se leen como nulas.
+    return pa.dataset.dataset(rutas, format='parquet', schema=esquema_arrow())
+
+
+def recibo_archivado(pk):
+    """Recibo archivado con esa pk, o None. Usa las estadísticas de cada grupo para saltar archivos."""
+    anios = anios_archivados()
+    if not anios:
+        return None
+    pa = _pyarrow()
+    tabla = _dataset(anios).to_table(filter=pa.compute.field('id') == int(pk))
+    filas = tabla.to_pylist()
+    return _fila_a_recibo(filas[0]) if filas else None
+
+
+def _expresion_filtros(pc, params, fecha_inicio, fecha_fin):
+    """Los mismos filtros de filtrar_recibos_reporte, como expresión de pyarrow."""
+    expresion = ~pc.field('anulado')
+
+    estado = params.get('estado')
+    if estado:
+        expresion &= pc.utf8_upper(pc.field('estado')) == estado.upper()
+    if fecha_inicio:
+        expresion &= pc.field('fecha') >= fecha_inicio
+    if fecha_fin:
+        expresion &= pc.field('fecha') <= fecha_fin
+
+    categorias = [codigo for codigo, _ in CATEGORY_CHOICES if params.get(codigo) == 'on']
+    if categorias:
+        filtro_categorias = pc.field(categorias[0])
+        for codigo in categorias[1:]:
+            filtro_categorias |= pc.field(codigo)
+        expresion &= filtro_categorias
+
+    filtro_busqueda = construir_filtro_busqueda(params.get('q'), campo_de_busqueda(params.get('field', '')))
+    if filtro_busqueda is not None:
+        expresion &= _q_a_expresion(pc, filtro_busqueda)
+    return expresion
+
+
+def _columna_busqueda(pc, nombre):
+    # Los archivos escritos antes de las columnas normalizadas las leen como
+    # nulas: se aproximan desde la columna original (sin quitar acentos).
+    if nombre == 'nombre_normalizado':
+        return pc.coalesce(pc.field(nombre), pc.utf8_upper(pc.field('nombre')))
+    if nombre == 'rif_normalizado':
+        rif = pc.utf8_upper(pc.field('rif_cedula_identidad'))
+        return pc.coalesce(pc.field(nombre), pc.replace_substring_regex(rif, pattern='[^0-9A-Z]', replacement=''))
+    return pc.field(nombre)
+
+
+def _q_a_expresion(pc, q):
+    """Traduce el Q de construir_filtro_busqueda() a una expresión de pyarrow."""
+    pa = _pyarrow()
+    partes = []
+    for hijo in q.children:
+        if isinstance(hijo, models.Q):
+            partes.append(_q_a_expresion(pc, hijo))
+            continue
+        consulta, valor = hijo
+        nombre, _, lookup = consulta.partition('__')
+        columna = _columna_busqueda(pc, 'id' if nombre == 'pk' else nombre)
+        if lookup in ('', 'exact'):
+            parte = columna == valor
+        elif lookup == 'in':
+            tipo = _tipo_arrow(pa, Recibo._meta.get_field(nombre))
+            parte = pc.is_in(columna, value_set=pa.array(valor, type=tipo))
+        elif lookup in ('startswith', 'prefijo'):
+            parte = pc.starts_with(columna, pattern=valor)
+        elif lookup == 'icontains':
+            if not isinstance(Recibo._meta.get_field(nombre), (models.CharField, models.TextField)):
+                columna = pc.cast(columna, 'string')
+            parte = pc.match_substring(columna, valor, ignore_case=True)
+        else:
+            raise ValueError(f"Búsqueda no soportada en el archivo frío: {consulta}")
+        partes.append(pc.coalesce(parte, False))
+
+    if not partes:
+        # Q() sin condiciones: no filtra.
+        return pc.scalar(True)
+    expresion = partes[0]
+    for parte in partes[1:]:
+        expresion = (expresion | parte) if q.connector == models.Q.OR else (expresion & parte)
+    return ~expresion if q.negated else expresion
+
+
+def lotes_archivados(params, columnas, filas_por_lote=FILAS_POR_GRUPO):
+    """
+    RecordBatches (solo `columnas`) de los recibos vigentes archivados que
+    cumplen los filtros `params`. No importa pyarrow si no hay años archivados
+    en el período.
+    """
+    fecha_inicio = parsear_fecha(params.get('fecha_inicio'))
+    fecha_fin = parsear_fecha(params.get('fecha_fin'))
+    anios = anios_archivados(fecha_inicio, fecha_fin)
+    if not anios:
+        return
+
+    pa = _pyarrow()
+    yield from _dataset(anios).to_batches(
+        columns=columnas,
+        filter=_expresion_filtros(pa.compute, params, fecha_inicio, fecha_fin),
+        batch_size=filas_por_lote,
+    )
+
+
+def recibos_archivados(params):
+    """Recibos vigentes archivados que cumplen los filtros del reporte `params`."""
+    fecha_inicio = parsear_fecha(params.get('fecha_inicio'))
+    fecha_fin = parsear_fecha(params.get('fecha_fin'))
+    anios = anios_archivados(fecha_inicio, fecha_fin)
+    if not anios:
+        return []
+
+    pa = _pyarrow()
+    tabla = _dataset(anios).to_table(filter=_expresion_filtros(pa.compute, params, fecha_inicio, fecha_fin))
+    return [_fila_a_recibo(fila) for fila in tabla.to_pylist()]
+
+
+def combinar_con_archivo(recibos_filtrados, params):
+    """
+    Si el período del reporte incluye años archivados, retorna una lista con los
+    recibos de la base y los del archivo, en el orden del reporte (-fecha,
+    -numero_recibo). Si no, retorna el queryset sin tocarlo.
+    """
+    fecha_inicio = parsear_fecha(params.get('fecha_inicio'))
+    fecha_fin = parsear_fecha(params.get('fecha_fin'))
+    if not anios_archivados(fecha_inicio, fecha_fin):
+        return recibos_filtrados
+
+    calientes = list(recibos_filtrados)
+    ids_calientes = {recibo.pk for recibo in calientes}
+    # Un recibo todavía en la base (archivado sin eliminar) se toma de la base.
+    archivados = [r for r in recibos_archivados(params) if r.pk not in ids_calientes]
+    return sorted(
+        calientes + archivados,
+        key=lambda recibo: (recibo.fecha, recibo.numero_recibo or 0),
+        reverse=True,
+    )
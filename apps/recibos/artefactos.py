@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+# Almacenamiento gestionado de los archivos generados (PDF de recibos, reportes).
+# Los archivos se escriben una vez en RECIBOS_ARTEFACTOS_DIR y se entregan:
+#   - 'django'      -> FileResponse (streaming desde disco, sin copiar a memoria)
+#   - 'x-accel'     -> nginx sirve el archivo vía X-Accel-Redirect
+#   - 'x-sendfile'  -> Apache (mod_xsendfile) / lighttpd vía X-Sendfile
+# Cada respuesta lleva ETag (y Last-Modified cuando se conoce) para que las
+# descargas repetidas se resuelvan con un 304 sin regenerar nada.
+
+# Incrementar al cambiar el diseño de los PDF o del Excel: invalida los ETag y
+# los archivos almacenados de versiones anteriores.
+VERSION_ARTEFACTOS = 1
+
+CONTENT_TYPE_PDF = 'application/pdf'
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CONTENT_TYPE_ZIP = 'application/zip'
+
+# Tamaño de cada bloque al transmitir un archivo desde Python.
+TAMANO_BLOQUE = 64 * 1024
+
+
+def calcular_etag(*partes):
+    """ETag estable a partir de las partes que determinan el contenido del archivo."""
+    firma = '|'.join(str(parte) for parte in (VERSION_ARTEFACTOS, *partes))
+    return hashlib.sha256(firma.encode()).hexdigest()[:32]
+
+
+def directorio_artefactos():
+    return Path(settings.RECIBOS_ARTEFACTOS_DIR)
+
+
+def ruta_artefacto(tipo, etag, extension):
+    """Ruta del archivo para un ETag dentro del subdirectorio `tipo` (recibos, reportes...)."""
+    return directorio_artefactos() / tipo / f'{etag}.{extension}'
+
+
+def respuesta_condicional(request, etag, ultima_modificacion=None):
+    """
+    Retorna un 304 (Not Modified) si el navegador ya tiene esta versión del
+    archivo (If-None-Match / If-Modified-Since), o None si hay que entregarlo.
+    """
+    response = get_conditional_response(
+        request,
+        etag=quote_etag(etag),
+        last_modified=int(ultima_modificacion) if ultima_modificacion else None,
+    )
+    if response is not None:
+        # El 304 debe repetir los validadores del recurso.
+        response['ETag'] = quote_etag(etag)
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def escribir_artefacto(ruta, construir):
+    """
+    Llama a `construir(ruta_temporal)` para generar el archivo y lo publica con un
+    rename atómico: otra petición nunca ve (ni sirve) un archivo a medio escribir.
+    """
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    # Se conserva la extensión: algunos motores (pandas/xlsxwriter) la validan.
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, prefix='.tmp-', suffix=ruta.suffix)
+    os.close(descriptor)
+    try:
+        construir(temporal)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+    return ruta
+
+
+def recuperar_artefacto(ruta):
+    """
+    Retorna True si el archivo ya está almacenado y marca su último acceso
+    (atime) para la expulsión LRU. El mtime no se toca: es su Last-Modified.
+    """
+    try:
+        estado = os.stat(ruta)
+        os.utime(ruta, (time.time(), estado.st_mtime))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def depurar_artefactos(tipo, limite_bytes, conservar=None):
+    """
+    Expulsa los archivos de `tipo` usados hace más tiempo (LRU por atime) hasta
+    que el total quede bajo `limite_bytes`. `conservar` nunca se elimina (el
+    archivo que se acaba de generar). Retorna (archivos_eliminados, bytes_liberados).
+    """
+    directorio = directorio_artefactos() / tipo
+    archivos = []
+    total = 0
+    for entrada in os.scandir(directorio) if directorio.exists() else ():
+        # Los temporales ('.tmp-*') pertenecen a una escritura en curso.
+        if not entrada.is_file() or entrada.name.startswith('.tmp-'):
+            continue
+        estado = entrada.stat()
+        archivos.append((estado.st_atime, estado.st_size, entrada.path))
+        total += estado.st_size
+
+    eliminados, liberados = 0, 0
+    conservar = str(conservar) if conservar else None
+    for _, tamano, ruta in sorted(archivos):
+        if total <= limite_bytes:
+            break
+        if ruta == conservar:
+            continue
+        try:
+            os.unlink(ruta)
+        except FileNotFoundError:
+            pass
+        total -= tamano
+        eliminados += 1
+        liberados += tamano
+
+    return eliminados, liberados
+
+
+async def iterar_archivo(ruta, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Iterador asíncrono sobre un archivo: cada lectura corre en el ejecutor por
+    defecto del event loop, así el loop de ASGI nunca se bloquea en disco.
+    """
+    loop = asyncio.get_running_loop()
+    archivo = await loop.run_in_executor(None, open, ruta, 'rb')
+    try:
+        while True:
+            bloque = await loop.run_in_executor(None, archivo.read, tamano_bloque)
+            if not bloque:
+                break
+            yield bloque
+    finally:
+        archivo.close()
+
+
+def servir_artefacto(ruta, nombre_descarga, content_type, etag, ultima_modificacion=None, asincrono=False):
+    """
+    Entrega un archivo almacenado según RECIBOS_ENTREGA_ARTEFACTOS. Con
+    `asincrono=True` (vistas ASGI) la entrega directa usa un iterador asíncrono.
+    """
+    modo = settings.RECIBOS_ENTREGA_ARTEFACTOS
+
+    if modo == 'x-accel':
+        relativa = Path(ruta).relative_to(directorio_artefactos()).as_posix()
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{settings.RECIBOS_ARTEFACTOS_URL_INTERNA.rstrip('/')}/{relativa}"
+    elif modo == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = str(ruta)
+    elif asincrono:
+        response = StreamingHttpResponse(iterar_archivo(ruta), content_type=content_type)
+        response['Content-Length'] = os.path.getsize(ruta)
+    else:
+        response = FileResponse(open(ruta, 'rb'), content_type=content_type)
+
+    response['Content-Disposition'] = f'attachment; filename="{nombre_descarga}"'
+    response['ETag'] = quote_etag(etag)
+    if ultima_modificacion:
+        response['Last-Modified'] = http_date(ultima_modificacion)
+    # Obliga al navegador a revalidar (y recibir un 304) en cada descarga.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,162 @@
+import re
+from django.db.models import Q
+from django.db.models.lookups import StartsWith
+from unidecode import unidecode
+
+# Prefijos válidos de RIF/Cédula en Venezuela (V: venezolano, E: extranjero,
+# J: jurídico, G: gobierno, P: pasaporte, C: comunal).
+PREFIJOS_RIF = ('V', 'E', 'J', 'G', 'P', 'C')
+
+# Letra de prefijo seguida de dígitos, admitiendo separadores: "V-12.345.678", "j 30123456-7"
+PATRON_RIF = re.compile(r'^[VEJGPC][\s.\-]*\d[\d\s.\-]*$', re.IGNORECASE)
+
+# Un número de cédula suele tener al menos 6 dígitos; por debajo de eso solo se
+# interpreta como número de recibo o ID.
+DIGITOS_MINIMOS_CEDULA = 6
+
+# Columnas del selector de búsqueda del dashboard (parámetro `field`). Cualquier
+# otro valor busca en todos los campos.
+CAMPOS_BUSQUEDA = ('nombre', 'rif_cedula_identidad', 'numero_recibo', 'numero_transferencia', 'estado')
+
+# Filas por lote al rellenar las columnas normalizadas de los recibos existentes.
+FILAS_POR_LOTE_NORMALIZACION = 2_000
+
+
+# I. NORMALIZACIÓN (columnas nombre_normalizado y rif_normalizado)
+# Las búsquedas comparan contra columnas "sombra" ya normalizadas e indexadas,
+# en lugar de aplicar icontains/iexact sobre el valor tal como se guardó. El
+# modelo las mantiene en save(); quien use bulk_create debe llamar a
+# Recibo.actualizar_campos_busqueda() antes de insertar.
+
+def normalizar_texto(texto):
+    """Sin acentos, en mayúsculas, sin signos de puntuación y con espacios simples."""
+    texto = unidecode(texto or '').upper()
+    return ' '.join(re.sub(r'[^\w\s]', ' ', texto).split())
+
+
+def normalizar_rif(texto):
+    """RIF/Cédula sin acentos, separadores ni signos: "v-12.345.678" -> "V12345678"."""
+    return re.sub(r'[^0-9A-Z]', '', unidecode(texto or '').upper())
+
+
+def rellenar_campos_busqueda(modelo, using='default', lote=FILAS_POR_LOTE_NORMALIZACION, progreso=None):
+    """
+    Recalcula nombre_normalizado y rif_normalizado de todos los recibos de
+    `modelo` (el modelo real o el histórico de una migración), por lotes de
+    `lote` ids en orden. Solo actualiza las filas que cambian. Retorna la
+    cantidad de filas actualizadas.
+    """
+    ultimo_id, actualizadas = 0, 0
+    while True:
+        filas = list(
+            modelo.objects.using(using).filter(pk__gt=ultimo_id).order_by('pk')
+            .values_list('pk', 'nombre', 'rif_cedula_identidad', 'nombre_normalizado', 'rif_normalizado')[:lote]
+        )
+        if not filas:
+            return actualizadas
+
+        cambios = []
+        for pk, nombre, rif, nombre_actual, rif_actual in filas:
+            nombre_normalizado, rif_normalizado = normalizar_texto(nombre), normalizar_rif(rif)
+            if (nombre_normalizado, rif_normalizado) != (nombre_actual, rif_actual):
+                cambios.append(modelo(pk=pk, nombre_normalizado=nombre_normalizado, rif_normalizado=rif_normalizado))
+        if cambios:
+            modelo.objects.using(using).bulk_update(cambios, ['nombre_normalizado', 'rif_normalizado'])
+        actualizadas += len(cambios)
+        ultimo_id = filas[-1][0]
+        if progreso:
+            progreso(ultimo_id, actualizadas)
+
+
+# II. TRADUCCIÓN DE LA BÚSQUEDA A FILTROS INDEXABLES
+
+class Prefijo(StartsWith):
+    """
+    `campo__prefijo='ABC'`: prefijo exacto (sensible a mayúsculas) que la base de
+    datos resuelve con el índice de la columna. En PostgreSQL es el mismo LIKE
+    'ABC%' de startswith (índice *_like); en SQLite, donde LIKE ignora mayúsculas
+    y no usa índices, se traduce a GLOB 'ABC*'. Se registra solo en las columnas
+    normalizadas del modelo.
+    """
+    lookup_name = 'prefijo'
+
+    def as_sqlite(self, compiler, connection):
+        if not isinstance(self.rhs, str):
+            return super().as_sql(compiler, connection)
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        patron = re.sub(r'([*?\[])', r'[\1]', self.rhs) + '*'
+        return f'{lhs} GLOB %s', (*lhs_params, patron)
+
+
+def construir_filtro_busqueda(texto, campo=None):
+    """
+    Traduce el texto de búsqueda a un filtro que la base de datos pueda resolver
+    con índices, en lugar de `icontains` sobre todas las columnas.
+
+    Sin `campo` (o 'todos'), según la forma del texto:
+    - Numérico  -> numero_recibo o pk exactos (índice único / PK) y, si parece una
+                   cédula, RIF exacto con cualquier prefijo (índice de rif_normalizado).
+    - Tipo RIF  -> prefijo sobre rif_normalizado.
+    - Texto     -> prefijo sobre nombre_normalizado (sin acentos ni mayúsculas) o
+                   estado exacto (se guarda sin acentos y en mayúsculas).
+    En todos los casos, además, prefijo sobre numero_transferencia (en mayúsculas).
+
+    Con `campo` (selector del dashboard) se busca solo en ese campo, también por
+    igualdad o prefijo. Retorna None si el texto está vacío.
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return None
+
+    if campo and campo != 'todos':
+        return _filtro_por_campo(campo, texto)
+
+    transferencia = Q(numero_transferencia__prefijo=texto.upper())
+
+    if texto.isdigit():
+        numero = int(texto)
+        filtro = Q(numero_recibo=numero) | Q(pk=numero)
+        if len(texto) >= DIGITOS_MINIMOS_CEDULA:
+            filtro |= Q(rif_normalizado__in=[texto] + [f'{p}{texto}' for p in PREFIJOS_RIF])
+        return filtro | transferencia
+
+    if PATRON_RIF.match(texto):
+        return Q(rif_normalizado__prefijo=normalizar_rif(texto)) | transferencia
+
+    return Q(nombre_normalizado__prefijo=normalizar_texto(texto)) | Q(estado=_normalizar_estado(texto)) | transferencia
+
+
+def _normalizar_estado(texto):
+    """Como lo guardan el formulario y el importador: sin acentos y en mayúsculas."""
+    return unidecode(texto.strip()).upper()
+
+
+def _filtro_por_campo(campo, texto):
+    if campo == 'nombre':
+        return Q(nombre_normalizado__prefijo=normalizar_texto(texto))
+    if campo == 'rif_cedula_identidad':
+        return Q(rif_normalizado__prefijo=normalizar_rif(texto))
+    if campo == 'numero_recibo':
+        return Q(numero_recibo=int(texto)) if texto.isdigit() else Q(pk__in=[])
+    if campo == 'numero_transferencia':
+        # El formulario y el importador la guardan en mayúsculas.
+        return Q(numero_transferencia__prefijo=texto.upper())
+    if campo == 'estado':
+        return Q(estado=_normalizar_estado(texto))
+    raise ValueError(f"Campo de búsqueda no permitido: {campo}")
+
+
+def construir_filtro_contribuyentes(texto):
+    """
+    Filtro de Contribuyente para el texto buscado, con los mismos criterios que
+    los recibos: cédula numérica por igualdad con cualquier prefijo, RIF por
+    prefijo y nombre por prefijo. Retorna None si el texto está vacío.
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return None
+    if texto.isdigit():
+        return Q(rif_normalizado__in=[texto] + [f'{p}{texto}' for p in PREFIJOS_RIF])
+    if PATRON_RIF.match(texto):
+        return Q(rif_normalizado__prefijo=normalizar_rif(texto))
+    return Q(nombre_normalizado__prefijo=normalizar_texto(texto))
@@ -0,0 +1,64 @@
+import logging
+
+from django.conf import settings
+
+from .admision import operacion_pesada
+from .archivo_frio import combinar_con_archivo
+from .artefactos import (
+    CONTENT_TYPE_PDF, CONTENT_TYPE_XLSX, calcular_etag, depurar_artefactos,
+    escribir_artefacto, recuperar_artefacto, ruta_artefacto,
+)
+from .filtros import filtrar_recibos_reporte, firma_filtros_reporte
+from .versiones import obtener_version_datos
+
+logger = logging.getLogger(__name__)
+
+# Caché de reportes generados: cada archivo se identifica por la firma
+# normalizada de sus filtros + la versión global de los datos, así que una
+# petición idéntica (o equivalente) se sirve desde disco sin consultar ni
+# renderizar. Cualquier alta, modificación o anulación cambia la versión y las
+# entradas viejas dejan de usarse hasta que el LRU las expulsa.
+
+# acción -> (extensión, content type, prefijo del nombre de descarga)
+FORMATOS_REPORTE = {
+    'excel': ('xlsx', CONTENT_TYPE_XLSX, 'Reporte_Recibos_Masivo'),
+    'pdf': ('pdf', CONTENT_TYPE_PDF, 'Reporte_Recibos_PDF'),
+}
+
+
+def etag_reporte(accion, params):
+    """ETag (y clave de caché) del reporte `accion` para los filtros `params`."""
+    return calcular_etag('reporte', accion, obtener_version_datos(), firma_filtros_reporte(params))
+
+
+def obtener_reporte(accion, params, etag=None):
+    """
+    Retorna (ruta, recibos_filtrados). Si el reporte ya estaba en caché no se
+    toca la base de datos y recibos_filtrados es None; si no, se genera (dentro
+    del cupo de operaciones pesadas, puede lanzar OperacionRechazada), se
+    almacena y se aplica el límite de tamaño de la caché.
+    """
+    etag = etag or etag_reporte(accion, params)
+    extension = FORMATOS_REPORTE[accion][0]
+    ruta = ruta_artefacto('reportes', etag, extension)
+
+    if recuperar_artefacto(ruta):
+        return ruta, None
+
+    # Importación perezosa: pandas/reportlab solo en un fallo de caché.
+    from .reportes import construir_pdf_reporte, construir_reporte_excel
+    construir = construir_reporte_excel if accion == 'excel' else construir_pdf_reporte
+
+    recibos_filtrados, filtros_aplicados = filtrar_recibos_reporte(params)
+    # Si el período incluye años archivados, se suman las filas del archivo frío.
+    recibos_filtrados = combinar_con_archivo(recibos_filtrados, params)
+    with operacion_pesada(f'reporte_{accion}'):
+        escribir_artefacto(ruta, lambda destino: construir(recibos_filtrados, filtros_aplicados, destino))
+
+    eliminados, liberados = depurar_artefactos(
+        'reportes', settings.RECIBOS_CACHE_REPORTES_MAX_MB * 1024 * 1024, conservar=ruta
+    )
+    if eliminados:
+        logger.info(f"Caché de reportes: {eliminados} archivo(s) expulsado(s), {liberados / 1024:.0f} KB liberados.")
+
+    return ruta, recibos_filtrados
@@ -0,0 +1,92 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Q
+
+from .analitica import COLUMNAS_ANALITICA
+from .models import Recibo, SecuenciaCambios
+
+# FUENTE DE CAMBIOS (sincronización incremental)
+# Cada alta, modificación o anulación toma un número de SecuenciaCambios
+# (save(), QuerySet.update() y el importador): en PostgreSQL, el id de la
+# transacción que escribe. Solo se entregan los números por debajo del de la
+# transacción abierta más antigua, así un cambio que se confirma tarde nunca
+# queda detrás de un cursor ya entregado. Un sistema externo guarda el
+# cursor "secuencia-id" de su última lectura y pide solo lo posterior:
+#   GET /recibos/cambios/?desde=<cursor>
+# La respuesta es NDJSON: una línea por recibo (estado actual completo, en orden
+# de cambio) y una línea final con el cursor para la próxima lectura. Se lee por
+# lotes con keyset sobre el índice (secuencia_cambio, id): el costo depende de
+# los cambios, no del tamaño de la tabla.
+# Las eliminaciones físicas (purga y archivo de años cerrados) no aparecen.
+
+COLUMNAS_CAMBIOS = ['secuencia_cambio', *COLUMNAS_ANALITICA, 'anulado', 'fecha_anulacion']
+
+CURSOR_INICIAL = '0-0'
+
+# Filas por consulta al recorrer los cambios.
+FILAS_POR_LOTE_CAMBIOS = 1_000
+
+# Máximo de filas por respuesta; el cliente sigue con el cursor de la línea final.
+LIMITE_CAMBIOS = 50_000
+
+
+def parsear_cursor(texto):
+    """(secuencia, id) a partir de "secuencia-id". Lanza ValueError si no es válido."""
+    secuencia, separador, ultimo_id = (texto or CURSOR_INICIAL).partition('-')
+    if not separador or not secuencia.isdigit() or not ultimo_id.isdigit():
+        raise ValueError(f"Cursor inválido: '{texto}'. Formato esperado: secuencia-id (por ejemplo {CURSOR_INICIAL}).")
+    return int(secuencia), int(ultimo_id)
+
+
+def formatear_cursor(secuencia, ultimo_id):
+    return f'{secuencia}-{ultimo_id}'
+
+
+def lotes_cambios(cursor, limite=LIMITE_CAMBIOS, lote=FILAS_POR_LOTE_CAMBIOS):
+    """Genera listas de dicts (COLUMNAS_CAMBIOS) posteriores a `cursor`, en orden de cambio."""
+    secuencia, ultimo_id = cursor
+    recibos = Recibo.objects.all()
+    # Límite tomado una sola vez y en la misma base que lee las filas (réplica o primaria).
+    confirmado = SecuenciaCambios.limite_confirmado(recibos.db)
+    if confirmado is not None:
+        recibos = recibos.filter(secuencia_cambio__lt=confirmado)
+    pendientes = limite
+    while pendientes > 0:
+        filas = list(
+            recibos
+            .filter(Q(secuencia_cambio__gt=secuencia) | Q(secuencia_cambio=secuencia, id__gt=ultimo_id))
+            .order_by('secuencia_cambio', 'id')
+            .values(*COLUMNAS_CAMBIOS)[:min(lote, pendientes)]
+        )
+        if not filas:
+            return
+        yield filas
+        secuencia, ultimo_id = filas[-1]['secuencia_cambio'], filas[-1]['id']
+        pendientes -= len(filas)
+        if len(filas) < lote:
+            return
+
+
+def _valor_json(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def lineas_cambios(cursor, limite=LIMITE_CAMBIOS):
+    """
+    Líneas NDJSON para StreamingHttpResponse: los recibos cambiados y, al final,
+    {"cursor": ..., "filas": n, "completo": bool}. Con "completo": false quedan
+    más cambios; se piden con el cursor recibido.
+    """
+    filas = 0
+    siguiente = cursor
+    for lote in lotes_cambios(cursor, limite):
+        yield ''.join(json.dumps(fila, default=_valor_json, ensure_ascii=False) + '\n' for fila in lote)
+        filas += len(lote)
+        siguiente = (lote[-1]['secuencia_cambio'], lote[-1]['id'])
+    yield json.dumps({'cursor': formatear_cursor(*siguiente), 'filas': filas, 'completo': filas < limite}) + '\n'
@@ -0,0 +1,252 @@
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+import time
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# REGISTRO DE CONSULTAS LENTAS
+# Todas las conexiones pasan por medir_consulta() (execute_wrapper, instalado al
+# abrir cada conexión desde apps.py). Las consultas que superan
+# RECIBOS_CONSULTAS_LENTAS_MS se encolan con la vista que las originó
+# (OrigenConsultasMiddleware) y un hilo en segundo plano:
+#   1. Obtiene el plan en otra conexión: EXPLAIN en PostgreSQL (plan estimado;
+#      con RECIBOS_CONSULTAS_LENTAS_EXPLAIN='analyze', EXPLAIN (ANALYZE,
+#      BUFFERS)) o EXPLAIN QUERY PLAN en SQLite. Solo para SELECT con FROM.
+#      ANALYZE ejecuta la consulta de nuevo: con FOR UPDATE/SHARE o funciones
+#      con efectos (pg_advisory_lock, nextval, ...) se usa EXPLAIN sin ANALYZE.
+#   2. Escribe una línea JSON en RECIBOS_CONSULTAS_LENTAS_ARCHIVO (rotativo).
+# La petición solo paga la medición y el encolado. Si la cola está llena, el
+# registro se descarta. El comando `consultas_lentas` resume el archivo.
+
+# Registros pendientes de EXPLAIN/escritura; por encima se descartan.
+COLA_MAXIMA = 200
+
+# Tope de tiempo del EXPLAIN ANALYZE (PostgreSQL).
+TIEMPO_MAXIMO_EXPLAIN_MS = 30_000
+
+# Largo máximo del SQL y de cada parámetro guardados en el archivo.
+LARGO_MAXIMO_SQL = 10_000
+LARGO_MAXIMO_PARAMETRO = 200
+
+# Funciones que bloquean, escriben o consumen secuencias: la consulta no se re-ejecuta.
+PATRON_EFECTOS = re.compile(
+    r'\b(?:pg_(?:try_)?advisory\w*|nextval|setval|pg_notify|pg_sleep\w*|set_config|'
+    r'pg_cancel_backend|pg_terminate_backend|lo_\w+|dblink\w*|pg_current_xact_id|txid_current)\s*\(',
+    re.IGNORECASE,
+)
+PATRON_BLOQUEO = re.compile(r'\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE|KEY\s+SHARE)\b', re.IGNORECASE)
+
+_origen = contextvars.ContextVar('origen_consulta', default=None)
+_local = threading.local()  # _local.ignorar: el hilo de EXPLAIN no se mide a sí mismo
+_cola = queue.Queue(maxsize=COLA_MAXIMA)
+_estado = {'hilo': None, 'descartadas': 0, 'manejador': None}
+_candado = threading.Lock()
+
+
+# I. MEDICIÓN (execute_wrapper)
+
+def medir_consulta(execute, sql, params, many, context):
+    if getattr(_local, 'ignorar', False):
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        umbral = settings.RECIBOS_CONSULTAS_LENTAS_MS
+        if umbral and ms >= umbral:
+            _encolar({
+                'momento': timezone.now().isoformat(timespec='milliseconds'),
+                'ms': round(ms, 2),
+                'alias': context['connection'].alias,
+                'origen': _origen.get() or '-',
+                'sql': sql,
+                'parametros': None if many else _parametros(params),
+                'many': many,
+                '_params': None if many else params,  # para el EXPLAIN; no se escribe
+            })
+
+
+def instalar_medicion(sender, connection, **kwargs):
+    """Receptor de connection_created: agrega medir_consulta() a la conexión nueva."""
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+def _parametros(params):
+    if params is None:
+        return None
+    valores = params.values() if isinstance(params, dict) else params
+    return [repr(valor)[:LARGO_MAXIMO_PARAMETRO] for valor in valores]
+
+
+class OrigenConsultasMiddleware:
+    """Asocia las consultas de cada petición con el nombre de la vista (ej: recibos:dashboard)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _origen.set(f'{request.method} {request.path}')
+        try:
+            return self.get_response(request)
+        finally:
+            _origen.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        coincidencia = request.resolver_match
+        _origen.set(coincidencia.view_name if coincidencia else view_func.__qualname__)
+
+
+# II. EXPLAIN Y ESCRITURA EN SEGUNDO PLANO
+
+def _encolar(registro):
+    try:
+        _cola.put_nowait(registro)
+    except queue.Full:
+        with _candado:
+            _estado['descartadas'] += 1
+        return
+    with _candado:
+        if _estado['hilo'] is None or not _estado['hilo'].is_alive():
+            _estado['hilo'] = threading.Thread(target=_trabajar, name='consultas-lentas', daemon=True)
+            _estado['hilo'].start()
+
+
+def _trabajar():
+    _local.ignorar = True
+    while True:
+        registro = _cola.get()
+        try:
+            try:
+                registro['plan'] = _obtener_plan(registro)
+            except Exception as e:
+                registro['plan'] = f"(no se pudo obtener el plan: {e})"
+            _escribir(registro)
+        except Exception as e:
+            logger.warning(f"No se pudo registrar una consulta lenta: {e}")
+        finally:
+            # Los EXPLAIN son ocasionales: no se mantiene una conexión abierta.
+            connections.close_all()
+            _cola.task_done()
+
+
+def _es_select(sql):
+    """SELECT que lee alguna tabla (sin FROM, como SELECT pg_advisory_xact_lock(...), no hay plan útil)."""
+    return sql.lstrip()[:6].upper() == 'SELECT' and re.search(r'\bFROM\b', sql, re.IGNORECASE) is not None
+
+
+def _admite_analyze(sql):
+    """True si re-ejecutar `sql` con EXPLAIN ANALYZE no tiene efectos (bloqueos, escrituras)."""
+    return _es_select(sql) and not PATRON_BLOQUEO.search(sql) and not PATRON_EFECTOS.search(sql)
+
+
+def _obtener_plan(registro):
+    modo = settings.RECIBOS_CONSULTAS_LENTAS_EXPLAIN
+    parametros = registro.pop('_params', None)
+    if not modo or registro['many'] or not _es_select(registro['sql']):
+        return None
+    conexion = connections[registro['alias']]
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'postgresql':
+            opciones = '(ANALYZE, BUFFERS)' if modo == 'analyze' and _admite_analyze(registro['sql']) else ''
+            cursor.execute(f"SET statement_timeout = {TIEMPO_MAXIMO_EXPLAIN_MS}")
+            cursor.execute(f"EXPLAIN {opciones} {registro['sql']}", parametros)
+            return '\n'.join(fila[0] for fila in cursor.fetchall())
+        if conexion.vendor == 'sqlite':
+            cursor.execute(f"EXPLAIN QUERY PLAN {registro['sql']}", parametros)
+            return '\n'.join(str(fila[-1]) for fila in cursor.fetchall())
+    return None
+
+
+def _manejador():
+    ruta = settings.RECIBOS_CONSULTAS_LENTAS_ARCHIVO
+    manejador = _estado['manejador']
+    if manejador is None or manejador.baseFilename != os.path.abspath(ruta):
+        if manejador is not None:
+            manejador.close()
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        manejador = logging.handlers.RotatingFileHandler(
+            ruta, maxBytes=settings.RECIBOS_CONSULTAS_LENTAS_MAX_MB * 1024 * 1024,
+            backupCount=settings.RECIBOS_CONSULTAS_LENTAS_RESPALDOS, encoding='utf-8',
+        )
+        _estado['manejador'] = manejador
+    return manejador
+
+
+def _escribir(registro):
+    registro.pop('_params', None)
+    linea = json.dumps({**registro, 'sql': registro['sql'][:LARGO_MAXIMO_SQL]}, ensure_ascii=False)
+    _manejador().emit(logging.makeLogRecord({'msg': linea}))
+
+
+def esperar_registros():
+    """Espera a que se escriban los registros encolados (tests y comandos)."""
+    _cola.join()
+
+
+def consultas_descartadas():
+    return _estado['descartadas']
+
+
+# III. LECTURA Y RESUMEN (comando consultas_lentas)
+
+def archivos_registro():
+    """El archivo actual y sus respaldos rotados existentes, del más antiguo al más nuevo."""
+    ruta = settings.RECIBOS_CONSULTAS_LENTAS_ARCHIVO
+    candidatos = [f'{ruta}.{n}' for n in range(settings.RECIBOS_CONSULTAS_LENTAS_RESPALDOS, 0, -1)] + [ruta]
+    return [candidato for candidato in candidatos if os.path.exists(candidato)]
+
+
+def leer_registros(desde=None):
+    """Registros de todos los archivos; con `desde` (datetime aware), solo los posteriores."""
+    desde = desde.astimezone(dt_timezone.utc).isoformat() if desde else None
+    for ruta in archivos_registro():
+        with open(ruta, encoding='utf-8') as archivo:
+            for linea in archivo:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    continue
+                if desde and registro['momento'] < desde:
+                    continue
+                yield registro
+
+
+def huella_sql(sql):
+    """SQL sin espacios repetidos y con las listas IN (%s, %s, ...) colapsadas."""
+    sql = re.sub(r'\s+', ' ', sql).strip()
+    return re.sub(r'IN \((?:%s, )*%s\)', 'IN (...)', sql)
+
+
+def resumir(registros):
+    """
+    Agrupa los registros por huella del SQL. Lista de dicts (huella, veces,
+    total_ms, max_ms, origenes, plan de la ejecución más lenta) ordenada por
+    tiempo total.
+    """
+    grupos = {}
+    for registro in registros:
+        huella = huella_sql(registro['sql'])
+        grupo = grupos.setdefault(huella, {
+            'huella': huella, 'veces': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'origenes': {}, 'plan': None,
+        })
+        grupo['veces'] += 1
+        grupo['total_ms'] += registro['ms']
+        grupo['origenes'][registro['origen']] = grupo['origenes'].get(registro['origen'], 0) + 1
+        if registro['ms'] >= grupo['max_ms']:
+            grupo['max_ms'] = registro['ms']
+            grupo['plan'] = registro.get('plan') or grupo['plan']
+    return sorted(grupos.values(), key=lambda grupo: grupo['total_ms'], reverse=True)
@@ -0,0 +1,150 @@
+import logging
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Contribuyente, Recibo
+
+logger = logging.getLogger(__name__)
+
+# CONTRIBUYENTES (pagadores identificados por RIF)
+# Cada recibo apunta a su contribuyente (Recibo.contribuyente), que guarda los
+# datos más recientes del pagador y los totales de sus recibos vigentes:
+#   - save()/delete() de un recibo: las señales recalculan solo los
+#     contribuyentes afectados (el anterior y el nuevo si cambió el RIF).
+#   - Cargas masivas (importador, datos de prueba): upsert en lote de los
+#     contribuyentes antes del bulk_create y un recálculo por lote de ids.
+#   - Archivo y purga: se recalculan los contribuyentes de las filas borradas.
+# El recálculo lee solo los recibos de cada contribuyente por el índice
+# recibos_contribuyente_idx; nunca recorre la tabla completa.
+
+# Contribuyentes por INSERT/UPDATE en las operaciones por lote.
+CONTRIBUYENTES_POR_LOTE = 500
+
+
+# I. UPSERT Y VÍNCULO
+
+def _upsert(modelo, datos, using):
+    """
+    Inserta o actualiza (por rif_normalizado) los contribuyentes de `datos`
+    ({rif_normalizado: {campo: valor}}). Retorna {rif_normalizado: pk}.
+    """
+    ids = {}
+    claves = list(datos)
+    for i in range(0, len(claves), CONTRIBUYENTES_POR_LOTE):
+        lote = claves[i:i + CONTRIBUYENTES_POR_LOTE]
+        modelo.objects.using(using).bulk_create(
+            [modelo(rif_normalizado=clave, **datos[clave]) for clave in lote],
+            update_conflicts=True,
+            unique_fields=['rif_normalizado'],
+            update_fields=['rif', 'nombre', 'nombre_normalizado', 'direccion', 'fecha_modificacion'],
+        )
+        ids.update(
+            modelo.objects.using(using).filter(rif_normalizado__in=lote).values_list('rif_normalizado', 'pk')
+        )
+    return ids
+
+
+def _datos_contribuyente(nombre, nombre_normalizado, rif, direccion):
+    return {'rif': rif, 'nombre': nombre, 'nombre_normalizado': nombre_normalizado, 'direccion': direccion or ''}
+
+
+def vincular_contribuyentes(recibos, using='default'):
+    """
+    Upsert en lote de los contribuyentes de `recibos` (aún sin guardar, con las
+    columnas de búsqueda ya calculadas) y asignación de recibo.contribuyente_id.
+    El último recibo de cada RIF define nombre y dirección. Retorna los ids de
+    los contribuyentes vinculados.
+    """
+    datos = {
+        recibo.rif_normalizado: _datos_contribuyente(
+            recibo.nombre, recibo.nombre_normalizado, recibo.rif_cedula_identidad, recibo.direccion_inmueble,
+        )
+        for recibo in recibos if recibo.rif_normalizado
+    }
+    ids = _upsert(Contribuyente, datos, using)
+    for recibo in recibos:
+        recibo.contribuyente_id = ids.get(recibo.rif_normalizado)
+    return set(ids.values())
+
+
+# II. TOTALES
+
+def _recalcular(modelo_contribuyente, modelo_recibo, ids, using):
+    vigentes = (
+        modelo_recibo.objects.using(using)
+        .filter(contribuyente=OuterRef('pk'), anulado=False)
+        .order_by().values('contribuyente')
+    )
+    modelo_contribuyente.objects.using(using).filter(pk__in=ids).update(
+        cantidad_recibos=Coalesce(Subquery(vigentes.annotate(n=Count('pk')).values('n')), 0),
+        total_pagado=Coalesce(
+            Subquery(vigentes.annotate(s=Sum('total_monto_bs')).values('s')),
+            Value(Decimal(0)),
+            output_field=DecimalField(max_digits=17, decimal_places=2),
+        ),
+        ultimo_pago=Subquery(vigentes.annotate(m=Max('fecha')).values('m')),
+        fecha_modificacion=timezone.now(),
+    )
+
+
+def actualizar_totales(ids, using='default'):
+    """Recalcula cantidad_recibos, total_pagado y ultimo_pago de los contribuyentes `ids`."""
+    ids = sorted(set(ids) - {None})
+    for i in range(0, len(ids), CONTRIBUYENTES_POR_LOTE):
+        _recalcular(Contribuyente, Recibo, ids[i:i + CONTRIBUYENTES_POR_LOTE], using)
+
+
+def recalcular_todos(modelo_contribuyente=Contribuyente, modelo_recibo=Recibo, using='default'):
+    """Recalcula los totales de todos los contribuyentes, por lotes de ids. Retorna cuántos."""
+    ultimo_id, total = 0, 0
+    while True:
+        ids = list(
+            modelo_contribuyente.objects.using(using).filter(pk__gt=ultimo_id).order_by('pk')
+            .values_list('pk', flat=True)[:CONTRIBUYENTES_POR_LOTE]
+        )
+        if not ids:
+            return total
+        _recalcular(modelo_contribuyente, modelo_recibo, ids, using)
+        total += len(ids)
+        ultimo_id = ids[-1]
+
+
+# III. RELLENO (migración y comando recalcular_contribuyentes)
+
+def rellenar_contribuyentes(modelo_recibo=Recibo, modelo_contribuyente=Contribuyente, using='default',
+                            lote=CONTRIBUYENTES_POR_LOTE * 4, progreso=None):
+    """
+    Vincula los recibos que no tienen contribuyente (o cuyo RIF cambió por un
+    UPDATE masivo) recorriéndolos por lotes de ids, y recalcula todos los
+    totales. Acepta los modelos históricos de una migración. Retorna la
+    cantidad de recibos vinculados.
+    """
+    ultimo_id, vinculados = 0, 0
+    while True:
+        filas = list(
+            modelo_recibo.objects.using(using).filter(pk__gt=ultimo_id).order_by('pk')
+            .values_list(
+                'pk', 'rif_normalizado', 'contribuyente__rif_normalizado',
+                'nombre', 'nombre_normalizado', 'rif_cedula_identidad', 'direccion_inmueble',
+            )[:lote]
+        )
+        if not filas:
+            break
+
+        pendientes = [fila for fila in filas if (fila[1] or None) != fila[2]]
+        if pendientes:
+            datos = {fila[1]: _datos_contribuyente(*fila[3:]) for fila in pendientes if fila[1]}
+            ids = _upsert(modelo_contribuyente, datos, using)
+            cambios = [modelo_recibo(pk=fila[0], contribuyente_id=ids.get(fila[1])) for fila in pendientes]
+            modelo_recibo.objects.using(using).bulk_update(cambios, ['contribuyente'])
+            vinculados += len(cambios)
+        ultimo_id = filas[-1][0]
+        if progreso:
+            progreso(ultimo_id, vinculados)
+
+    contribuyentes = recalcular_todos(modelo_contribuyente, modelo_recibo, using)
+    logger.info(f"Contribuyentes: {vinculados} recibos vinculados, totales de {contribuyentes} recalculados.")
+    return vinculados
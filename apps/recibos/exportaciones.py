@@ -0,0 +1,128 @@
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from sistema_gestion.routers import forzar_primaria, leyendo_de_primaria, restaurar_enrutamiento
+from .admision import operacion_pesada
+from .artefactos import calcular_etag, depurar_artefactos, escribir_artefacto, recuperar_artefacto, ruta_artefacto
+
+logger = logging.getLogger(__name__)
+
+# Ejecutor acotado para las exportaciones pesadas de las vistas asíncronas. El
+# render (pandas, reportlab, zipfile) nunca corre en el event loop: se envía a
+# un pool de RECIBOS_EXPORTACIONES_MAX hilos o procesos y las peticiones que
+# exceden el cupo esperan su turno en la cola del pool, sin ocupar el worker.
+#   - 'hilos'    -> ThreadPoolExecutor (por defecto; comparte memoria y conexiones)
+#   - 'procesos' -> ProcessPoolExecutor con 'spawn' (evita el GIL en el render)
+
+_ejecutor = None
+_candado_ejecutor = threading.Lock()
+
+
+def _inicializar_proceso():
+    """Inicializador de cada proceso del pool: carga Django una sola vez."""
+    import django
+    django.setup()
+
+
+def obtener_ejecutor():
+    global _ejecutor
+    with _candado_ejecutor:
+        if _ejecutor is None:
+            maximo = settings.RECIBOS_EXPORTACIONES_MAX
+            if settings.RECIBOS_EXPORTACIONES_EJECUTOR == 'procesos':
+                _ejecutor = ProcessPoolExecutor(
+                    max_workers=maximo,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_inicializar_proceso,
+                )
+            else:
+                _ejecutor = ThreadPoolExecutor(max_workers=maximo, thread_name_prefix='exportacion')
+        return _ejecutor
+
+
+def _ejecutar_con_enrutamiento(primaria, funcion, *args):
+    """En un proceso del pool: ejecuta `funcion(*args)` leyendo de la primaria si la petición lo exigía."""
+    token = forzar_primaria(primaria)
+    try:
+        return funcion(*args)
+    finally:
+        restaurar_enrutamiento(token)
+
+
+async def ejecutar_exportacion(funcion, *args):
+    """
+    Ejecuta `funcion(*args)` en el ejecutor acotado sin bloquear el event loop.
+    run_in_executor no copia las variables de contexto: sin ellas, una
+    exportación pedida justo después de una escritura leería la réplica
+    atrasada aunque la petición esté fijada a la primaria.
+    """
+    loop = asyncio.get_running_loop()
+    ejecutor = obtener_ejecutor()
+    if isinstance(ejecutor, ProcessPoolExecutor):
+        # El contexto no cruza a otro proceso: el enrutamiento se pasa explícito.
+        return await loop.run_in_executor(
+            ejecutor, _ejecutar_con_enrutamiento, leyendo_de_primaria(), funcion, *args,
+        )
+    return await loop.run_in_executor(ejecutor, contextvars.copy_context().run, funcion, *args)
+
+
+# TAREAS (funciones de módulo: deben poder serializarse para el pool de procesos)
+
+def exportar_zip(pks, version_datos):
+    """
+    Genera (o reutiliza) el ZIP de los recibos `pks` en el almacenamiento de
+    artefactos. Retorna (ruta, cantidad) con cantidad=None si ya existía.
+    """
+    from .models import Recibo
+    from .pdf_recibos import construir_zip_recibos
+
+    close_old_connections()
+    try:
+        etag = calcular_etag('zip', version_datos, sorted(pks))
+        ruta = ruta_artefacto('zips', etag, 'zip')
+        if recuperar_artefacto(ruta):
+            return str(ruta), None
+
+        recibos = Recibo.objects.filter(pk__in=pks).order_by('numero_recibo')
+        cantidad = 0
+
+        def construir(destino):
+            nonlocal cantidad
+            cantidad = construir_zip_recibos(recibos, destino)
+
+        with operacion_pesada('zip'):
+            escribir_artefacto(ruta, construir)
+        if cantidad == 0:
+            # Un ZIP vacío no se conserva: se reintentaría desde la caché.
+            os.unlink(ruta)
+            return None, 0
+
+        depurar_artefactos('zips', settings.RECIBOS_CACHE_REPORTES_MAX_MB * 1024 * 1024, conservar=ruta)
+        return str(ruta), cantidad
+    finally:
+        close_old_connections()
+
+
+def exportar_reporte(accion, params, etag):
+    """
+    Genera (o reutiliza) el reporte `accion` con los filtros `params`. El ETag se
+    calcula en la vista, con la versión de los datos que esta ya validó contra
+    If-None-Match. Retorna (ruta, cantidad) con cantidad=None si el reporte
+    salió de la caché.
+    """
+    from .cache_reportes import obtener_reporte
+
+    close_old_connections()
+    try:
+        ruta, recibos_filtrados = obtener_reporte(accion, params, etag)
+        return str(ruta), (len(recibos_filtrados) if recibos_filtrados is not None else None)
+    finally:
+        close_old_connections()
@@ -0,0 +1,117 @@
+from datetime import date
+
+from django.db.models import Q
+
+from .busqueda import CAMPOS_BUSQUEDA, construir_filtro_busqueda
+from .constants import CATEGORY_CHOICES
+from .models import Recibo
+
+# Filtros compartidos por las vistas y comandos que generan reportes. Trabajan
+# sobre cualquier mapeo con `.get()` (request.GET, QueryDict o dict).
+
+
+def filtrar_recibos_reporte(params):
+    """
+    Aplica los filtros del panel de reportes (estado, período, categorías y
+    búsqueda). Retorna (queryset_filtrado, filtros_aplicados) donde
+    filtros_aplicados describe los filtros en texto para el encabezado del reporte.
+    """
+    # 1. Preparación del Queryset base
+    recibos_queryset = Recibo.objects.filter(anulado=False).order_by('-fecha', '-numero_recibo')
+
+    filters = Q()
+    filtros_aplicados = {}
+    periodo_str = 'Todas las fechas'
+
+    # 2. Aplicación de Filtros 
+    estado_seleccionado = params.get('estado')
+    if estado_seleccionado and estado_seleccionado != "":
+        filters &= Q(estado__iexact=estado_seleccionado)
+    filtros_aplicados['estado'] = estado_seleccionado if estado_seleccionado else 'Todos los estados'
+
+    # Fechas como objetos date: con recibos_pago particionada, PostgreSQL solo
+    # recorre las particiones de los años del período. Una fecha inválida se ignora.
+    fecha_inicio = parsear_fecha(params.get('fecha_inicio'))
+    fecha_fin = parsear_fecha(params.get('fecha_fin'))
+
+    # Manejo de período
+    if fecha_inicio:
+        filters &= Q(fecha__gte=fecha_inicio)
+        periodo_str = f"Desde: {fecha_inicio.isoformat()}"
+
+    if fecha_fin:
+        filters &= Q(fecha__lte=fecha_fin)
+        if periodo_str == 'Todas las fechas':
+            periodo_str = f"Hasta: {fecha_fin.isoformat()}"
+        else:
+            periodo_str = f"{periodo_str} Hasta: {fecha_fin.isoformat()}"
+    filtros_aplicados['periodo'] = periodo_str.replace('Todas las fechas Hasta: None', 'Todas las fechas')
+
+    # Manejo de categorías
+    selected_categories_names = []
+    category_filters = Q()
+    for codigo, nombre_display in CATEGORY_CHOICES:
+        if params.get(codigo) == 'on':
+            category_filters |= Q(**{f'{codigo}': True})
+            selected_categories_names.append(nombre_display)
+
+    if category_filters:
+        filters &= category_filters
+        filtros_aplicados['categorias'] = ', '.join(selected_categories_names)
+    else:
+        filtros_aplicados['categorias'] = 'Todas las categorías'
+
+    # Manejo de búsqueda
+    search_query = params.get('q')
+    search_field = params.get('field', '')
+
+    if search_query:
+        # Igualdad o prefijo sobre columnas normalizadas e indexadas (busqueda.py).
+        q_search = construir_filtro_busqueda(search_query, campo_de_busqueda(search_field)) or Q()
+        filters &= q_search
+        filtros_aplicados['busqueda'] = search_query
+    else:
+        filtros_aplicados['busqueda'] = 'Ninguna'
+
+    # Filtrar el queryset final
+    recibos_filtrados = recibos_queryset.filter(filters)
+    
+
+    return recibos_filtrados, filtros_aplicados
+
+
+def campo_de_busqueda(valor):
+    """El campo del selector de búsqueda si es uno permitido; None para buscar en todos."""
+    return valor if valor in CAMPOS_BUSQUEDA else None
+
+
+def parsear_fecha(valor):
+    """Convierte 'AAAA-MM-DD' en date. Retorna None si está vacío o no es válido."""
+    try:
+        return date.fromisoformat((valor or '').strip())
+    except ValueError:
+        return None
+
+
+def _normalizar_fecha(valor):
+    fecha = parsear_fecha(valor)
+    return fecha.isoformat() if fecha else ''
+
+
+def firma_filtros_reporte(params):
+    """
+    Firma canónica de los filtros de un reporte: dos peticiones que producen el
+    mismo reporte (orden distinto de parámetros, campos vacíos, mayúsculas en el
+    estado, parámetros ajenos como `page`) obtienen la misma firma.
+    """
+    q = (params.get('q') or '').strip()
+    field = (params.get('field') or '').strip()
+    firma = {
+        'estado': (params.get('estado') or '').strip().upper(),
+        'fecha_inicio': _normalizar_fecha(params.get('fecha_inicio')),
+        'fecha_fin': _normalizar_fecha(params.get('fecha_fin')),
+        'categorias': sorted(codigo for codigo, _ in CATEGORY_CHOICES if params.get(codigo) == 'on'),
+        'q': q,
+        'field': (campo_de_busqueda(field) or '') if q else '',
+    }
+    return '&'.join(f'{clave}={valor}' for clave, valor in firma.items())
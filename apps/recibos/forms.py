@@ -1,5 +1,6 @@
 from django import forms
 from .models import Recibo 
+from .tasas import tasa_vigente
 from django.core.exceptions import ValidationError
 from unidecode import unidecode
 
@@ -10,6 +11,11 @@ DATE_INPUT_CLASS = TAILWIND_CLASS
 
 
 class ReciboForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Si se deja vacía, se usa la tasa BCV registrada para la fecha (ver clean()).
+        self.fields['tasa_dia'].required = False
+
     # 1. NORMALIZACIÓN DE DATOS (clean methods) - ACTUALIZADOS
 
     def clean_nombre(self):
@@ -38,6 +44,17 @@ class ReciboForm(forms.ModelForm):
         data = self.cleaned_data['numero_transferencia'].strip()
         return data.upper()
 
+    def clean(self):
+        cleaned_data = super().clean()
+        fecha = cleaned_data.get('fecha')
+        if cleaned_data.get('tasa_dia') is None and 'tasa_dia' not in self.errors and fecha:
+            tasa = tasa_vigente(fecha)
+            if tasa is None:
+                self.add_error('tasa_dia', "No hay tasa BCV registrada para esta fecha; ingrésela manualmente.")
+            else:
+                cleaned_data['tasa_dia'] = tasa
+        return cleaned_data
+
     # 2. META y WIDGETS - (USANDO TAILWIND_CLASS CON BORDE)
 
     class Meta:
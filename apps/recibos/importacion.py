@@ -0,0 +1,571 @@
+import pandas as pd
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max
+from decimal import Decimal, InvalidOperation
+import io
+import logging
+import os
+import multiprocessing
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unidecode import unidecode
+from .models import Recibo, SecuenciaCambios
+from .archivo_frio import numero_maximo_archivado
+from .contribuyentes import actualizar_totales, vincular_contribuyentes
+from .exportaciones import _inicializar_proceso
+from .memoria import etapa_memoria
+from .particiones import es_postgresql
+from .tasas import tabla_tasas
+from .versiones import incrementar_version_datos
+
+logger = logging.getLogger(__name__)
+
+# I. FUNCIONES AUXILIARES DE DATOS (Decimales y Booleanos)
+
+def to_boolean(value):
+    """
+    Optimizado: Convierte valores de Excel a Booleano. 
+    Usa el conjunto de valores True directamente para velocidad.
+    """
+    TRUE_VALUES = {'sí', 'si', 'true', '1', 'x', 'y', True, 1}
+    
+    if pd.isna(value) or value is None:
+        return False
+    
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    if isinstance(value, (int, bool)):
+        return value in TRUE_VALUES
+        
+    return False
+
+
+def limpiar_y_convertir_decimal(value):
+    """
+    Optimizado: Limpia cualquier carácter no numérico y convierte a Decimal.
+    Más robusto en el manejo de formatos de moneda.
+    """
+    if pd.isna(value) or value is None:
+        return Decimal(0)
+
+    if isinstance(value, (int, float, Decimal)):
+        try:
+            return Decimal(value)
+        except InvalidOperation:
+            pass
+
+    s = str(value).strip().lower()
+    
+    if not s or s in ['-', 'n/a', 'no aplica']:
+        return Decimal(0)
+    
+    s_limpio = s.replace(' ', '').replace('$', '').replace('€', '')
+    
+    if ',' in s_limpio and '.' in s_limpio:
+        s_limpio = s_limpio.replace('.', '')
+        s_final = s_limpio.replace(',', '.')
+    elif ',' in s_limpio:
+        s_final = s_limpio.replace(',', '.')
+    else:
+        s_final = s_limpio
+
+    if s_final.count('.') > 1:
+        partes = s_final.rsplit('.', 1)
+        s_final = partes[0].replace('.', '') + '.' + partes[1]
+
+    try:
+        if not s_final:
+            return Decimal(0)
+        return Decimal(s_final)
+    except InvalidOperation:
+        logger.error(f"Error conversión Decimal: '{s_final}' (original: '{value}')")
+        return Decimal(0)
+
+
+# II. ETAPAS DE LA IMPORTACIÓN
+# La carga se divide en etapas independientes para poder repartirlas:
+#   1. leer_hoja        -> DataFrame validado de la hoja 'Hoja2' (solo pandas)
+#   2. normalizar_hoja  -> lista de dicts listos para insertar (sin numero_recibo)
+#   3. insertar_recibos -> asigna un bloque contiguo de números e inserta en lote
+# Las etapas 1 y 2 no tocan la base de datos, así que pueden correr en otro proceso.
+
+RIF_COL = 'rif_cedula_identidad'
+
+COLUMNAS_CANONICAS = [
+    'estado', 'nombre', RIF_COL, 'direccion_inmueble', 'ente_liquidado',
+    'categoria1', 'categoria2', 'categoria3', 'categoria4', 'categoria5',
+    'categoria6', 'categoria7', 'categoria8', 'categoria9', 'categoria10',
+    'gastos_administrativos', 'tasa_dia', 'total_monto_bs',
+    'numero_transferencia', 'conciliado', 'fecha', 'concepto'
+]
+
+# Filas por INSERT al guardar los recibos de un archivo.
+FILAS_POR_INSERT = 1_000
+
+# Clave del candado de PostgreSQL (pg_advisory_xact_lock) que serializa la
+# reserva de números de recibo entre importaciones simultáneas.
+CANDADO_NUMERACION = 0x52454349  # 'RECI'
+
+
+class ErrorImportacion(Exception):
+    """El archivo no puede importarse; el mensaje se muestra tal cual al usuario."""
+
+
+def leer_hoja(archivo_excel):
+    """Lee la hoja 'Hoja2' (encabezado en la fila 4) y valida su estructura."""
+    try:
+        df = pd.read_excel(
+            archivo_excel,
+            sheet_name='Hoja2',
+            header=3,
+            dtype={'fecha': str, RIF_COL: str, 'numero_transferencia': str}
+        )
+    except ValueError:
+        raise ErrorImportacion("Error de archivo: Asegúrate de que existe la hoja 'Hoja2' y el formato es válido.")
+
+    # El índice es el número de fila en la hoja (los datos empiezan en la fila 5).
+    df.index += 5
+    return _validar_columnas(df, "El archivo Excel está vacío o la hoja 'Hoja2' no contiene datos válidos.", 'Fila 4')
+
+
+def _detectar_separador(primera_linea):
+    return ';' if primera_linea.count(';') > primera_linea.count(',') else ','
+
+
+def leer_csv(archivo_csv):
+    """
+    Vía rápida para oficinas que exportan CSV: mismas 22 columnas (en el orden de
+    COLUMNAS_CANONICAS) con el encabezado en la primera fila. Separador ',' o ';'
+    y codificación UTF-8 o Windows-1252 (la de Excel en español) se detectan solos.
+    Todas las columnas se leen como texto con el motor C de pandas: sin inferir
+    tipos ni pasar por openpyxl; la normalización es la misma que la del Excel.
+    """
+    if hasattr(archivo_csv, 'read'):
+        contenido = archivo_csv.read()
+    else:
+        with open(archivo_csv, 'rb') as archivo:
+            contenido = archivo.read()
+    try:
+        texto_inicial = contenido[:4096].decode('utf-8-sig')
+        codificacion = 'utf-8-sig'
+    except UnicodeDecodeError:
+        texto_inicial = contenido[:4096].decode('cp1252', errors='replace')
+        codificacion = 'cp1252'
+
+    try:
+        df = pd.read_csv(
+            io.BytesIO(contenido),
+            sep=_detectar_separador(texto_inicial.split('\n', 1)[0]),
+            encoding=codificacion,
+            dtype=str,
+            engine='c',
+        )
+    except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as e:
+        raise ErrorImportacion(f"Error de archivo: el CSV no pudo leerse ({e}).")
+
+    # El índice es el número de línea en el archivo (los datos empiezan en la 2).
+    df.index += 2
+    return _validar_columnas(df, "El archivo CSV está vacío o no contiene datos válidos.", 'primera línea')
+
+
+def _validar_columnas(df, mensaje_vacio, ubicacion_encabezado):
+    df.dropna(how='all', inplace=True)
+
+    if df.empty:
+        raise ErrorImportacion(mensaje_vacio)
+
+    if df.shape[1] < len(COLUMNAS_CANONICAS):
+        raise ErrorImportacion(
+            f"Error: Se encontraron {df.shape[1]} columnas, se esperaban {len(COLUMNAS_CANONICAS)}. Revise el encabezado ({ubicacion_encabezado})."
+        )
+
+    df = df.iloc[:, :len(COLUMNAS_CANONICAS)]
+    df.columns = COLUMNAS_CANONICAS
+    return df
+
+
+def completar_tasas(df, tasas):
+    """
+    Llena tasa_dia_proc donde el libro no trae tasa (0) con la tasa BCV vigente
+    en la fecha de la fila (`tasas`: lista (fecha, tasa) de tabla_tasas()), con
+    un solo merge por fecha. Si además falta el total, se calcula como
+    gastos x tasa.
+    """
+    faltantes = df['tasa_dia_proc'] == 0
+    if not tasas or not faltantes.any():
+        return
+    tabla = pd.DataFrame(tasas, columns=['fecha_tasa', 'tasa_bcv'])
+    tabla['fecha_tasa'] = pd.to_datetime(tabla['fecha_tasa'])
+    filas = pd.DataFrame({
+        'fila': df.index[faltantes],
+        'fecha_tasa': pd.to_datetime(df.loc[faltantes, 'fecha_procesada']),
+    }).sort_values('fecha_tasa')
+    # Tasa de la fecha o, si ese día no hubo publicación, la anterior más cercana.
+    cruce = pd.merge_asof(filas, tabla, on='fecha_tasa', direction='backward').dropna(subset=['tasa_bcv'])
+    if cruce.empty:
+        return
+    df.loc[cruce['fila'], 'tasa_dia_proc'] = cruce['tasa_bcv'].to_numpy()
+
+    sin_total = df.index.isin(cruce['fila']) & (df['total_monto_proc'] == 0)
+    df.loc[sin_total, 'total_monto_proc'] = [
+        (gastos * tasa).quantize(Decimal('0.01'))
+        for gastos, tasa in zip(df.loc[sin_total, 'gastos_admin_proc'], df.loc[sin_total, 'tasa_dia_proc'])
+    ]
+    logger.info(f"Tasa BCV completada en {len(cruce)} filas ({int(sin_total.sum())} con total calculado).")
+
+
+def normalizar_hoja(df, tasas=None):
+    """
+    Convierte el DataFrame de leer_hoja() o leer_csv() (indexado por número de
+    fila del archivo) en una lista de dicts con los campos de Recibo ya limpios. Las filas sin fecha válida o sin RIF ni nombre se
+    omiten; una fila con nombre pero sin RIF lanza ErrorImportacion. Con
+    `tasas` (tabla_tasas()), las filas sin tasa toman la del BCV.
+    """
+    df['fecha_procesada'] = pd.to_datetime(df['fecha'], errors='coerce', dayfirst=True).dt.date
+
+    df = df.dropna(subset=['fecha_procesada'])
+
+    df['gastos_admin_proc'] = df['gastos_administrativos'].apply(limpiar_y_convertir_decimal)
+    df['tasa_dia_proc'] = df['tasa_dia'].apply(limpiar_y_convertir_decimal)
+    df['total_monto_proc'] = df['total_monto_bs'].apply(limpiar_y_convertir_decimal)
+    completar_tasas(df, tasas)
+
+    for i in range(1, 11):
+        key = f'categoria{i}'
+        df[key] = df[key].apply(to_boolean)
+    df['conciliado'] = df['conciliado'].apply(to_boolean)
+
+    filas = []
+    for index, fila_datos in df.iterrows():
+
+        fila_numero = index
+
+        rif_cedula_raw = str(fila_datos.get(RIF_COL, '')).strip()
+        nombre_raw = str(fila_datos.get('nombre', '')).strip()
+
+        if not rif_cedula_raw and not nombre_raw:
+            logger.warning(f"Fila {fila_numero}: Saltada por no tener RIF/Cédula ni Nombre.")
+            continue
+        if not rif_cedula_raw:
+            # RIF/Cédula es obligatorio
+            raise ErrorImportacion(f"Fila {fila_numero}: El campo RIF/Cédula es obligatorio y está vacío.")
+
+        # Construcción del diccionario de datos (usa los campos pre-procesados)
+        data_a_insertar = {
+            'estado': unidecode(str(fila_datos.get('estado', '')).strip()).upper(),
+            'nombre': str(nombre_raw).title(),
+            'rif_cedula_identidad': str(rif_cedula_raw).strip().replace('.', '').replace('-', '').replace(' ', '').upper(),
+            'direccion_inmueble': str(fila_datos.get('direccion_inmueble', 'DIRECCION NO ESPECIFICADA')).strip().title(),
+            'ente_liquidado': str(fila_datos.get('ente_liquidado', 'ENTE NO ESPECIFICADO')).strip().title(),
+            'numero_transferencia': str(fila_datos.get('numero_transferencia', '')).strip().upper(),
+            'concepto': str(fila_datos.get('concepto', '')).strip().title(),
+
+            'gastos_administrativos': fila_datos['gastos_admin_proc'],
+            'tasa_dia': fila_datos['tasa_dia_proc'],
+            'total_monto_bs': fila_datos['total_monto_proc'],
+
+            'fecha': fila_datos['fecha_procesada'],
+            'conciliado': bool(fila_datos['conciliado']),
+        }
+
+        for i in range(1, 11):
+            key = f'categoria{i}'
+            data_a_insertar[key] = bool(fila_datos[key])
+
+        filas.append(data_a_insertar)
+
+    return filas
+
+
+def preparar_archivo(archivo, nombre=None, tasas=None):
+    """
+    Etapas 1 y 2: lectura y normalización (sin acceso a la base de datos: la
+    tabla de tasas BCV llega como argumento). Los archivos .csv usan
+    leer_csv(); el resto, la hoja 'Hoja2' del Excel.
+    """
+    nombre = nombre or getattr(archivo, 'name', None) or str(archivo)
+    es_csv = str(nombre).lower().endswith('.csv')
+    with etapa_memoria('importacion.leer_csv' if es_csv else 'importacion.leer_excel'):
+        df = (leer_csv if es_csv else leer_hoja)(archivo)
+    with etapa_memoria('importacion.preprocesamiento'):
+        return normalizar_hoja(df, tasas)
+
+
+def reservar_numeros(cantidad, using='default'):
+    """
+    Reserva un bloque contiguo de `cantidad` números de recibo y retorna el
+    primero. Debe llamarse dentro de la transacción que inserta los recibos:
+    en PostgreSQL el candado se libera recién al confirmarla.
+    """
+    conexion = connections[using]
+    if es_postgresql(conexion):
+        with conexion.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [CANDADO_NUMERACION])
+    ultimo_recibo = Recibo.objects.using(using).aggregate(Max('numero_recibo'))['numero_recibo__max']
+    # Los años archivados ya no están en la tabla pero su numeración sigue ocupada.
+    return max(ultimo_recibo or 0, numero_maximo_archivado() or 0) + 1
+
+
+def insertar_recibos(filas, numero_inicial, using='default'):
+    """Etapa 3: inserta `filas` numeradas desde `numero_inicial`. Retorna los pks creados."""
+    # Un solo número de cambio para todo el lote (la fuente de cambios ordena por
+    # secuencia e id). En PostgreSQL es el id de la transacción: no bloquea las
+    # ediciones ni anulaciones que ocurran mientras dura la importación.
+    secuencia = SecuenciaCambios.siguiente(using)
+    recibos = [
+        Recibo(numero_recibo=numero_inicial + i, secuencia_cambio=secuencia, **datos)
+        for i, datos in enumerate(filas)
+    ]
+    # bulk_create no pasa por save() ni por las señales: las columnas de
+    # búsqueda, el contribuyente y sus totales se resuelven aquí, en lote.
+    for recibo in recibos:
+        recibo.actualizar_campos_busqueda()
+    contribuyentes = vincular_contribuyentes(recibos, using)
+    creados = Recibo.objects.using(using).bulk_create(recibos, batch_size=FILAS_POR_INSERT)
+    actualizar_totales(contribuyentes, using)
+    return [recibo.pk for recibo in creados]
+
+
+def _rango(numero_inicial, cantidad):
+    return str(numero_inicial).zfill(4), str(numero_inicial + cantidad - 1).zfill(4)
+
+
+# III. FUNCIÓN CLAVE: IMPORTACIÓN DE EXCEL
+
+@etapa_memoria('importacion')
+def importar_recibos_desde_excel(archivo_excel):
+    """
+    Lee las filas del archivo Excel (a partir de la fila 4) y genera
+    un recibo por cada fila de datos válida, usando Pandas para el pre-procesamiento.
+    """
+    try:
+        filas = preparar_archivo(archivo_excel, tasas=tabla_tasas())
+
+        if not filas:
+            mensaje = "Importación terminada. No se encontraron registros válidos para crear recibos (todas las filas vacías, sin RIF, o con fecha inválida)."
+            return True, mensaje, []
+
+        with etapa_memoria('importacion.insercion_orm'), transaction.atomic():
+            numero_inicial = reservar_numeros(len(filas))
+            recibos_creados_pks = insertar_recibos(filas, numero_inicial)
+        # bulk_create no emite post_save: la versión de los datos se incrementa una vez.
+        incrementar_version_datos()
+
+        primer_num, ultimo_num = _rango(numero_inicial, len(recibos_creados_pks))
+        logger.info(f"ÉXITO: {len(recibos_creados_pks)} recibos generados, N°{primer_num} a N°{ultimo_num}.")
+        mensaje = f"Importación masiva exitosa. Se generaron {len(recibos_creados_pks)} recibos, desde N°{primer_num} hasta N°{ultimo_num}."
+        return True, mensaje, recibos_creados_pks
+
+    except ErrorImportacion as e:
+        logger.warning(f"Importación rechazada: {e}")
+        return False, str(e), None
+
+    except Exception as e:
+        error_message = f"FALLO FATAL DE CARGA: {e}"
+        logger.error(error_message, exc_info=True)
+        return False, f"Fallo en la carga de Excel: Error desconocido.", None
+
+
+# IV. IMPORTACIÓN DE VARIOS LIBROS (ZIP o selección múltiple)
+# Cada libro se lee y normaliza en un proceso distinto del pool (etapas 1 y 2,
+# las costosas); la inserción ocurre en el proceso de la petición, con un bloque
+# contiguo de números por archivo en el orden en que se subieron. El tiempo
+# total queda cerca del del archivo más lento y no de la suma de todos.
+#   - atomico=True  -> todos los archivos en una transacción: si uno falla, no se importa ninguno
+#   - atomico=False -> una transacción por archivo: los válidos se importan igual
+# Si un proceso del pool muere (OOM killer, señal), el pool queda roto para
+# siempre: se descarta, el próximo lote crea uno nuevo y el lote actual se lee
+# en el proceso de la petición. Los ZIP se validan antes de descomprimir: el
+# tamaño declarado de cada libro y la suma no pueden superar
+# RECIBOS_IMPORTACION_ZIP_MAX_MB, ni la cantidad de libros
+# RECIBOS_IMPORTACION_ZIP_MAX_LIBROS (zipfile nunca entrega más bytes que los
+# declarados en el encabezado).
+
+EXTENSIONES_LIBRO = ('.xlsx', '.csv')
+
+_pool = None
+_candado_pool = threading.Lock()
+
+
+def _obtener_pool():
+    global _pool
+    with _candado_pool:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.RECIBOS_IMPORTACION_PROCESOS,
+                mp_context=multiprocessing.get_context('spawn'),
+                # El de exportaciones y no una función de este módulo: importarlo
+                # en el proceso nuevo requiere que Django ya esté cargado.
+                initializer=_inicializar_proceso,
+            )
+        return _pool
+
+
+def _descartar_pool(roto):
+    """Saca de uso el pool `roto`: el próximo _obtener_pool() crea uno nuevo."""
+    global _pool
+    with _candado_pool:
+        if _pool is roto:
+            _pool = None
+    roto.shutdown(wait=False, cancel_futures=True)
+
+
+def expandir_archivos(subidos):
+    """
+    Lista de (nombre, contenido) a partir de los archivos subidos: cada ZIP
+    aporta los libros .xlsx y .csv que contiene (se ignoran carpetas y
+    temporales). Lanza ErrorImportacion si un ZIP excede los límites de tamaño
+    descomprimido o de cantidad de libros.
+    """
+    maximo_bytes = settings.RECIBOS_IMPORTACION_ZIP_MAX_MB * 1024 * 1024
+    libros = []
+    for subido in subidos:
+        nombre = os.path.basename(getattr(subido, 'name', str(subido)))
+        contenido = subido.read()
+        if not nombre.lower().endswith('.zip'):
+            libros.append((nombre, contenido))
+            continue
+        try:
+            with zipfile.ZipFile(io.BytesIO(contenido)) as comprimido:
+                miembros = [
+                    miembro for miembro in comprimido.infolist()
+                    if not (miembro.is_dir() or '__MACOSX' in miembro.filename
+                            or miembro.filename.rsplit('/', 1)[-1].startswith(('~$', '.'))
+                            or not miembro.filename.lower().endswith(EXTENSIONES_LIBRO))
+                ]
+                if len(miembros) > settings.RECIBOS_IMPORTACION_ZIP_MAX_LIBROS:
+                    raise ErrorImportacion(
+                        f"{nombre}: contiene {len(miembros)} libros; el máximo es "
+                        f"{settings.RECIBOS_IMPORTACION_ZIP_MAX_LIBROS}."
+                    )
+                descomprimido = 0
+                for miembro in miembros:
+                    descomprimido += miembro.file_size
+                    if descomprimido > maximo_bytes:
+                        raise ErrorImportacion(
+                            f"{nombre}: los libros descomprimidos superan los "
+                            f"{settings.RECIBOS_IMPORTACION_ZIP_MAX_MB} MB permitidos."
+                        )
+                    libros.append((miembro.filename.rsplit('/', 1)[-1], comprimido.read(miembro)))
+        except zipfile.BadZipFile:
+            raise ErrorImportacion(f"{nombre}: el archivo ZIP está dañado o no es un ZIP válido.")
+    return libros
+
+
+def _preparar_libro(nombre, contenido, tasas=None):
+    """Tarea del pool (función de módulo): retorna (nombre, filas, error, segundos)."""
+    inicio = time.perf_counter()
+    try:
+        filas = preparar_archivo(io.BytesIO(contenido), nombre, tasas)
+        return nombre, filas, None, time.perf_counter() - inicio
+    except ErrorImportacion as e:
+        return nombre, None, str(e), time.perf_counter() - inicio
+    except Exception as e:
+        logger.error(f"Error al leer {nombre}: {e}", exc_info=True)
+        return nombre, None, "Fallo en la carga de Excel: Error desconocido.", time.perf_counter() - inicio
+
+
+def preparar_libros(libros, procesos=None):
+    """Etapas 1 y 2 de todos los libros, en paralelo si hay más de uno y más de un proceso."""
+    procesos = settings.RECIBOS_IMPORTACION_PROCESOS if procesos is None else procesos
+    # Los procesos del pool no consultan la base: reciben la tabla de tasas.
+    tasas = tabla_tasas()
+    if len(libros) < 2 or procesos < 2:
+        return [_preparar_libro(nombre, contenido, tasas) for nombre, contenido in libros]
+    pool = _obtener_pool()
+    try:
+        futuros = [pool.submit(_preparar_libro, nombre, contenido, tasas) for nombre, contenido in libros]
+        return [futuro.result() for futuro in futuros]
+    except BrokenProcessPool as e:
+        logger.warning(f"Pool de importación roto ({e}): se crea otro y este lote se lee en el proceso actual.")
+        _descartar_pool(pool)
+        return [_preparar_libro(nombre, contenido, tasas) for nombre, contenido in libros]
+
+
+def importar_varios_archivos(subidos, atomico=True, procesos=None):
+    """
+    Importa varios libros 'Hoja2' (archivos sueltos o dentro de ZIP). Retorna
+    un resumen consolidado: {'exito', 'archivos': [{nombre, creados, desde,
+    hasta, error, segundos}], 'pks', 'segundos'}.
+    """
+    inicio = time.perf_counter()
+    libros = expandir_archivos(subidos)
+    if not libros:
+        raise ErrorImportacion("No se encontraron libros (.xlsx o .csv) para importar.")
+
+    archivos = [
+        {'nombre': nombre, 'filas': filas, 'error': error, 'segundos': round(segundos, 2),
+         'creados': 0, 'desde': None, 'hasta': None}
+        for nombre, filas, error, segundos in preparar_libros(libros, procesos)
+    ]
+    pks = []
+
+    def insertar(archivo, numero_inicial):
+        archivo['pks'] = insertar_recibos(archivo['filas'], numero_inicial)
+        archivo['creados'] = len(archivo['pks'])
+        archivo['desde'], archivo['hasta'] = (
+            _rango(numero_inicial, archivo['creados']) if archivo['creados'] else (None, None)
+        )
+
+    validos = [archivo for archivo in archivos if archivo['error'] is None]
+    if atomico and len(validos) < len(archivos):
+        for archivo in validos:
+            archivo['error'] = "No se importó: otro archivo del lote tiene errores."
+    elif atomico:
+        try:
+            with transaction.atomic():
+                numero = reservar_numeros(sum(len(a['filas']) for a in archivos))
+                for archivo in archivos:
+                    insertar(archivo, numero)
+                    numero += archivo['creados']
+        except Exception as e:
+            logger.error(f"Error al insertar el lote de {len(archivos)} libros: {e}", exc_info=True)
+            for archivo in archivos:
+                archivo.update(pks=[], creados=0, desde=None, hasta=None,
+                               error="Fallo en la carga de Excel: Error desconocido.")
+    else:
+        for archivo in validos:
+            try:
+                with transaction.atomic():
+                    insertar(archivo, reservar_numeros(len(archivo['filas'])))
+            except Exception as e:
+                logger.error(f"Error al insertar los recibos de {archivo['nombre']}: {e}", exc_info=True)
+                archivo['error'] = "Fallo en la carga de Excel: Error desconocido."
+
+    for archivo in archivos:
+        pks.extend(archivo.pop('pks', []))
+        archivo.pop('filas')
+    if pks:
+        incrementar_version_datos()
+
+    resumen = {
+        'exito': all(archivo['error'] is None for archivo in archivos),
+        'archivos': archivos,
+        'pks': pks,
+        'segundos': round(time.perf_counter() - inicio, 2),
+    }
+    logger.info(
+        f"Importación de {len(archivos)} libros: {len(pks)} recibos en {resumen['segundos']} s "
+        f"(libro más lento: {max(a['segundos'] for a in archivos)} s)."
+    )
+    return resumen
+
+
+def mensaje_resumen(resumen):
+    """Texto consolidado del resumen de importar_varios_archivos()."""
+    archivos = resumen['archivos']
+    importados = [a for a in archivos if a['creados']]
+    mensaje = (
+        f"Importación de {len(archivos)} archivos: {len(resumen['pks'])} recibos generados "
+        f"en {resumen['segundos']} s ({len(importados)} archivos importados)."
+    )
+    detalle = [
+        f"{a['nombre']}: N°{a['desde']} a N°{a['hasta']}" if a['creados']
+        else f"{a['nombre']}: {a['error'] or 'sin registros válidos'}"
+        for a in archivos
+    ]
+    return mensaje + ' ' + '; '.join(detalle) + '.'
@@ -0,0 +1,31 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from apps.recibos.contribuyentes import actualizar_totales, vincular_contribuyentes
+from apps.recibos.models import Recibo
+
+
+def crear_recibos_prueba(cantidad):
+    """
+    Crea `cantidad` recibos sintéticos a continuación del último número de recibo.
+    Pensado para los comandos de benchmark, que los crean dentro de una transacción
+    y la revierten al terminar.
+    """
+    base = (Recibo.objects.order_by('-numero_recibo').values_list('numero_recibo', flat=True).first() or 0) + 1
+    recibos = [
+        Recibo(
+            numero_recibo=base + i, estado='DISTRITO CAPITAL', nombre=f'Benchmark {i}',
+            rif_cedula_identidad=f'V{20000000 + i}', direccion_inmueble='Dirección de prueba',
+            ente_liquidado='INTU', gastos_administrativos=Decimal('140'),
+            tasa_dia=Decimal('36.5'), total_monto_bs=Decimal('5110'),
+            fecha=date.today() - timedelta(days=i % 365), concepto='Benchmark',
+            categoria1=(i % 2 == 0), categoria5=(i % 3 == 0),
+        )
+        for i in range(cantidad)
+    ]
+    for recibo in recibos:
+        recibo.actualizar_campos_busqueda()
+    contribuyentes = vincular_contribuyentes(recibos)
+    Recibo.objects.bulk_create(recibos, batch_size=1000)
+    actualizar_totales(contribuyentes)
+    return list(Recibo.objects.filter(numero_recibo__gte=base).order_by('numero_recibo'))
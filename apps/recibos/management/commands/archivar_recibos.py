@@ -0,0 +1,70 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+
+from sistema_gestion.routers import usar_primaria
+from apps.recibos.archivo_frio import ArchivoFrioError, archivar_anio, leer_catalogo, ruta_anio
+from apps.recibos.models import Recibo
+
+
+class Command(BaseCommand):
+    help = (
+        "Archiva años fiscales cerrados: exporta sus recibos a Parquet comprimido "
+        "(uno por año, en RECIBOS_ARCHIVO_DIR), verifica el archivo y los elimina "
+        "de recibos_pago. Los reportes y el PDF unitario siguen leyéndolos."
+    )
+
+    def add_arguments(self, parser):
+        grupo = parser.add_mutually_exclusive_group()
+        grupo.add_argument('--anio', type=int, nargs='+', help="Años a archivar.")
+        grupo.add_argument('--hasta-anio', type=int,
+                           help="Archiva todos los años con recibos hasta este (inclusive).")
+        parser.add_argument('--sin-eliminar', action='store_true',
+                            help="Solo exporta y verifica; no elimina las filas de la base.")
+        parser.add_argument('--listar', action='store_true', help="Muestra el catálogo de años archivados.")
+
+    def _listar(self):
+        catalogo = leer_catalogo()
+        if not catalogo:
+            self.stdout.write("No hay años archivados.")
+        for anio, datos in sorted(catalogo.items()):
+            tamano = ruta_anio(anio).stat().st_size if ruta_anio(anio).exists() else 0
+            self.stdout.write(
+                f"  {anio}  {datos['filas']:>9} filas  {datos['total_monto_bs']:>18} Bs  "
+                f"{tamano / 1024:>9.0f} KB  N° {datos['numero_min']}-{datos['numero_max']}  "
+                f"({datos['archivado_en'][:19]})"
+            )
+
+    def handle(self, *args, **options):
+        if options['listar']:
+            self._listar()
+            return
+
+        if options['anio']:
+            anios = sorted(set(options['anio']))
+        elif options['hasta_anio']:
+            with usar_primaria():
+                primera_fecha = Recibo.objects.aggregate(Min('fecha'))['fecha__min']
+            if primera_fecha is None:
+                self.stdout.write("No hay recibos en la base.")
+                return
+            anios = list(range(primera_fecha.year, options['hasta_anio'] + 1))
+        else:
+            raise CommandError("Indique --anio, --hasta-anio o --listar.")
+
+        if any(anio >= date.today().year for anio in anios):
+            raise CommandError("Solo se archivan años cerrados (anteriores al año actual).")
+
+        for anio in anios:
+            inicio = time.perf_counter()
+            try:
+                with usar_primaria():
+                    datos = archivar_anio(anio, eliminar=not options['sin_eliminar'])
+            except ArchivoFrioError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f"  {anio}: {datos['filas']} filas archivadas en {ruta_anio(anio).name} "
+                f"({time.perf_counter() - inicio:.1f} s)"
+            ))
@@ -0,0 +1,140 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from statistics import median
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Script que simula el arranque de un worker: setup de Django, carga del WSGI y de
+# todas las URLs (lo que hace gunicorn antes de atender la primera petición).
+SCRIPT_WORKER = r'''
+import json, os, sys, time
+inicio = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+import sistema_gestion.wsgi
+get_resolver().url_patterns
+if os.environ.get('BENCH_PRECARGAR') == '1':
+    from apps.recibos.utils import precargar_motores
+    precargar_motores()
+arranque = time.perf_counter() - inicio
+
+def memoria_kb():
+    datos = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for linea in f:
+                partes = linea.split()
+                if len(partes) >= 2 and partes[0].endswith(':') and partes[1].isdigit():
+                    datos[partes[0][:-1]] = int(partes[1])
+    except OSError:
+        import resource
+        datos['Rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    privada = datos.get('Private_Clean', 0) + datos.get('Private_Dirty', 0)
+    return {'rss_kb': datos.get('Rss', 0), 'pss_kb': datos.get('Pss', 0), 'privada_kb': privada}
+
+resultado = {'arranque_s': arranque}
+if os.environ.get('BENCH_FORK') == '1' and hasattr(os, 'fork'):
+    # Worker hijo tras el fork: lo que realmente cuesta cada worker adicional.
+    lectura, escritura = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(lectura)
+        os.write(escritura, json.dumps(memoria_kb()).encode())
+        os._exit(0)
+    os.close(escritura)
+    datos = b''
+    while True:
+        bloque = os.read(lectura, 4096)
+        if not bloque:
+            break
+        datos += bloque
+    os.waitpid(pid, 0)
+    resultado.update(json.loads(datos))
+else:
+    resultado.update(memoria_kb())
+resultado['pandas_cargado'] = 'pandas' in sys.modules
+resultado['reportlab_cargado'] = 'reportlab' in sys.modules
+print('BENCH_JSON=' + json.dumps(resultado))
+'''
+
+ESCENARIOS = (
+    # nombre, precargar motores, medir un worker forkeado
+    ('perezoso', False, False),
+    ('precarga por worker', True, False),
+    ('--preload (worker tras fork)', True, True),
+)
+
+PATRON_IMPORTTIME = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(.+)$')
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el arranque de un worker (tiempo y memoria) con y sin precarga de los "
+        "motores pesados, usando `python -X importtime`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=3)
+        parser.add_argument('--top', type=int, default=10,
+                            help="Cantidad de paquetes más costosos a listar.")
+
+    def _ejecutar(self, precargar, fork):
+        entorno = {
+            **os.environ,
+            'BENCH_PRECARGAR': '1' if precargar else '0',
+            'BENCH_FORK': '1' if fork else '0',
+            # El hook del wsgi no debe interferir: la precarga la decide el escenario.
+            'RECIBOS_PRECARGAR_MOTORES': 'False',
+        }
+        proceso = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', SCRIPT_WORKER],
+            cwd=str(settings.BASE_DIR), env=entorno,
+            capture_output=True, text=True, check=True,
+        )
+        linea_json = next(
+            l for l in proceso.stdout.splitlines() if l.startswith('BENCH_JSON=')
+        )
+        resultado = json.loads(linea_json.split('=', 1)[1])
+
+        # Tiempo propio (self) agrupado por paquete raíz.
+        por_paquete = defaultdict(int)
+        for linea in proceso.stderr.splitlines():
+            coincidencia = PATRON_IMPORTTIME.match(linea)
+            if coincidencia:
+                modulo = coincidencia.group(3).strip()
+                por_paquete[modulo.split('.')[0]] += int(coincidencia.group(1))
+        resultado['por_paquete'] = por_paquete
+        return resultado
+
+    def handle(self, *args, **options):
+        repeticiones = max(1, options['repeticiones'])
+
+        for nombre, precargar, fork in ESCENARIOS:
+            corridas = [self._ejecutar(precargar, fork) for _ in range(repeticiones)]
+            ultima = corridas[-1]
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\nEscenario: {nombre}"))
+            self.stdout.write(
+                f"  Arranque (mediana de {repeticiones}): "
+                f"{median(c['arranque_s'] for c in corridas) * 1000:.0f} ms"
+            )
+            self.stdout.write(
+                f"  RSS: {ultima['rss_kb'] / 1024:.1f} MB | "
+                f"PSS: {ultima['pss_kb'] / 1024:.1f} MB | "
+                f"Privada del worker: {ultima['privada_kb'] / 1024:.1f} MB"
+            )
+            self.stdout.write(
+                f"  pandas cargado: {ultima['pandas_cargado']} | "
+                f"reportlab cargado: {ultima['reportlab_cargado']}"
+            )
+
+            self.stdout.write(f"  Paquetes más costosos (-X importtime, tiempo propio):")
+            ranking = sorted(ultima['por_paquete'].items(), key=lambda x: x[1], reverse=True)
+            for paquete, micros in ranking[:options['top']]:
+                self.stdout.write(f"    {paquete:<25} {micros / 1000:8.1f} ms")
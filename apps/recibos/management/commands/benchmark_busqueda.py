@@ -0,0 +1,66 @@
+import time
+from statistics import median
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from sistema_gestion.routers import usar_primaria
+from apps.recibos.busqueda import construir_filtro_busqueda
+from apps.recibos.models import Recibo
+from ._datos_prueba import crear_recibos_prueba
+
+# (descripción, texto buscado, filtro anterior con icontains/iexact)
+CASOS = [
+    ("Nombre (prefijo)", 'benchmark 1234', Q(nombre__icontains='benchmark 1234')),
+    ("Nombre con acentos", 'bénchmark 99', Q(nombre__icontains='bénchmark 99')),
+    ("RIF con separadores", 'V-20.001.234', Q(rif_cedula_identidad__icontains='V-20.001.234')),
+    ("Cédula sin prefijo", '20001234', Q(rif_cedula_identidad__icontains='20001234') | Q(numero_recibo__iexact='20001234')),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la búsqueda anterior (icontains/iexact sobre los valores guardados) "
+        "con la búsqueda sobre las columnas normalizadas e indexadas: tiempo, filas "
+        "encontradas y si el plan usa un índice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--crear', type=int, default=0,
+                            help="Crea N recibos de prueba (se revierten al terminar).")
+
+    def _medir(self, queryset, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            filas = len(list(queryset.values_list('pk', flat=True)[:50]))
+            tiempos.append(time.perf_counter() - inicio)
+        plan = queryset.explain()
+        usa_indice = 'INDEX' in plan.upper() and 'SEQ SCAN' not in plan.upper()
+        return median(tiempos), filas, usa_indice
+
+    def handle(self, *args, **options):
+        repeticiones = max(1, options['repeticiones'])
+
+        # Lecturas en la primaria: los recibos de prueba solo existen en esta transacción.
+        with usar_primaria(), transaction.atomic():
+            if options['crear']:
+                crear_recibos_prueba(options['crear'])
+            total = Recibo.objects.count()
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"Búsqueda sobre {total} recibos ({connection.vendor}), mediana de {repeticiones} repeticiones"
+            ))
+
+            for descripcion, texto, filtro_anterior in CASOS:
+                antes = self._medir(Recibo.objects.filter(filtro_anterior), repeticiones)
+                despues = self._medir(Recibo.objects.filter(construir_filtro_busqueda(texto)), repeticiones)
+                self.stdout.write(f"  {descripcion} ({texto!r})")
+                for etiqueta, (segundos, filas, usa_indice) in (('antes', antes), ('después', despues)):
+                    self.stdout.write(
+                        f"    {etiqueta:<8} {segundos * 1000:8.2f} ms | {filas:>3} filas | "
+                        f"{'índice' if usa_indice else 'recorrido completo'}"
+                    )
+
+            transaction.set_rollback(True)
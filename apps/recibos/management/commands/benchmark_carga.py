@@ -0,0 +1,204 @@
+import importlib.util
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from statistics import median, quantiles
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sistema_gestion.routers import usar_primaria
+from apps.recibos.models import Recibo
+from ._datos_prueba import crear_recibos_prueba
+
+# servidor -> (módulo requerido, comando de arranque, URL de la exportación ZIP)
+SERVIDORES = {
+    'wsgi': (
+        'gunicorn',
+        ['-m', 'gunicorn', 'sistema_gestion.wsgi:application',
+         '--workers', '{trabajadores}', '--bind', '127.0.0.1:{puerto}',
+         '--timeout', '300', '--log-level', 'warning'],
+        '/recibos/generar-zip-recibos/',
+    ),
+    'asgi': (
+        'uvicorn',
+        ['-m', 'uvicorn', 'sistema_gestion.asgi:application',
+         '--workers', '{trabajadores}', '--host', '127.0.0.1', '--port', '{puerto}',
+         '--log-level', 'warning'],
+        '/recibos/async/generar-zip-recibos/',
+    ),
+}
+
+URL_DASHBOARD = '/recibos/'
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _descargar(url, timeout=300):
+    """Descarga completa de `url`. Retorna (segundos, bytes) o lanza la excepción."""
+    inicio = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=timeout) as respuesta:
+        tamano = len(respuesta.read())
+    return time.perf_counter() - inicio, tamano
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga local: latencia del dashboard mientras se ejecutan "
+        "exportaciones ZIP concurrentes, con gunicorn (WSGI, vistas síncronas) "
+        "frente a uvicorn (ASGI, vistas asíncronas)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servidores', nargs='+', choices=sorted(SERVIDORES), default=['wsgi', 'asgi'])
+        parser.add_argument('--trabajadores', type=int, default=2, help="Workers del servidor.")
+        parser.add_argument('--exportaciones', type=int, default=4,
+                            help="Clientes descargando ZIPs en paralelo durante la medición.")
+        parser.add_argument('--recibos-por-zip', type=int, default=40)
+        parser.add_argument('--duracion', type=float, default=15, help="Segundos de carga por servidor.")
+        parser.add_argument('--crear', type=int, default=0,
+                            help="Crea N recibos de prueba (confirmados) y los elimina al terminar.")
+
+    # --- Servidor ---
+
+    def _arrancar(self, nombre, trabajadores):
+        modulo, argumentos, _ = SERVIDORES[nombre]
+        if importlib.util.find_spec(modulo) is None:
+            self.stdout.write(self.style.WARNING(f"  {modulo} no está instalado: se omite '{nombre}'."))
+            return None, None
+
+        puerto = _puerto_libre()
+        comando = [sys.executable] + [
+            a.format(trabajadores=trabajadores, puerto=puerto) for a in argumentos
+        ]
+        entorno = {**os.environ, 'RECIBOS_ENTREGA_ARTEFACTOS': 'django', 'PYTHONUNBUFFERED': '1'}
+        proceso = subprocess.Popen(
+            comando, cwd=str(settings.BASE_DIR), env=entorno,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+
+        base = f'http://127.0.0.1:{puerto}'
+        limite = time.monotonic() + 60
+        while time.monotonic() < limite:
+            if proceso.poll() is not None:
+                raise RuntimeError(f"'{nombre}' terminó al arrancar:\n{proceso.stderr.read()}")
+            try:
+                _descargar(base + URL_DASHBOARD, timeout=5)
+                return proceso, base
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.3)
+
+        proceso.terminate()
+        raise RuntimeError(f"'{nombre}' no respondió en 60 segundos.")
+
+    def _detener(self, proceso):
+        proceso.terminate()
+        try:
+            proceso.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+    # --- Medición ---
+
+    def _sondear_dashboard(self, base, detener, latencias, errores):
+        while not detener.is_set():
+            try:
+                latencias.append(_descargar(base + URL_DASHBOARD, timeout=60)[0])
+            except Exception:
+                errores.append(1)
+            time.sleep(0.05)
+
+    def _exportar(self, url_zip, pool, por_zip, detener, resultados, errores):
+        while not detener.is_set():
+            # Un subconjunto distinto en cada descarga: no se aprovecha la caché de ZIPs.
+            pks = ','.join(map(str, random.sample(pool, min(por_zip, len(pool)))))
+            try:
+                resultados.append(_descargar(f'{url_zip}?pks={pks}'))
+            except Exception:
+                errores.append(1)
+
+    def _medir(self, base, url_zip, pool, options):
+        # 1. Dashboard en reposo.
+        en_reposo = [_descargar(base + URL_DASHBOARD)[0] for _ in range(20)]
+
+        # 2. Dashboard con exportaciones concurrentes.
+        detener = threading.Event()
+        latencias, exportaciones, errores_dashboard, errores_exportacion = [], [], [], []
+        hilos = [threading.Thread(
+            target=self._sondear_dashboard, args=(base, detener, latencias, errores_dashboard)
+        )]
+        hilos += [
+            threading.Thread(
+                target=self._exportar,
+                args=(base + url_zip, pool, options['recibos_por_zip'], detener, exportaciones, errores_exportacion),
+            )
+            for _ in range(options['exportaciones'])
+        ]
+        for hilo in hilos:
+            hilo.start()
+        time.sleep(options['duracion'])
+        detener.set()
+        for hilo in hilos:
+            hilo.join()
+
+        return en_reposo, latencias, exportaciones, errores_dashboard, errores_exportacion
+
+    def _resumen(self, titulo, tiempos):
+        if len(tiempos) < 2:
+            return f"    {titulo:<26} sin datos suficientes ({len(tiempos)} muestra/s)"
+        p95 = quantiles(tiempos, n=20, method='inclusive')[-1]
+        return (
+            f"    {titulo:<26} p50 {median(tiempos) * 1000:8.1f} ms | p95 {p95 * 1000:8.1f} ms | "
+            f"máx {max(tiempos) * 1000:8.1f} ms | n={len(tiempos)}"
+        )
+
+    def handle(self, *args, **options):
+        creados = []
+        if options['crear']:
+            with usar_primaria():
+                creados = [r.pk for r in crear_recibos_prueba(options['crear'])]
+
+        try:
+            with usar_primaria():
+                pool = list(Recibo.objects.filter(anulado=False).values_list('pk', flat=True))
+            if len(pool) < options['recibos_por_zip']:
+                self.stderr.write(self.style.ERROR(
+                    f"Hay {len(pool)} recibos; use --crear para tener al menos {options['recibos_por_zip']}."
+                ))
+                return
+
+            for nombre in options['servidores']:
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f"\n{nombre.upper()}: {options['trabajadores']} worker(s), "
+                    f"{options['exportaciones']} exportación(es) concurrente(s), {options['duracion']:.0f} s"
+                ))
+                proceso, base = self._arrancar(nombre, options['trabajadores'])
+                if proceso is None:
+                    continue
+                try:
+                    en_reposo, latencias, exportaciones, err_dash, err_exp = self._medir(
+                        base, SERVIDORES[nombre][2], pool, options
+                    )
+                finally:
+                    self._detener(proceso)
+
+                self.stdout.write(self._resumen("Dashboard en reposo", en_reposo))
+                self.stdout.write(self._resumen("Dashboard bajo carga", latencias))
+                self.stdout.write(self._resumen("Exportaciones ZIP", [t for t, _ in exportaciones]))
+                self.stdout.write(
+                    f"    Errores: dashboard {len(err_dash)} | exportaciones {len(err_exp)}"
+                )
+        finally:
+            if creados:
+                with usar_primaria():
+                    Recibo.objects.filter(pk__in=creados).delete()
@@ -0,0 +1,78 @@
+import time
+from statistics import median
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from sistema_gestion.routers import usar_primaria
+from apps.recibos.views import ReciboListView
+from ._datos_prueba import crear_recibos_prueba
+
+CACHE_DESACTIVADA = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el tiempo de render del dashboard sin caché de fragmentos, con "
+        "caché en frío y con caché caliente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--crear', type=int, default=0,
+                            help="Crea N recibos de prueba (se revierten al terminar).")
+        parser.add_argument('--por-pagina', type=int, default=20,
+                            help="Filas por página a renderizar.")
+
+    def _render(self, request, por_pagina):
+        vista = ReciboListView.as_view(paginate_by=por_pagina)
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            vista(request).render()
+            duracion = time.perf_counter() - inicio
+        return duracion, len(consultas)
+
+    def _medir(self, nombre, request, repeticiones, por_pagina, limpiar_cada_vez):
+        tiempos, consultas = [], 0
+        for _ in range(repeticiones):
+            if limpiar_cada_vez:
+                cache.clear()
+            duracion, consultas = self._render(request, por_pagina)
+            tiempos.append(duracion)
+        self.stdout.write(
+            f"  {nombre:<28} mediana {median(tiempos) * 1000:7.2f} ms | "
+            f"mín {min(tiempos) * 1000:7.2f} ms | consultas {consultas}"
+        )
+
+    def handle(self, *args, **options):
+        repeticiones = max(1, options['repeticiones'])
+        por_pagina = options['por_pagina']
+        request = RequestFactory().get('/recibos/')
+        request.user = AnonymousUser()
+
+        # Lecturas en la primaria: los recibos de prueba solo existen en esta transacción.
+        with usar_primaria(), transaction.atomic():
+            if options['crear']:
+                crear_recibos_prueba(options['crear'])
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"Dashboard: {por_pagina} filas por página, {repeticiones} repeticiones"
+            ))
+
+            # Render de plantilla previo para no medir la compilación del template.
+            self._render(request, por_pagina)
+
+            with override_settings(CACHES=CACHE_DESACTIVADA):
+                self._medir("Antes (sin caché)", request, repeticiones, por_pagina, False)
+
+            cache.clear()
+            self._medir("Después (caché en frío)", request, repeticiones, por_pagina, True)
+            self._medir("Después (caché caliente)", request, repeticiones, por_pagina, False)
+
+            transaction.set_rollback(True)
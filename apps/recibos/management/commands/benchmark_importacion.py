@@ -0,0 +1,78 @@
+import io
+import time
+from statistics import median
+
+from django.core.management.base import BaseCommand
+
+from apps.recibos.importacion import COLUMNAS_CANONICAS, leer_csv, leer_hoja, normalizar_hoja
+
+ESTADOS = ['Carabobo', 'Miranda', 'Zulia', 'Lara', 'Distrito Capital']
+
+
+def _filas_sinteticas(cantidad):
+    """Filas con el contenido típico de una planilla de oficina (texto, como en la hoja)."""
+    for i in range(cantidad):
+        fila = {
+            'estado': ESTADOS[i % len(ESTADOS)], 'nombre': f'Contribuyente {i}',
+            'rif_cedula_identidad': f'V-{10000000 + i}', 'direccion_inmueble': 'Av. Principal, Local 1',
+            'ente_liquidado': 'intu', 'gastos_administrativos': '140,00', 'tasa_dia': '36,5000',
+            'total_monto_bs': f'{5000 + i % 900}.{i % 100:02d}', 'numero_transferencia': f'trf{i:08d}',
+            'conciliado': 'si' if i % 4 == 0 else '', 'fecha': f'{1 + i % 28:02d}/{1 + i % 12:02d}/2025',
+            'concepto': 'Pago de regularización',
+        }
+        for n in range(1, 11):
+            fila[f'categoria{n}'] = 'x' if i % (n + 1) == 0 else ''
+        yield fila
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la lectura de una misma planilla en XLSX (pd.read_excel/openpyxl) "
+        "y en CSV (leer_csv, motor C): lectura sola y lectura + normalización."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=20_000)
+        parser.add_argument('--repeticiones', type=int, default=3)
+
+    def _generar(self, filas):
+        import pandas as pd
+
+        df = pd.DataFrame(list(_filas_sinteticas(filas)), columns=COLUMNAS_CANONICAS)
+        xlsx = io.BytesIO()
+        # Mismo formato de la carga: hoja 'Hoja2' con el encabezado en la fila 4.
+        df.to_excel(xlsx, sheet_name='Hoja2', startrow=3, index=False)
+        csv = df.to_csv(index=False, sep=';').encode('utf-8')
+        return xlsx.getvalue(), csv
+
+    def _medir(self, funcion, contenido, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = funcion(io.BytesIO(contenido))
+            tiempos.append(time.perf_counter() - inicio)
+        return median(tiempos), resultado
+
+    def handle(self, *args, **options):
+        repeticiones = max(1, options['repeticiones'])
+        xlsx, csv = self._generar(options['filas'])
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{options['filas']} filas | XLSX {len(xlsx) / 1024:.0f} KB | CSV {len(csv) / 1024:.0f} KB | "
+            f"mediana de {repeticiones} repeticiones"
+        ))
+
+        resultados = {}
+        for formato, lector, contenido in (('XLSX', leer_hoja, xlsx), ('CSV', leer_csv, csv)):
+            lectura, _ = self._medir(lector, contenido, repeticiones)
+            total, filas = self._medir(lambda archivo: normalizar_hoja(lector(archivo)), contenido, repeticiones)
+            resultados[formato] = (lectura, total)
+            self.stdout.write(
+                f"  {formato:<5} lectura {lectura:7.3f} s | lectura + normalización {total:7.3f} s | "
+                f"{len(filas)} recibos"
+            )
+
+        (lectura_xlsx, total_xlsx), (lectura_csv, total_csv) = resultados['XLSX'], resultados['CSV']
+        self.stdout.write(self.style.SUCCESS(
+            f"  CSV: lectura {lectura_xlsx / lectura_csv:.1f}x más rápida; "
+            f"importación (sin inserción) {total_xlsx / total_csv:.1f}x más rápida."
+        ))
@@ -0,0 +1,170 @@
+import argparse
+import gc
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.recibos.importacion import COLUMNAS_CANONICAS
+from apps.recibos.management.commands.benchmark_importacion import ESTADOS, _filas_sinteticas
+
+PIPELINES = ('importacion', 'reporte_excel', 'reporte_pdf')
+
+
+def _reiniciar_pico():
+    """
+    Lleva el pico de RSS (VmHWM) al RSS actual, para no medir el pico del
+    arranque. Solo en Linux; en otros sistemas el pico incluye el arranque.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as archivo:
+            archivo.write('5')
+    except OSError:
+        pass
+
+
+def _memoria_kb():
+    """(RSS actual, pico de RSS) en KB, de /proc/self/status o, sin /proc, de ru_maxrss."""
+    try:
+        with open('/proc/self/status') as archivo:
+            datos = dict(linea.split(':', 1) for linea in archivo if ':' in linea)
+        return int(datos['VmRSS'].split()[0]), int(datos['VmHWM'].split()[0])
+    except (OSError, KeyError):
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico, pico
+
+
+def _recibos_sinteticos(cantidad):
+    """Recibos sin guardar, como los que materializa el ORM para un reporte."""
+    from apps.recibos.models import Recibo
+
+    return [
+        Recibo(
+            numero_recibo=i + 1, estado=ESTADOS[i % len(ESTADOS)].upper(), nombre=f'Contribuyente {i}',
+            rif_cedula_identidad=f'V{10000000 + i}', direccion_inmueble='Av. Principal, Local 1',
+            ente_liquidado='Intu', gastos_administrativos=Decimal('140.00'), tasa_dia=Decimal('36.5000'),
+            total_monto_bs=Decimal('5110.00'), numero_transferencia=f'TRF{i:08d}',
+            fecha=date(2025, 1 + i % 12, 1 + i % 28), concepto='Pago De Regularización',
+            **{f'categoria{n}': i % (n + 1) == 0 for n in range(1, 11)},
+        )
+        for i in range(cantidad)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el pico de RSS de la importación y de los reportes Excel/PDF según la "
+        "cantidad de filas. Cada medición corre en un proceso nuevo; con --etapas, "
+        "además, la memoria de cada etapa según tracemalloc."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, nargs='+', default=[1_000, 5_000, 20_000])
+        parser.add_argument('--pipelines', nargs='+', choices=PIPELINES, default=list(PIPELINES))
+        parser.add_argument('--etapas', action='store_true',
+                            help="Activa RECIBOS_PERFIL_MEMORIA en los procesos medidos (más lento).")
+        # Uso interno: proceso hijo que ejecuta una sola medición.
+        parser.add_argument('--hijo', choices=PIPELINES, help=argparse.SUPPRESS)
+        parser.add_argument('--archivo', help=argparse.SUPPRESS)
+
+    # I. PROCESO HIJO
+
+    def _medir_hijo(self, pipeline, filas, archivo, etapas):
+        from apps.recibos.memoria import etapa_memoria, informe_memoria
+
+        settings.RECIBOS_PERFIL_MEMORIA = etapas
+        # Carga los módulos antes de la línea base: se mide el trabajo, no el import.
+        from apps.recibos.importacion import preparar_archivo
+        from apps.recibos.reportes import construir_pdf_reporte, construir_reporte_excel
+
+        gc.collect()
+        _reiniciar_pico()
+        base_kb = _memoria_kb()[0]
+        inicio = time.perf_counter()
+        with informe_memoria() as informe:
+            if pipeline == 'importacion':
+                with open(archivo, 'rb') as libro:
+                    cantidad = len(preparar_archivo(libro, 'benchmark.xlsx'))
+            else:
+                # Los recibos en memoria reemplazan la lectura del ORM (sin base de datos).
+                with etapa_memoria('benchmark.recibos_sinteticos'):
+                    recibos = _recibos_sinteticos(filas)
+                construir = construir_reporte_excel if pipeline == 'reporte_excel' else construir_pdf_reporte
+                construir(recibos, {}, io.BytesIO())
+                cantidad = len(recibos)
+        resultado = {
+            'filas': cantidad, 'segundos': time.perf_counter() - inicio,
+            'base_kb': base_kb, 'pico_kb': _memoria_kb()[1], 'etapas': informe,
+        }
+        self.stdout.write('BENCH_JSON=' + json.dumps(resultado))
+
+    # II. PROCESO PRINCIPAL
+
+    def _generar_libro(self, filas, directorio):
+        import pandas as pd
+
+        ruta = os.path.join(directorio, f'libro_{filas}.xlsx')
+        df = pd.DataFrame(list(_filas_sinteticas(filas)), columns=COLUMNAS_CANONICAS)
+        df.to_excel(ruta, sheet_name='Hoja2', startrow=3, index=False)
+        return ruta
+
+    def _ejecutar(self, pipeline, filas, archivo, etapas):
+        comando = [
+            sys.executable, 'manage.py', 'benchmark_memoria', '--hijo', pipeline, '--filas', str(filas),
+            '--archivo', archivo or '',
+        ]
+        if etapas:
+            comando.append('--etapas')
+        proceso = subprocess.run(
+            comando, cwd=str(settings.BASE_DIR), capture_output=True, text=True,
+        )
+        if proceso.returncode != 0:
+            raise CommandError(f"Falló la medición de {pipeline} con {filas} filas:\n{proceso.stderr[-2000:]}")
+        linea = next(l for l in proceso.stdout.splitlines() if l.startswith('BENCH_JSON='))
+        return json.loads(linea.split('=', 1)[1])
+
+    def handle(self, *args, **options):
+        if options['hijo']:
+            self._medir_hijo(options['hijo'], options['filas'][0], options['archivo'], options['etapas'])
+            return
+
+        tamanios = sorted(set(options['filas']))
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Pico de RSS por cantidad de filas (un proceso por medición): {', '.join(map(str, tamanios))}"
+        ))
+        with tempfile.TemporaryDirectory() as directorio:
+            libros = {}
+            if 'importacion' in options['pipelines']:
+                libros = {filas: self._generar_libro(filas, directorio) for filas in tamanios}
+
+            for pipeline in options['pipelines']:
+                self.stdout.write(self.style.MIGRATE_LABEL(f"\n{pipeline}"))
+                puntos = []
+                for filas in tamanios:
+                    r = self._ejecutar(pipeline, filas, libros.get(filas), options['etapas'])
+                    delta_mb = (r['pico_kb'] - r['base_kb']) / 1024
+                    puntos.append((filas, delta_mb))
+                    self.stdout.write(
+                        f"  {filas:>8} filas | {r['segundos']:7.2f} s | RSS base {r['base_kb'] / 1024:7.1f} MB | "
+                        f"pico {r['pico_kb'] / 1024:7.1f} MB | +{delta_mb:7.1f} MB"
+                    )
+                    for etapa in r['etapas']:
+                        principal = etapa['sitios'][0]['sitio'] if etapa['sitios'] else '-'
+                        self.stdout.write(
+                            f"      {etapa['etapa']:<32} pico {etapa['pico_mb']:8.1f} MB | "
+                            f"neto {etapa['neto_mb']:8.1f} MB | {principal}"
+                        )
+
+                if len(puntos) > 1 and puntos[-1][0] > puntos[0][0]:
+                    (filas_min, mb_min), (filas_max, mb_max) = puntos[0], puntos[-1]
+                    pendiente = (mb_max - mb_min) / (filas_max - filas_min) * 10_000
+                    self.stdout.write(self.style.SUCCESS(f"  ~{pendiente:.1f} MB de RSS por cada 10.000 filas"))
@@ -0,0 +1,164 @@
+import json
+import time
+from datetime import date
+from statistics import median
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.recibos.particiones import es_postgresql, limites_particion
+
+ESQUEMA = 'benchmark_particiones'
+
+# Columnas que intervienen en los filtros del dashboard y de los reportes.
+COLUMNAS = """
+    id bigint NOT NULL,
+    numero_recibo integer,
+    fecha date NOT NULL,
+    anulado boolean NOT NULL,
+    estado varchar(100) NOT NULL,
+    nombre varchar(255) NOT NULL,
+    rif_cedula_identidad varchar(50) NOT NULL,
+    total_monto_bs numeric(15, 2) NOT NULL
+"""
+
+# Mismos índices que define el modelo Recibo.
+INDICES = [
+    "CREATE INDEX ON {tabla} (fecha DESC, numero_recibo DESC) WHERE NOT anulado",
+    "CREATE INDEX ON {tabla} (estado)",
+    "CREATE INDEX ON {tabla} (nombre)",
+    "CREATE INDEX ON {tabla} (rif_cedula_identidad)",
+    "CREATE INDEX ON {tabla} (numero_recibo)",
+]
+
+# Filas sintéticas: `fecha` repartida uniformemente en el rango de años.
+SQL_FILAS = """
+    SELECT n, n, %s::date + (random() * (%s::date - %s::date))::int, random() < 0.05,
+           (ARRAY['CARABOBO','MIRANDA','ZULIA','LARA','DISTRITO CAPITAL'])[1 + n %% 5],
+           'CLIENTE ' || md5(n::text), 'V' || (10000000 + n), (random() * 1000)::numeric(15, 2)
+    FROM generate_series(%s, %s) AS n
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara recibos_pago particionada por año frente a la tabla sin particionar "
+        "sobre tablas sintéticas en un esquema aparte (no toca los datos reales): "
+        "carga masiva, página del dashboard, reporte mensual y búsqueda en un año."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=1_000_000)
+        parser.add_argument('--anios', type=int, default=5, help="Años de historia de las filas sintéticas.")
+        parser.add_argument('--carga', type=int, default=50_000, help="Filas de la carga masiva medida.")
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def _preparar(self, cursor, primer_anio, ultimo_anio, filas):
+        cursor.execute(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
+        cursor.execute(f"CREATE SCHEMA {ESQUEMA}")
+        cursor.execute(f"CREATE TABLE {ESQUEMA}.plana ({COLUMNAS}, PRIMARY KEY (id))")
+        cursor.execute(
+            f"CREATE TABLE {ESQUEMA}.particionada ({COLUMNAS}, PRIMARY KEY (id, fecha)) "
+            f"PARTITION BY RANGE (fecha)"
+        )
+        for anio in range(primer_anio, ultimo_anio + 2):
+            desde, hasta = limites_particion(anio)
+            cursor.execute(
+                f"CREATE TABLE {ESQUEMA}.particionada_{anio} PARTITION OF {ESQUEMA}.particionada "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [desde, hasta],
+            )
+
+        inicio, fin = date(primer_anio, 1, 1), date(ultimo_anio, 12, 31)
+        for tabla in ('plana', 'particionada'):
+            for indice in INDICES:
+                cursor.execute(indice.format(tabla=f'{ESQUEMA}.{tabla}'))
+            cursor.execute(
+                f"INSERT INTO {ESQUEMA}.{tabla} {SQL_FILAS}", [inicio, fin, inicio, 1, filas]
+            )
+            cursor.execute(f"ANALYZE {ESQUEMA}.{tabla}")
+
+    def _carga(self, cursor, tabla, desde_id, cantidad, anio):
+        """Carga masiva de un lote del año en curso (mantenimiento de índices incluido)."""
+        inicio, fin = limites_particion(anio)
+        comienzo = time.perf_counter()
+        cursor.execute(
+            f"INSERT INTO {ESQUEMA}.{tabla} {SQL_FILAS}",
+            [inicio, fin, inicio, desde_id, desde_id + cantidad - 1],
+        )
+        return time.perf_counter() - comienzo
+
+    def _explicar(self, cursor, sql, params, repeticiones):
+        """Mediana del Execution Time y cantidad de tablas/particiones recorridas."""
+        tiempos, relaciones = [], set()
+        for _ in range(repeticiones):
+            cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            tiempos.append(plan[0]['Execution Time'])
+
+            pendientes = [plan[0]['Plan']]
+            while pendientes:
+                nodo = pendientes.pop()
+                if 'Relation Name' in nodo:
+                    relaciones.add(nodo['Relation Name'])
+                pendientes.extend(nodo.get('Plans', []))
+        return median(tiempos), len(relaciones)
+
+    def handle(self, *args, **options):
+        if not es_postgresql(connection):
+            raise CommandError("Este benchmark requiere PostgreSQL.")
+
+        ultimo_anio = date.today().year
+        primer_anio = ultimo_anio - max(1, options['anios']) + 1
+        mes_inicio, mes_fin = date(ultimo_anio, 1, 1), date(ultimo_anio, 1, 31)
+        anio_inicio, anio_fin = date(ultimo_anio - 1, 1, 1), date(ultimo_anio - 1, 12, 31)
+
+        consultas = [
+            ("Dashboard (mes, 25 filas)",
+             "SELECT * FROM {tabla} WHERE NOT anulado AND fecha BETWEEN %s AND %s "
+             "ORDER BY fecha DESC, numero_recibo DESC LIMIT 25",
+             [mes_inicio, mes_fin]),
+            ("Reporte mensual (total)",
+             "SELECT count(*), sum(total_monto_bs) FROM {tabla} "
+             "WHERE NOT anulado AND fecha BETWEEN %s AND %s",
+             [mes_inicio, mes_fin]),
+            ("Búsqueda icontains (1 año)",
+             "SELECT id FROM {tabla} WHERE NOT anulado AND fecha BETWEEN %s AND %s "
+             "AND UPPER(nombre) LIKE UPPER(%s)",
+             [anio_inicio, anio_fin, '%ab12%']),
+            ("Página sin filtro de fecha",
+             "SELECT * FROM {tabla} WHERE NOT anulado ORDER BY fecha DESC, numero_recibo DESC LIMIT 25",
+             []),
+        ]
+
+        self.stdout.write(
+            f"Preparando {options['filas']} filas ({primer_anio}-{ultimo_anio}) en el esquema {ESQUEMA}..."
+        )
+        try:
+            with connection.cursor() as cursor:
+                self._preparar(cursor, primer_anio, ultimo_anio, options['filas'])
+
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f"\n{'Consulta':<30} {'Sin particionar':>22} {'Particionada':>22}"
+                ))
+                for titulo, sql, params in consultas:
+                    resultados = [
+                        self._explicar(cursor, sql.format(tabla=f'{ESQUEMA}.{tabla}'), params, options['repeticiones'])
+                        for tabla in ('plana', 'particionada')
+                    ]
+                    columnas = [f"{ms:9.2f} ms ({n} tabla/s)" for ms, n in resultados]
+                    self.stdout.write(f"{titulo:<30} {columnas[0]:>22} {columnas[1]:>22}")
+
+                siguiente_id = options['filas'] + 1
+                cargas = []
+                for tabla in ('plana', 'particionada'):
+                    cargas.append(self._carga(cursor, tabla, siguiente_id, options['carga'], ultimo_anio))
+                    siguiente_id += options['carga']
+                self.stdout.write(
+                    f"{'Carga de ' + str(options['carga']) + ' filas':<30} "
+                    f"{cargas[0] * 1000:>19.0f} ms {cargas[1] * 1000:>19.0f} ms"
+                )
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
@@ -0,0 +1,70 @@
+import io
+import time
+from statistics import median
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from sistema_gestion.routers import usar_primaria
+from apps.recibos.models import Recibo
+from ._datos_prueba import crear_recibos_prueba
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara tamaño y tiempo de generación de la descarga masiva como ZIP de "
+        "PDFs individuales frente a un único PDF multipágina."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cantidad', type=int, default=100,
+                            help="Recibos por lote (se crean si no hay suficientes y se revierten).")
+        parser.add_argument('--repeticiones', type=int, default=3)
+
+    def _medir(self, funcion, recibos, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            contenido, generados = funcion(recibos)
+            tiempos.append(time.perf_counter() - inicio)
+        return median(tiempos), len(contenido), generados
+
+    def handle(self, *args, **options):
+        from apps.recibos.pdf_recibos import construir_pdf_lote, construir_zip_recibos
+
+        cantidad = max(1, options['cantidad'])
+        repeticiones = max(1, options['repeticiones'])
+
+        with usar_primaria(), transaction.atomic():
+            recibos = list(Recibo.objects.order_by('numero_recibo')[:cantidad])
+            if len(recibos) < cantidad:
+                recibos += crear_recibos_prueba(cantidad - len(recibos))
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"Lote de {len(recibos)} recibos, mediana de {repeticiones} repeticiones"
+            ))
+
+            # Primera generación fuera de la medición: carga de fuentes e imagen.
+            construir_pdf_lote(recibos[:1])
+
+            def zip_en_memoria(recibos):
+                buffer = io.BytesIO()
+                generados = construir_zip_recibos(recibos, buffer)
+                return buffer.getvalue(), generados
+
+            resultados = (
+                ("ZIP de PDFs individuales", self._medir(zip_en_memoria, recibos, repeticiones)),
+                ("PDF único multipágina", self._medir(construir_pdf_lote, recibos, repeticiones)),
+            )
+            for nombre, (segundos, tamano, generados) in resultados:
+                self.stdout.write(
+                    f"  {nombre:<26} {segundos * 1000:8.1f} ms | {tamano / 1024:9.1f} KB | "
+                    f"{tamano / max(generados, 1) / 1024:6.1f} KB/recibo"
+                )
+
+            (t_zip, b_zip, _), (t_pdf, b_pdf, _) = (r for _, r in resultados)
+            self.stdout.write(self.style.SUCCESS(
+                f"  PDF único: {t_zip / t_pdf:.1f}x más rápido, {b_zip / b_pdf:.1f}x más pequeño."
+            ))
+
+            transaction.set_rollback(True)
@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sistema_gestion.routers import usar_primaria
+from apps.recibos.tasas import guardar_tasas, leer_tasas_csv, tasas_desde_recibos
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga la tabla de tasas BCV desde un CSV (fecha;tasa) o, con "
+        "--desde-recibos, con la tasa más repetida de cada fecha en los recibos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', nargs='?', help="CSV de dos columnas: fecha (dd/mm/aaaa o ISO) y tasa.")
+        parser.add_argument('--desde-recibos', action='store_true',
+                            help="Siembra la tabla a partir de la tasa_dia de los recibos existentes.")
+        parser.add_argument('--conservar', action='store_true',
+                            help="No reemplaza las tasas de las fechas que ya están registradas.")
+
+    def handle(self, *args, **options):
+        if bool(options['archivo']) == options['desde_recibos']:
+            raise CommandError("Indique un archivo CSV o --desde-recibos (solo uno).")
+
+        with usar_primaria():
+            if options['desde_recibos']:
+                tasas = tasas_desde_recibos()
+            else:
+                try:
+                    tasas = leer_tasas_csv(Path(options['archivo']).read_bytes())
+                except (OSError, ValueError) as e:
+                    raise CommandError(str(e))
+            cargadas = guardar_tasas(tasas, reemplazar=not options['conservar'])
+
+        if tasas:
+            self.stdout.write(f"  Fechas: {min(tasas):%d/%m/%Y} a {max(tasas):%d/%m/%Y}")
+        self.stdout.write(self.style.SUCCESS(f"{cargadas} tasa(s) procesadas."))
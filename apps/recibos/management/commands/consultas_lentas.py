@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.recibos.consultas_lentas import archivos_registro, leer_registros, resumir
+
+
+class Command(BaseCommand):
+    help = (
+        "Resume el registro de consultas lentas (RECIBOS_CONSULTAS_LENTAS_ARCHIVO y sus "
+        "respaldos): las consultas con mayor tiempo total, las vistas que las originan y su plan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help="Consultas a mostrar (por defecto 10).")
+        parser.add_argument('--horas', type=float, help="Solo los registros de las últimas N horas.")
+        parser.add_argument('--plan', action='store_true', help="Muestra el plan de la ejecución más lenta.")
+
+    def handle(self, *args, **options):
+        archivos = archivos_registro()
+        if not archivos:
+            self.stdout.write("No hay consultas lentas registradas.")
+            return
+
+        desde = timezone.now() - timedelta(hours=options['horas']) if options['horas'] else None
+        grupos = resumir(leer_registros(desde))
+        total_ms = sum(grupo['total_ms'] for grupo in grupos)
+        self.stdout.write(
+            f"{sum(grupo['veces'] for grupo in grupos)} consultas lentas, {len(grupos)} distintas, "
+            f"{total_ms / 1000:.1f} s en total ({len(archivos)} archivo(s))."
+        )
+
+        for posicion, grupo in enumerate(grupos[:options['top']], start=1):
+            origenes = ', '.join(
+                f'{origen} ({veces})'
+                for origen, veces in sorted(grupo['origenes'].items(), key=lambda item: -item[1])[:3]
+            )
+            self.stdout.write(self.style.WARNING(
+                f"\n{posicion}. {grupo['total_ms'] / 1000:.2f} s total | {grupo['veces']} veces | "
+                f"media {grupo['total_ms'] / grupo['veces']:.0f} ms | máx {grupo['max_ms']:.0f} ms"
+            ))
+            self.stdout.write(f"   Origen: {origenes}")
+            self.stdout.write(f"   SQL: {grupo['huella'][:500]}")
+            if options['plan'] and grupo['plan']:
+                for linea in grupo['plan'].splitlines():
+                    self.stdout.write(f"     {linea}")
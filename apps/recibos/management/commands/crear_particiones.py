@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.recibos.particiones import (
+    convertir_a_particionada,
+    crear_particiones_futuras,
+    es_postgresql,
+    listar_particiones,
+    tabla_particionada,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea por adelantado las particiones anuales de recibos_pago (año actual "
+        "y los siguientes). Con --convertir particiona primero la tabla si la "
+        "migración se aplicó con RECIBOS_PARTICIONAR_POR_ANIO desactivado. "
+        "Pensado para ejecutarse desde cron, por ejemplo cada diciembre."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anios', type=int, default=settings.RECIBOS_PARTICIONES_ANTICIPADAS,
+                            help="Años futuros que deben tener partición.")
+        parser.add_argument('--convertir', action='store_true',
+                            help="Convierte recibos_pago en tabla particionada si aún no lo es.")
+
+    def handle(self, *args, **options):
+        if not es_postgresql(connection):
+            raise CommandError("El particionado de recibos_pago solo está disponible en PostgreSQL.")
+
+        with connection.cursor() as cursor:
+            particionada = tabla_particionada(cursor)
+
+        if not particionada:
+            if not options['convertir']:
+                raise CommandError("recibos_pago no está particionada. Use --convertir para particionarla.")
+            self.stdout.write("Convirtiendo recibos_pago en tabla particionada por año...")
+            with transaction.atomic():
+                convertir_a_particionada(connection, options['anios'])
+
+        with connection.cursor() as cursor:
+            creadas = crear_particiones_futuras(cursor, max(0, options['anios']))
+            particiones = listar_particiones(cursor)
+
+        for nombre in creadas:
+            self.stdout.write(self.style.SUCCESS(f"  Partición creada: {nombre}"))
+        for nombre, limites, filas in particiones:
+            self.stdout.write(f"  {nombre:<24} {limites:<60} ~{max(filas, 0)} filas")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(creadas)} partición(es) nueva(s); {len(particiones)} en total."
+        ))
@@ -0,0 +1,42 @@
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sistema_gestion.routers import usar_primaria
+from apps.recibos.importacion import ErrorImportacion, importar_varios_archivos
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa uno o varios libros 'Hoja2' (.xlsx o ZIP con varios libros). Los "
+        "libros se leen en paralelo (RECIBOS_IMPORTACION_PROCESOS) y cada uno recibe "
+        "un bloque contiguo de números de recibo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivos', nargs='+', help="Rutas de los .xlsx o .zip.")
+        parser.add_argument('--por-archivo', action='store_true',
+                            help="Una transacción por archivo (por defecto, todo o nada).")
+        parser.add_argument('--procesos', type=int, help="Procesos de lectura (1 = secuencial).")
+
+    def handle(self, *args, **options):
+        try:
+            with ExitStack() as pila, usar_primaria():
+                subidos = [pila.enter_context(open(ruta, 'rb')) for ruta in options['archivos']]
+                resumen = importar_varios_archivos(
+                    subidos, atomico=not options['por_archivo'], procesos=options['procesos'],
+                )
+        except (OSError, ErrorImportacion) as e:
+            raise CommandError(str(e))
+
+        for archivo in resumen['archivos']:
+            if archivo['creados']:
+                detalle = f"{archivo['creados']:>6} recibos  N°{archivo['desde']}-{archivo['hasta']}"
+            else:
+                detalle = archivo['error'] or 'sin registros válidos'
+            self.stdout.write(f"  {archivo['nombre']:<30} {archivo['segundos']:>6.2f} s  {detalle}")
+
+        estilo = self.style.SUCCESS if resumen['exito'] else self.style.WARNING
+        self.stdout.write(estilo(
+            f"{len(resumen['pks'])} recibos de {len(resumen['archivos'])} archivos en {resumen['segundos']} s."
+        ))
@@ -0,0 +1,67 @@
+import calendar
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from apps.recibos.cache_reportes import FORMATOS_REPORTE, obtener_reporte
+from apps.recibos.models import Recibo
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera por adelantado los reportes mensuales más usados (mes en curso y "
+        "anteriores) para que las primeras descargas del día salgan de la caché. "
+        "Solo los reportes generados necesitan almacenamiento compartido: se "
+        "guardan en RECIBOS_ARTEFACTOS_DIR, que debe ser el mismo de los workers. "
+        "La versión de los datos se lee de la base de datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=2,
+                            help="Cantidad de meses a precalentar, contando el actual.")
+        parser.add_argument('--formatos', nargs='+', choices=sorted(FORMATOS_REPORTE),
+                            default=sorted(FORMATOS_REPORTE))
+        parser.add_argument('--por-estado', action='store_true',
+                            help="Además del reporte general, uno por cada estado con recibos.")
+
+    def _meses(self, cantidad):
+        hoy = date.today()
+        anio, mes = hoy.year, hoy.month
+        for _ in range(cantidad):
+            ultimo_dia = calendar.monthrange(anio, mes)[1]
+            yield date(anio, mes, 1), date(anio, mes, ultimo_dia)
+            anio, mes = (anio - 1, 12) if mes == 1 else (anio, mes - 1)
+
+    def handle(self, *args, **options):
+        estados = ['']
+        if options['por_estado']:
+            estados += list(
+                Recibo.objects.filter(anulado=False)
+                .values_list('estado', flat=True).distinct().order_by('estado')
+            )
+
+        generados, en_cache = 0, 0
+        for inicio, fin in self._meses(max(1, options['meses'])):
+            for estado in estados:
+                params = {
+                    'fecha_inicio': inicio.isoformat(),
+                    'fecha_fin': fin.isoformat(),
+                    'estado': estado,
+                }
+                for accion in options['formatos']:
+                    comienzo = time.perf_counter()
+                    ruta, recibos_filtrados = obtener_reporte(accion, params)
+                    duracion = (time.perf_counter() - comienzo) * 1000
+
+                    descripcion = f"{inicio:%Y-%m} {estado or 'Todos los estados'} [{accion}]"
+                    if recibos_filtrados is None:
+                        en_cache += 1
+                        self.stdout.write(f"  {descripcion:<45} ya en caché")
+                    else:
+                        generados += 1
+                        self.stdout.write(f"  {descripcion:<45} generado en {duracion:7.1f} ms")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reportes precalentados: {generados} generado(s), {en_cache} ya estaban en caché."
+        ))
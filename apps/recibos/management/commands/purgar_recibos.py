@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sistema_gestion.routers import usar_primaria
+from apps.recibos.purga import FILAS_POR_LOTE, PurgaEnCurso, PurgaNoReanudable, ejecutar_purga, estado_purga
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina TODOS los recibos (equivalente a la acción 'clear_logs' del "
+        "dashboard): respalda la tabla en RECIBOS_RESPALDOS_DIR (CSV gzip) y luego "
+        "la vacía con TRUNCATE (PostgreSQL) o con DELETE por lotes. Con --reanudar "
+        "termina una purga por lotes interrumpida, sin volver a respaldar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metodo', choices=['auto', 'truncate', 'lotes'], default='auto')
+        parser.add_argument('--lote', type=int, default=FILAS_POR_LOTE, help="Filas por lote de respaldo y borrado.")
+        parser.add_argument('--estado', action='store_true',
+                            help="Muestra el estado de la última purga (también la del dashboard).")
+        parser.add_argument('--reanudar', action='store_true',
+                            help="Termina de borrar las filas ya respaldadas por una purga interrumpida.")
+        parser.add_argument('--si', action='store_true', help="No pedir confirmación.")
+
+    def _progreso(self, fase, filas, total=None):
+        total_str = f"/{total}" if total else ''
+        self.stdout.write(f"\r  {fase:<12} {filas}{total_str} filas", ending='')
+        self.stdout.flush()
+
+    def handle(self, *args, **options):
+        if options['estado']:
+            estado = estado_purga()
+            if not estado:
+                self.stdout.write("No se ha ejecutado ninguna purga.")
+            for clave, valor in estado.items():
+                self.stdout.write(f"  {clave:<10} {valor}")
+            return
+
+        if not options['si'] and not options['reanudar']:
+            respuesta = input("Se eliminarán TODOS los recibos (previo respaldo). Escriba 'si' para continuar: ")
+            if respuesta.strip().lower() not in ('si', 'sí'):
+                self.stdout.write("Cancelado.")
+                return
+
+        try:
+            with usar_primaria():
+                resultado = ejecutar_purga(
+                    options['metodo'], progreso=self._progreso, lote=max(1, options['lote']),
+                    reanudar=options['reanudar'],
+                )
+        except (PurgaEnCurso, PurgaNoReanudable, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['eliminadas']} recibo(s) eliminados con '{resultado['metodo']}' en "
+            f"{resultado['segundos']} s. Respaldo: {resultado['respaldo']}"
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from sistema_gestion.routers import usar_primaria
+from apps.recibos.contribuyentes import CONTRIBUYENTES_POR_LOTE, rellenar_contribuyentes
+
+
+class Command(BaseCommand):
+    help = (
+        "Vincula por lotes los recibos sin contribuyente (o cuyo RIF normalizado ya "
+        "no coincide) y recalcula los totales de todos los contribuyentes (la "
+        "migración 0007 ya lo hace; útil tras modificar recibos con UPDATE directo "
+        "o queryset.update(), después de rellenar_busqueda)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=CONTRIBUYENTES_POR_LOTE * 4)
+
+    def _progreso(self, ultimo_id, vinculados):
+        self.stdout.write(f"\r  hasta id {ultimo_id}: {vinculados} recibos vinculados", ending='')
+        self.stdout.flush()
+
+    def handle(self, *args, **options):
+        with usar_primaria():
+            vinculados = rellenar_contribuyentes(lote=max(1, options['lote']), progreso=self._progreso)
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f"{vinculados} recibo(s) vinculados; totales recalculados."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from sistema_gestion.routers import usar_primaria
+from apps.recibos.busqueda import FILAS_POR_LOTE_NORMALIZACION, rellenar_campos_busqueda
+from apps.recibos.models import Recibo
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula por lotes las columnas de búsqueda nombre_normalizado y "
+        "rif_normalizado de todos los recibos (la migración 0006 ya lo hace; útil "
+        "tras modificar recibos con UPDATE directo o queryset.update())."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=FILAS_POR_LOTE_NORMALIZACION)
+
+    def _progreso(self, ultimo_id, actualizadas):
+        self.stdout.write(f"\r  hasta id {ultimo_id}: {actualizadas} filas actualizadas", ending='')
+        self.stdout.flush()
+
+    def handle(self, *args, **options):
+        with usar_primaria():
+            actualizadas = rellenar_campos_busqueda(Recibo, lote=max(1, options['lote']), progreso=self._progreso)
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f"{actualizadas} recibo(s) actualizados."))
@@ -0,0 +1,67 @@
+import csv
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q, Sum
+
+from sistema_gestion.routers import usar_primaria
+from apps.recibos.filtros import parsear_fecha
+from apps.recibos.models import Recibo
+from apps.recibos.tasas import discrepancias_montos, recibos_con_tasa_bcv
+
+COLUMNAS = ['numero_recibo', 'fecha', 'nombre', 'gastos_administrativos', 'tasa_dia', 'tasa_bcv',
+            'total_monto_bs', 'monto_esperado', 'diferencia']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el total de cada recibo vigente con gastos_administrativos x tasa "
+        "BCV de su fecha (una sola consulta) y lista los que difieren."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help="Fecha inicial (AAAA-MM-DD).")
+        parser.add_argument('--hasta', help="Fecha final (AAAA-MM-DD).")
+        parser.add_argument('--tolerancia', type=Decimal, default=Decimal('0.01'),
+                            help="Diferencia máxima aceptada en Bs (por defecto 0.01).")
+        parser.add_argument('--limite', type=int, default=50, help="Discrepancias a mostrar en pantalla.")
+        parser.add_argument('--csv', help="Escribe todas las discrepancias en este archivo CSV.")
+
+    def handle(self, *args, **options):
+        queryset = Recibo.objects.filter(anulado=False)
+        for opcion, lookup in (('desde', 'fecha__gte'), ('hasta', 'fecha__lte')):
+            if options[opcion]:
+                fecha = parsear_fecha(options[opcion])
+                if fecha is None:
+                    raise CommandError(f"Fecha inválida en --{opcion}: {options[opcion]}")
+                queryset = queryset.filter(**{lookup: fecha})
+
+        with usar_primaria():
+            resumen = recibos_con_tasa_bcv(queryset).aggregate(
+                total=Count('pk'), sin_tasa=Count('pk', filter=Q(tasa_bcv__isnull=True)),
+            )
+            discrepancias = discrepancias_montos(options['tolerancia'], queryset).values_list(*COLUMNAS)
+            agregado = discrepancias.aggregate(cantidad=Count('pk'), suma=Sum('diferencia'))
+
+            self.stdout.write(
+                f"Recibos revisados: {resumen['total']} ({resumen['sin_tasa']} sin tasa BCV para su fecha)."
+            )
+            for fila in discrepancias[:max(0, options['limite'])]:
+                numero, fecha, nombre, gastos, tasa, tasa_bcv, total, esperado, diferencia = fila
+                self.stdout.write(
+                    f"  N°{str(numero).zfill(4)}  {fecha:%d/%m/%Y}  {nombre[:30]:<30}  "
+                    f"tasa {tasa} (BCV {tasa_bcv})  total {total}  esperado {esperado}  dif {diferencia}"
+                )
+
+            if options['csv']:
+                with open(options['csv'], 'w', newline='', encoding='utf-8') as archivo:
+                    escritor = csv.writer(archivo)
+                    escritor.writerow(COLUMNAS)
+                    escritor.writerows(discrepancias.iterator(chunk_size=2000))
+                self.stdout.write(f"  Detalle completo en {options['csv']}")
+
+        estilo = self.style.WARNING if agregado['cantidad'] else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f"{agregado['cantidad']} recibo(s) con diferencia mayor a {options['tolerancia']} Bs "
+            f"(suma de diferencias: {agregado['suma'] or 0} Bs)."
+        ))
@@ -0,0 +1,144 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils import timezone
+
+from .admision import _metricas_bloqueadas, fcntl
+
+logger = logging.getLogger(__name__)
+
+# PERFIL DE MEMORIA POR ETAPA (tracemalloc)
+# Con RECIBOS_PERFIL_MEMORIA=True, cada etapa nombrada de la importación y de
+# los reportes (etapa_memoria) registra:
+#   - pico_mb: memoria de Python máxima alcanzada durante la etapa, por encima
+#     de la que había al empezar (incluye las etapas anidadas).
+#   - neto_mb: memoria que la etapa deja retenida al terminar.
+#   - sitios: las líneas que más memoria retienen al terminar (comparación de
+#     snapshots de tracemalloc).
+# Los resultados van al log, a las métricas compartidas entre procesos
+# (metricas_memoria(), incluidas en /recibos/operaciones-pesadas/) y a
+# informe_memoria(), que usa benchmark_memoria.
+# tracemalloc mide todo el proceso y multiplica el tiempo de las etapas: es
+# para diagnóstico con una sola operación pesada a la vez, no para uso continuo.
+# Sin el ajuste, etapa_memoria() solo consulta la configuración.
+
+MB = 1024 * 1024
+
+# Sitios de asignación guardados por etapa.
+SITIOS_POR_ETAPA = 10
+
+# Archivos excluidos de los sitios: el propio tracemalloc y la maquinaria de importación.
+FILTROS_SITIOS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+_local = threading.local()  # _local.etapas: etapas abiertas en el hilo actual
+_informe = contextvars.ContextVar('informe_memoria', default=None)
+
+
+# I. MEDICIÓN
+
+def _sitio(traza):
+    marco = traza[0]
+    partes = marco.filename.replace(os.sep, '/').split('/')
+    return f"{'/'.join(partes[-3:])}:{marco.lineno}"
+
+
+@contextmanager
+def etapa_memoria(nombre):
+    """Mide la memoria de la etapa `nombre` (ej: 'importacion.leer_excel') si el perfil está activo."""
+    if not settings.RECIBOS_PERFIL_MEMORIA:
+        yield
+        return
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(settings.RECIBOS_PERFIL_MEMORIA_MARCOS)
+    etapas = _local.__dict__.setdefault('etapas', [])
+    if etapas:
+        # reset_peak() borra el pico de la etapa que contiene a esta: se conserva antes.
+        etapas[-1]['pico'] = max(etapas[-1]['pico'], tracemalloc.get_traced_memory()[1])
+    antes = tracemalloc.take_snapshot().filter_traces(FILTROS_SITIOS)
+    tracemalloc.reset_peak()
+    inicial = tracemalloc.get_traced_memory()[0]
+    etapa = {'pico': inicial}
+    etapas.append(etapa)
+    comienzo = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - comienzo
+        actual, pico = tracemalloc.get_traced_memory()
+        pico = max(pico, etapa['pico'])
+        etapas.pop()
+        if etapas:
+            etapas[-1]['pico'] = max(etapas[-1]['pico'], pico)
+
+        despues = tracemalloc.take_snapshot().filter_traces(FILTROS_SITIOS)
+        diferencias = [d for d in despues.compare_to(antes, 'lineno') if d.size_diff > 0][:SITIOS_POR_ETAPA]
+        del antes, despues
+        resultado = {
+            'etapa': nombre,
+            'segundos': round(segundos, 3),
+            'pico_mb': round((pico - inicial) / MB, 2),
+            'neto_mb': round((actual - inicial) / MB, 2),
+            'sitios': [
+                {'sitio': _sitio(d.traceback), 'mb': round(d.size_diff / MB, 3), 'bloques': d.count_diff}
+                for d in diferencias
+            ],
+        }
+        _publicar(resultado)
+
+
+def _publicar(resultado):
+    principal = resultado['sitios'][0]['sitio'] if resultado['sitios'] else '-'
+    logger.info(
+        f"Memoria {resultado['etapa']}: pico {resultado['pico_mb']:.1f} MB, neto {resultado['neto_mb']:.1f} MB "
+        f"en {resultado['segundos']:.2f}s (principal: {principal})."
+    )
+    informe = _informe.get()
+    if informe is not None:
+        informe.append(resultado)
+    if fcntl is None:
+        return
+    try:
+        with _metricas_bloqueadas('memoria.json') as metricas:
+            datos = metricas.setdefault(resultado['etapa'], {'ejecuciones': 0, 'pico_max_mb': 0.0})
+            datos['ejecuciones'] += 1
+            datos['pico_max_mb'] = max(datos['pico_max_mb'], resultado['pico_mb'])
+            datos['ultima'] = {
+                'fecha': timezone.now().isoformat(timespec='seconds'),
+                **{clave: resultado[clave] for clave in ('segundos', 'pico_mb', 'neto_mb')},
+                'sitios': resultado['sitios'][:5],
+            }
+    except OSError as e:
+        logger.warning(f"No se pudieron guardar las métricas de memoria: {e}")
+
+
+# II. CONSULTA
+
+@contextmanager
+def informe_memoria():
+    """Lista que acumula los resultados de las etapas ejecutadas dentro del bloque."""
+    informe = []
+    token = _informe.set(informe)
+    try:
+        yield informe
+    finally:
+        _informe.reset(token)
+
+
+def metricas_memoria():
+    """Por etapa: ejecuciones, pico máximo (MB) y el detalle de la última medición."""
+    if fcntl is None:
+        return {}
+    with _metricas_bloqueadas('memoria.json') as metricas:
+        return {etapa: dict(datos) for etapa, datos in metricas.items()}
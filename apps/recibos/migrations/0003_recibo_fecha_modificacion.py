@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0002_alter_recibo_options_alter_recibo_anulado_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recibo',
+            name='fecha_modificacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
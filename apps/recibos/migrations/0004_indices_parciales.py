@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0003_recibo_fecha_modificacion'),
+    ]
+
+    # Los índices nuevos se crean antes de eliminar el compuesto anterior para que
+    # el dashboard no quede sin índice durante la migración.
+    operations = [
+        migrations.AddIndex(
+            model_name='recibo',
+            index=models.Index(condition=models.Q(('anulado', False)), fields=['-fecha', '-numero_recibo'], name='recibos_vigentes_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recibo',
+            index=models.Index(condition=models.Q(('anulado', True)), fields=['-fecha_anulacion'], name='recibos_anulados_fecha_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='recibo',
+            name='recibos_pag_anulado_cb71fb_idx',
+        ),
+        migrations.AlterField(
+            model_name='recibo',
+            name='nombre',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import migrations
+
+from apps.recibos.particiones import convertir_a_particionada, es_postgresql, revertir_particionado
+
+
+# Particionado opcional por año de `fecha` (ver apps/recibos/particiones.py).
+# Solo actúa en PostgreSQL con RECIBOS_PARTICIONAR_POR_ANIO=True; en los demás
+# casos no hace nada y la tabla puede convertirse más adelante con
+# `manage.py crear_particiones --convertir`. El estado de Django no cambia: la
+# pk sigue siendo `id` y `numero_recibo` sigue siendo único.
+
+def particionar(apps, schema_editor):
+    if not es_postgresql(schema_editor.connection) or not settings.RECIBOS_PARTICIONAR_POR_ANIO:
+        return
+    convertir_a_particionada(schema_editor.connection, settings.RECIBOS_PARTICIONES_ANTICIPADAS)
+
+
+def revertir(apps, schema_editor):
+    if es_postgresql(schema_editor.connection):
+        revertir_particionado(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0004_indices_parciales'),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, revertir),
+    ]
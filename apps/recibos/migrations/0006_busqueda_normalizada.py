@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:01
+
+from django.db import migrations, models
+
+from apps.recibos.busqueda import rellenar_campos_busqueda
+
+
+# Las columnas se agregan vacías y se rellenan por lotes de ids (transacciones
+# cortas, sin cargar la tabla en memoria). `manage.py rellenar_busqueda` repite
+# el relleno si hiciera falta (por ejemplo tras un UPDATE masivo por SQL).
+
+def rellenar(apps, schema_editor):
+    rellenar_campos_busqueda(apps.get_model('recibos', 'Recibo'), using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    # Cada lote del relleno se confirma por separado.
+    atomic = False
+
+    dependencies = [
+        ('recibos', '0005_particionado_por_anio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recibo',
+            name='nombre_normalizado',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='recibo',
+            name='rif_normalizado',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=50),
+        ),
+        migrations.RunPython(rellenar, migrations.RunPython.noop, elidable=True),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from apps.recibos.contribuyentes import rellenar_contribuyentes
+
+
+# Un contribuyente por cada rif_normalizado existente; los recibos se vinculan
+# por lotes de ids y luego se calculan los totales. `manage.py
+# recalcular_contribuyentes` repite el proceso si hiciera falta.
+
+def rellenar(apps, schema_editor):
+    rellenar_contribuyentes(
+        apps.get_model('recibos', 'Recibo'),
+        apps.get_model('recibos', 'Contribuyente'),
+        using=schema_editor.connection.alias,
+    )
+
+
+class Migration(migrations.Migration):
+
+    # Cada lote del vínculo se confirma por separado.
+    atomic = False
+
+    dependencies = [
+        ('recibos', '0006_busqueda_normalizada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contribuyente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rif_normalizado', models.CharField(max_length=50, unique=True)),
+                ('rif', models.CharField(max_length=50)),
+                ('nombre', models.CharField(max_length=255)),
+                ('nombre_normalizado', models.CharField(db_index=True, default='', editable=False, max_length=255)),
+                ('direccion', models.TextField(blank=True, default='')),
+                ('cantidad_recibos', models.PositiveIntegerField(default=0)),
+                ('total_pagado', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('ultimo_pago', models.DateField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_modificacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Contribuyente',
+                'verbose_name_plural': 'Contribuyentes',
+                'db_table': 'recibos_contribuyente',
+            },
+        ),
+        migrations.AddField(
+            model_name='recibo',
+            name='contribuyente',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recibos', to='recibos.contribuyente'),
+        ),
+        migrations.AddIndex(
+            model_name='recibo',
+            index=models.Index(fields=['contribuyente', '-fecha', '-numero_recibo'], name='recibos_contribuyente_idx'),
+        ),
+        migrations.RunPython(rellenar, migrations.RunPython.noop, elidable=True),
+    ]
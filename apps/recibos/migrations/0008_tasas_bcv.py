@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0007_contribuyentes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TasaBCV',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('tasa', models.DecimalField(decimal_places=4, max_digits=10)),
+                ('fecha_modificacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Tasa BCV',
+                'verbose_name_plural': 'Tasas BCV',
+                'db_table': 'recibos_tasa_bcv',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:25
+
+from django.db import migrations, models
+
+
+# Los recibos existentes quedan con secuencia 0: la primera lectura de la fuente
+# de cambios (cursor 0-0) los entrega todos, y desde ahí solo lo que cambie.
+
+def crear_contador(apps, schema_editor):
+    SecuenciaCambios = apps.get_model('recibos', 'SecuenciaCambios')
+    SecuenciaCambios.objects.using(schema_editor.connection.alias).get_or_create(pk=1, defaults={'valor': 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0008_tasas_bcv'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaCambios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'recibos_secuencia_cambios',
+            },
+        ),
+        migrations.AddField(
+            model_name='recibo',
+            name='secuencia_cambio',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='recibo',
+            name='fecha_modificacion',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='recibo',
+            index=models.Index(fields=['secuencia_cambio', 'id'], name='recibos_cambios_idx'),
+        ),
+        migrations.RunPython(crear_contador, migrations.RunPython.noop),
+    ]
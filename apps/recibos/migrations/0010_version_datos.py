@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import time
+
+
+# La versión arranca en el reloj (microsegundos), igual que la que se guardaba
+# en la caché: no coincide con ninguna clave de caché anterior.
+
+def crear_version(apps, schema_editor):
+    VersionDatos = apps.get_model('recibos', 'VersionDatos')
+    VersionDatos.objects.using(schema_editor.connection.alias).get_or_create(
+        pk=1, defaults={'valor': time.time_ns() // 1000},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0009_fuente_cambios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDatos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'recibos_version_datos',
+            },
+        ),
+        migrations.RunPython(crear_version, migrations.RunPython.noop),
+    ]
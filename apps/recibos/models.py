@@ -1,5 +1,157 @@
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models import Q
+from django.utils import timezone
 from .constants import CATEGORY_CHOICES, CATEGORY_CHOICES_MAP
+from .busqueda import Prefijo, normalizar_rif, normalizar_texto
+from .versiones import incrementar_version_datos
+
+
+class Contribuyente(models.Model):
+    """
+    Pagador identificado por su RIF/Cédula normalizado. Los recibos conservan
+    los datos tal como se emitieron; el contribuyente guarda los más recientes
+    y los totales de sus recibos vigentes, que se actualizan con cada cambio
+    (ver contribuyentes.py) en lugar de recalcularse al consultar.
+    """
+    # RIF solo con letras y dígitos (misma normalización que Recibo.rif_normalizado).
+    rif_normalizado = models.CharField(max_length=50, unique=True)
+
+    # Datos del último recibo cargado.
+    rif = models.CharField(max_length=50)
+    nombre = models.CharField(max_length=255)
+    nombre_normalizado = models.CharField(max_length=255, db_index=True, default='', editable=False)
+    direccion = models.TextField(blank=True, default='')
+
+    # Totales de los recibos vigentes (no anulados).
+    cantidad_recibos = models.PositiveIntegerField(default=0)
+    total_pagado = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    ultimo_pago = models.DateField(null=True, blank=True)
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'recibos_contribuyente'
+        verbose_name = "Contribuyente"
+        verbose_name_plural = "Contribuyentes"
+
+    def __str__(self):
+        return f"{self.nombre} ({self.rif})"
+
+
+class TasaBCV(models.Model):
+    """
+    Tasa oficial del BCV (Bs por unidad de divisa) publicada para una fecha. La
+    tasa vigente en un día sin publicación es la de la fecha anterior más
+    cercana (ver tasas.py).
+    """
+    fecha = models.DateField(unique=True)
+    tasa = models.DecimalField(max_digits=10, decimal_places=4)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'recibos_tasa_bcv'
+        ordering = ['-fecha']
+        verbose_name = "Tasa BCV"
+        verbose_name_plural = "Tasas BCV"
+
+    def __str__(self):
+        return f"{self.fecha:%d/%m/%Y}: {self.tasa}"
+
+
+class VersionDatos(models.Model):
+    """
+    Versión global de los datos de recibos (una sola fila, id=1; ver
+    versiones.py). Vive en la base y no en la caché: el incremento es atómico
+    entre procesos y se replica junto con los datos que invalida.
+    """
+    valor = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'recibos_version_datos'
+
+
+class SecuenciaCambios(models.Model):
+    """
+    Numeración de los cambios de recibos para la fuente de cambios (cambios.py).
+
+    En PostgreSQL el número es el id de la transacción que escribe
+    (pg_current_xact_id()): no bloquea ninguna fila y los escritores no se
+    esperan entre sí. Como las transacciones no se confirman en el orden de
+    sus ids, la fuente solo entrega los números menores que el de la
+    transacción abierta más antigua (limite_confirmado()): por debajo ya no
+    puede aparecer ningún cambio nuevo.
+
+    En otras bases (SQLite, con un solo escritor a la vez) es un contador de
+    una sola fila (id=1) que se incrementa dentro de la transacción.
+    """
+    valor = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'recibos_secuencia_cambios'
+
+    @classmethod
+    def siguiente(cls, using='default'):
+        """Número de cambio de la transacción en curso (llamar dentro de ella)."""
+        conexion = connections[using]
+        if conexion.vendor == 'postgresql':
+            with conexion.cursor() as cursor:
+                cursor.execute("SELECT pg_current_xact_id()::text::bigint")
+                return cursor.fetchone()[0]
+        tabla = conexion.ops.quote_name(cls._meta.db_table)
+        with conexion.cursor() as cursor:
+            cursor.execute(f"UPDATE {tabla} SET valor = valor + 1 WHERE id = 1 RETURNING valor")
+            fila = cursor.fetchone()
+        if fila is None:
+            # La fila la crea la migración; si la tabla se vació, se vuelve a crear.
+            cls.objects.using(using).get_or_create(pk=1)
+            return cls.siguiente(using)
+        return fila[0]
+
+    @classmethod
+    def limite_confirmado(cls, using='default'):
+        """
+        Número de cambio a partir del cual todavía puede confirmarse algo
+        (id de la transacción abierta más antigua), o None si los cambios se
+        confirman siempre en orden (bases distintas de PostgreSQL).
+        """
+        conexion = connections[using]
+        if conexion.vendor != 'postgresql':
+            return None
+        with conexion.cursor() as cursor:
+            cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+            return cursor.fetchone()[0]
+
+
+# Columnas calculadas a partir de otras: actualizarlas solas no es un cambio del
+# recibo para la fuente de cambios (rellenos de búsqueda y de contribuyentes).
+CAMPOS_DERIVADOS = {'nombre_normalizado', 'rif_normalizado', 'contribuyente', 'contribuyente_id'}
+
+
+class ReciboQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        """
+        UPDATE masivo que registra el cambio como save(): fecha_modificacion,
+        un número de secuencia para todas las filas y la versión de los datos.
+        """
+        if set(kwargs) <= CAMPOS_DERIVADOS:
+            return super().update(**kwargs)
+        using = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=using, savepoint=False):
+            kwargs.setdefault('fecha_modificacion', timezone.now())
+            kwargs.setdefault('secuencia_cambio', SecuenciaCambios.siguiente(using))
+            filas = super().update(**kwargs)
+            if filas:
+                # Al confirmar: antes, un lector guardaría datos viejos bajo la versión nueva.
+                transaction.on_commit(incrementar_version_datos, using=using)
+        return filas
+
+    update.alters_data = True
+
+
+# Campos de Recibo que intervienen en los totales de su contribuyente.
+CAMPOS_TOTALES = ('rif_normalizado', 'contribuyente_id', 'anulado', 'fecha', 'total_monto_bs')
 
 
 class Recibo(models.Model):
@@ -15,6 +167,14 @@ class Recibo(models.Model):
     
     # Fecha y hora de creación del registro en la DB (automático, no editable)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    # Fecha y hora de la última modificación (automático en cada save() y en
+    # QuerySet.update()). Forma parte de la clave de caché de la fila del dashboard.
+    fecha_modificacion = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Número del último cambio (alta, modificación o anulación), tomado de
+    # SecuenciaCambios. La fuente de cambios recorre (secuencia_cambio, id).
+    secuencia_cambio = models.BigIntegerField(default=0, editable=False)
     
     # Indicador de anulación. Se usa como filtro principal en el dashboard (anulado=False).
     anulado = models.BooleanField(
@@ -33,8 +193,9 @@ class Recibo(models.Model):
         db_index=True 
     )
     
-    # Nombre completo del cliente.
-    nombre = models.CharField(max_length=255)
+    # Nombre completo del cliente. Indexado para las búsquedas por prefijo
+    # (en PostgreSQL Django crea además el índice *_like para LIKE 'texto%').
+    nombre = models.CharField(max_length=255, db_index=True)
     
     # RIF o Cédula de Identidad
     rif_cedula_identidad = models.CharField(
@@ -42,6 +203,25 @@ class Recibo(models.Model):
         db_index=True 
     )
     
+    # Columnas de búsqueda (ver busqueda.py): nombre sin acentos ni signos en
+    # mayúsculas y RIF solo con letras y dígitos. Se calculan en save(); las
+    # búsquedas las comparan por igualdad o prefijo (en PostgreSQL Django crea
+    # además el índice *_like para LIKE 'texto%').
+    nombre_normalizado = models.CharField(max_length=255, db_index=True, default='', editable=False)
+    rif_normalizado = models.CharField(max_length=50, db_index=True, default='', editable=False)
+
+    # Pagador del recibo (por rif_normalizado). Se asigna en save() y en las
+    # cargas masivas; el índice (contribuyente, -fecha, -numero_recibo) sirve al historial.
+    contribuyente = models.ForeignKey(
+        Contribuyente,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='recibos',
+        db_index=False,
+    )
+
     # Dirección física del inmueble asociado.
     direccion_inmueble = models.TextField()
     
@@ -89,21 +269,108 @@ class Recibo(models.Model):
     # Descripción detallada del pago.
     concepto = models.TextField()
 
+    objects = ReciboQuerySet.as_manager()
+
     # 6. CONFIGURACIÓN DEL MODELO
     class Meta:
         db_table = 'recibos_pago'
         
         indexes = [
-            # Índice compuesto: Acelera el ordenamiento y filtrado principal del dashboard
-            models.Index(fields=['anulado', '-fecha', '-numero_recibo']),
-            
-            # Índice simple para la búsqueda por número de recibo
+            # Índice parcial (solo recibos vigentes): ordenamiento y filtrado principal
+            # del dashboard y de los reportes. Reemplaza al compuesto (anulado, -fecha,
+            # -numero_recibo): no indexa los anulados y es más pequeño.
+            models.Index(
+                fields=['-fecha', '-numero_recibo'],
+                condition=Q(anulado=False),
+                name='recibos_vigentes_fecha_idx',
+            ),
+
+            # Índice parcial (solo anulados): orden de la vista de recibos anulados.
+            models.Index(
+                fields=['-fecha_anulacion'],
+                condition=Q(anulado=True),
+                name='recibos_anulados_fecha_idx',
+            ),
+
+            # Fuente de cambios: recorrido por cursor (secuencia_cambio, id).
+            models.Index(
+                fields=['secuencia_cambio', 'id'],
+                name='recibos_cambios_idx',
+            ),
+
+            # Historial de un contribuyente (más reciente primero) y recálculo de sus totales.
+            models.Index(
+                fields=['contribuyente', '-fecha', '-numero_recibo'],
+                name='recibos_contribuyente_idx',
+            ),
         ]
 
         # Configuración de los nombres de los objetos
         verbose_name = "Recibo de Pago"
         verbose_name_plural = "Recibos de Pago"
 
+    def actualizar_campos_busqueda(self):
+        """Recalcula las columnas normalizadas (llamar antes de bulk_create)."""
+        self.nombre_normalizado = normalizar_texto(self.nombre)
+        self.rif_normalizado = normalizar_rif(self.rif_cedula_identidad)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        recibo = super().from_db(db, field_names, values)
+        recibo._guardar_valores_totales()
+        return recibo
+
+    def _guardar_valores_totales(self):
+        # Valores con los que se cargó (o guardó) el recibo: al guardarlo de
+        # nuevo solo se recalculan los totales si alguno cambió.
+        self._valores_totales = {campo: self.__dict__.get(campo) for campo in CAMPOS_TOTALES}
+
+    def save(self, *args, **kwargs):
+        self.actualizar_campos_busqueda()
+        registrar_cambio = True
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if {'nombre', 'rif_cedula_identidad'} & update_fields:
+                update_fields |= {'nombre_normalizado', 'rif_normalizado', 'contribuyente'}
+            registrar_cambio = not update_fields <= CAMPOS_DERIVADOS
+            if registrar_cambio:
+                update_fields |= {'fecha_modificacion', 'secuencia_cambio'}
+            kwargs['update_fields'] = update_fields
+
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        # El número de cambio es el de la transacción que guarda el recibo.
+        with transaction.atomic(using=using, savepoint=False):
+            self._vincular_contribuyente(using)
+            if registrar_cambio:
+                self.secuencia_cambio = SecuenciaCambios.siguiente(using)
+            super().save(*args, **kwargs)  # post_save actualiza los totales (signals.py)
+        self._guardar_valores_totales()
+
+    def _vincular_contribuyente(self, using):
+        cargado = getattr(self, '_valores_totales', {})
+        if not self.rif_normalizado:
+            self.contribuyente = None
+        elif self.contribuyente_id is None or self.rif_normalizado != cargado.get('rif_normalizado'):
+            self.contribuyente, _ = Contribuyente.objects.db_manager(using).get_or_create(
+                rif_normalizado=self.rif_normalizado,
+                defaults={
+                    'rif': self.rif_cedula_identidad,
+                    'nombre': self.nombre,
+                    'nombre_normalizado': self.nombre_normalizado,
+                    'direccion': self.direccion_inmueble or '',
+                },
+            )
+
+    def contribuyentes_afectados(self, eliminado=False):
+        """Ids de contribuyente cuyos totales cambian al guardar (o eliminar) este recibo."""
+        cargado = getattr(self, '_valores_totales', None)
+        if eliminado or cargado is None:
+            return {self.contribuyente_id} - {None}
+        if all(getattr(self, campo) == valor for campo, valor in cargado.items()):
+            return set()
+        return {self.contribuyente_id, cargado['contribuyente_id']} - {None}
+
     # Método para representación textual del objeto
     def __str__(self):
         return f"Recibo N°{self.numero_recibo or self.pk} ({self.nombre})"
@@ -114,4 +381,12 @@ class Recibo(models.Model):
         for i in range(1, 11):
             if getattr(self, f'categoria{i}'):
                 return True
-        return False
\ No newline at end of file
+        return False
+
+
+# Búsqueda por prefijo servida por índice sobre las columnas normalizadas (busqueda.py)
+# y sobre numero_transferencia (guardada en mayúsculas).
+for _modelo in (Recibo, Contribuyente):
+    for _campo in ('nombre_normalizado', 'rif_normalizado'):
+        _modelo._meta.get_field(_campo).register_lookup(Prefijo)
+Recibo._meta.get_field('numero_transferencia').register_lookup(Prefijo)
@@ -0,0 +1,307 @@
+import logging
+from datetime import date
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# PARTICIONADO POR AÑO DE `recibos_pago` (solo PostgreSQL, opcional)
+# Con RECIBOS_PARTICIONAR_POR_ANIO=True la migración 0005 convierte la tabla en
+# una tabla particionada por rango de `fecha`: una partición por año
+# (recibos_pago_2025, ...) y una partición DEFAULT para fechas fuera de rango.
+# Los filtros por período del dashboard y de los reportes solo recorren las
+# particiones de los años consultados, y la importación masiva mantiene índices
+# pequeños (los del año en curso).
+#
+# PostgreSQL no admite índices únicos globales que no incluyan la clave de
+# partición, así que:
+#   - la clave primaria física es (id, fecha); para Django `id` sigue siendo la pk.
+#   - la unicidad de `numero_recibo` la garantiza la tabla auxiliar
+#     recibos_pago_numeros (numero_recibo PRIMARY KEY), mantenida por un trigger.
+#     Un duplicado lanza unique_violation y Django lo recibe como IntegrityError.
+
+TABLA = 'recibos_pago'
+TABLA_NUMEROS = 'recibos_pago_numeros'
+PARTICION_DEFAULT = 'recibos_pago_default'
+
+# Nombre de la restricción única original: se reutiliza en el error del trigger
+# y al revertir el particionado.
+RESTRICCION_NUMERO = 'recibos_pago_numero_recibo_key'
+INDICE_NUMERO = 'recibos_pago_numero_recibo_idx'
+
+# Variable de sesión que desactiva el trigger al mover filas entre particiones:
+# el recibo no cambia, su número sigue siendo el mismo.
+VARIABLE_MOVIENDO_FILAS = 'recibos.moviendo_filas'
+
+SQL_FUNCION_NUMERO_UNICO = f"""
+CREATE OR REPLACE FUNCTION recibos_pago_numero_unico() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('{VARIABLE_MOVIENDO_FILAS}', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND NEW.numero_recibo IS DISTINCT FROM OLD.numero_recibo) THEN
+        IF OLD.numero_recibo IS NOT NULL THEN
+            DELETE FROM {TABLA_NUMEROS}
+            WHERE numero_recibo = OLD.numero_recibo AND recibo_id = OLD.id;
+        END IF;
+    END IF;
+
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.numero_recibo IS DISTINCT FROM OLD.numero_recibo) THEN
+        IF NEW.numero_recibo IS NOT NULL THEN
+            -- El mismo recibo puede volver a registrarse (movimiento entre particiones).
+            INSERT INTO {TABLA_NUMEROS} (numero_recibo, recibo_id)
+            VALUES (NEW.numero_recibo, NEW.id)
+            ON CONFLICT (numero_recibo) DO UPDATE SET recibo_id = EXCLUDED.recibo_id
+            WHERE {TABLA_NUMEROS}.recibo_id = EXCLUDED.recibo_id;
+            IF NOT FOUND THEN
+                RAISE unique_violation USING
+                    MESSAGE = format('Ya existe un recibo con numero_recibo=%s.', NEW.numero_recibo),
+                    CONSTRAINT = '{RESTRICCION_NUMERO}';
+            END IF;
+        END IF;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def es_postgresql(connection):
+    return connection.vendor == 'postgresql'
+
+
+def nombre_particion(anio):
+    return f'{TABLA}_{anio}'
+
+
+def limites_particion(anio):
+    """Rango [desde, hasta) de la partición de un año."""
+    return date(anio, 1, 1), date(anio + 1, 1, 1)
+
+
+def tabla_particionada(cursor):
+    cursor.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+        [TABLA],
+    )
+    return cursor.fetchone()[0]
+
+
+def listar_particiones(cursor):
+    """Particiones existentes: lista de (nombre, límites, filas estimadas)."""
+    cursor.execute(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname
+        """,
+        [TABLA],
+    )
+    return cursor.fetchall()
+
+
+def _existe(cursor, nombre):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [nombre])
+    return cursor.fetchone()[0]
+
+
+def _indices_secundarios(cursor, tabla):
+    """Definiciones de los índices no únicos (los de Django) de `tabla`."""
+    cursor.execute(
+        """
+        SELECT pg_get_indexdef(indexrelid)
+        FROM pg_index
+        WHERE indrelid = to_regclass(%s) AND NOT indisprimary AND NOT indisunique
+        """,
+        [tabla],
+    )
+    return [fila[0] for fila in cursor.fetchall()]
+
+
+def _claves_foraneas(cursor, tabla):
+    """(nombre, definición) de las claves foráneas salientes: LIKE no las copia."""
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = to_regclass(%s) AND contype = 'f'
+        """,
+        [tabla],
+    )
+    return cursor.fetchall()
+
+
+def _renombrar_secuencia(cursor, tabla):
+    """La columna identidad de la tabla nueva trae una secuencia con otro nombre."""
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [tabla])
+    secuencia = cursor.fetchone()[0]
+    if secuencia and secuencia.split('.')[-1] != f'{tabla}_id_seq':
+        cursor.execute(f"ALTER SEQUENCE {secuencia} RENAME TO {tabla}_id_seq")
+
+
+def _sincronizar_secuencia(cursor, tabla):
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {tabla}",
+        [tabla],
+    )
+
+
+def crear_particion(cursor, anio):
+    """
+    Crea la partición de `anio` si no existe. Si la partición DEFAULT ya tiene
+    filas de ese año (se importaron antes de crearla), se trasladan a la nueva.
+    Retorna True si la partición se creó.
+    """
+    nombre = nombre_particion(anio)
+    if _existe(cursor, nombre):
+        return False
+
+    desde, hasta = limites_particion(anio)
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {PARTICION_DEFAULT} WHERE fecha >= %s AND fecha < %s)",
+        [desde, hasta],
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(
+            f"CREATE TABLE {nombre} PARTITION OF {TABLA} FOR VALUES FROM (%s) TO (%s)",
+            [desde, hasta],
+        )
+        return True
+
+    with transaction.atomic(using=cursor.db.alias):
+        cursor.execute(f"SET LOCAL {VARIABLE_MOVIENDO_FILAS} = 'on'")
+        cursor.execute(f"ALTER TABLE {TABLA} DETACH PARTITION {PARTICION_DEFAULT}")
+        cursor.execute(
+            f"CREATE TABLE {nombre} PARTITION OF {TABLA} FOR VALUES FROM (%s) TO (%s)",
+            [desde, hasta],
+        )
+        cursor.execute(
+            f"""
+            WITH movidas AS (
+                DELETE FROM {PARTICION_DEFAULT} WHERE fecha >= %s AND fecha < %s RETURNING *
+            )
+            INSERT INTO {nombre} SELECT * FROM movidas
+            """,
+            [desde, hasta],
+        )
+        logger.info(f"Partición {nombre}: {cursor.rowcount} filas trasladadas desde {PARTICION_DEFAULT}.")
+        cursor.execute(f"ALTER TABLE {TABLA} ATTACH PARTITION {PARTICION_DEFAULT} DEFAULT")
+    return True
+
+
+def crear_particiones_futuras(cursor, anios_anticipados, desde_anio=None):
+    """Crea las particiones desde `desde_anio` hasta el año actual + `anios_anticipados`."""
+    actual = date.today().year
+    creadas = []
+    for anio in range(desde_anio or actual, actual + anios_anticipados + 1):
+        if crear_particion(cursor, anio):
+            creadas.append(nombre_particion(anio))
+    return creadas
+
+
+def convertir_a_particionada(connection, anios_anticipados):
+    """
+    Convierte `recibos_pago` en una tabla particionada por año de `fecha`,
+    conservando datos, índices, claves foráneas y la secuencia de ids. Debe
+    ejecutarse dentro de una transacción (la migración ya lo hace).
+    """
+    with connection.cursor() as cursor:
+        if tabla_particionada(cursor):
+            return []
+
+        indices = _indices_secundarios(cursor, TABLA)
+        claves_foraneas = _claves_foraneas(cursor, TABLA)
+        cursor.execute(f"SELECT EXTRACT(YEAR FROM MIN(fecha))::int FROM {TABLA}")
+        primer_anio = cursor.fetchone()[0]
+
+        nueva = f'{TABLA}_particionada'
+        cursor.execute(
+            f"CREATE TABLE {nueva} (LIKE {TABLA} INCLUDING DEFAULTS INCLUDING IDENTITY "
+            f"INCLUDING CONSTRAINTS) PARTITION BY RANGE (fecha)"
+        )
+        cursor.execute(f"ALTER TABLE {nueva} ADD CONSTRAINT {nueva}_pkey PRIMARY KEY (id, fecha)")
+        cursor.execute(f"CREATE TABLE {nueva}_default PARTITION OF {nueva} DEFAULT")
+
+        # Particiones anuales creadas sobre la tabla nueva (aún sin datos).
+        actual = date.today().year
+        for anio in range(min(primer_anio or actual, actual), actual + anios_anticipados + 1):
+            desde, hasta = limites_particion(anio)
+            cursor.execute(
+                f"CREATE TABLE {nueva}_{anio} PARTITION OF {nueva} FOR VALUES FROM (%s) TO (%s)",
+                [desde, hasta],
+            )
+
+        cursor.execute(f"INSERT INTO {nueva} OVERRIDING SYSTEM VALUE SELECT * FROM {TABLA}")
+        filas = cursor.rowcount
+
+        cursor.execute(
+            f"CREATE TABLE {TABLA_NUMEROS} (numero_recibo integer PRIMARY KEY, recibo_id bigint NOT NULL)"
+        )
+        cursor.execute(
+            f"INSERT INTO {TABLA_NUMEROS} (numero_recibo, recibo_id) "
+            f"SELECT numero_recibo, id FROM {TABLA} WHERE numero_recibo IS NOT NULL"
+        )
+
+        # Reemplazo de la tabla original: los nombres de índices quedan libres.
+        cursor.execute(f"DROP TABLE {TABLA}")
+        cursor.execute(f"ALTER TABLE {nueva} RENAME TO {TABLA}")
+        cursor.execute(f"ALTER TABLE {TABLA} RENAME CONSTRAINT {nueva}_pkey TO {TABLA}_pkey")
+        for nombre, _, _ in listar_particiones(cursor):
+            cursor.execute(f"ALTER TABLE {nombre} RENAME TO {nombre.replace(nueva, TABLA)}")
+        _renombrar_secuencia(cursor, TABLA)
+        _sincronizar_secuencia(cursor, TABLA)
+
+        for definicion in indices:
+            cursor.execute(definicion)
+        cursor.execute(f"CREATE INDEX {INDICE_NUMERO} ON {TABLA} (numero_recibo)")
+        for nombre, definicion in claves_foraneas:
+            cursor.execute(f"ALTER TABLE {TABLA} ADD CONSTRAINT {nombre} {definicion}")
+
+        cursor.execute(SQL_FUNCION_NUMERO_UNICO)
+        cursor.execute(
+            f"CREATE TRIGGER recibos_pago_numero_unico_trg "
+            f"AFTER INSERT OR UPDATE OF numero_recibo OR DELETE ON {TABLA} "
+            f"FOR EACH ROW EXECUTE FUNCTION recibos_pago_numero_unico()"
+        )
+        cursor.execute(f"ANALYZE {TABLA}")
+
+        logger.info(f"{TABLA} particionada por año: {filas} filas migradas.")
+        return [nombre for nombre, _, _ in listar_particiones(cursor)]
+
+
+def revertir_particionado(connection):
+    """Vuelve a una tabla `recibos_pago` sin particiones (reverso de la migración)."""
+    with connection.cursor() as cursor:
+        if not tabla_particionada(cursor):
+            return
+
+        # En la tabla particionada pg_get_indexdef devuelve 'ON ONLY <tabla>'.
+        indices = [
+            d.replace(' ON ONLY ', ' ON ') for d in _indices_secundarios(cursor, TABLA)
+            if INDICE_NUMERO not in d
+        ]
+        claves_foraneas = _claves_foraneas(cursor, TABLA)
+
+        plana = f'{TABLA}_plana'
+        cursor.execute(
+            f"CREATE TABLE {plana} (LIKE {TABLA} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(f"INSERT INTO {plana} OVERRIDING SYSTEM VALUE SELECT * FROM {TABLA}")
+
+        cursor.execute(f"DROP TABLE {TABLA}")
+        cursor.execute(f"DROP TABLE {TABLA_NUMEROS}")
+        cursor.execute("DROP FUNCTION IF EXISTS recibos_pago_numero_unico()")
+        cursor.execute(f"ALTER TABLE {plana} RENAME TO {TABLA}")
+        cursor.execute(f"ALTER TABLE {TABLA} ADD CONSTRAINT {TABLA}_pkey PRIMARY KEY (id)")
+        cursor.execute(f"ALTER TABLE {TABLA} ADD CONSTRAINT {RESTRICCION_NUMERO} UNIQUE (numero_recibo)")
+        _renombrar_secuencia(cursor, TABLA)
+        _sincronizar_secuencia(cursor, TABLA)
+
+        for definicion in indices:
+            cursor.execute(definicion)
+        for nombre, definicion in claves_foraneas:
+            cursor.execute(f"ALTER TABLE {TABLA} ADD CONSTRAINT {nombre} {definicion}")
@@ -0,0 +1,374 @@
+import logging
+import io
+import os
+import zipfile
+from functools import lru_cache
+from django.http import HttpResponse
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from .utils import HEADER_IMAGE, format_currency, nombre_archivo_recibo
+
+logger = logging.getLogger(__name__)
+
+# --- FUNCIONES AUXILIARES PARA EL PDF UNITARIO 
+
+def draw_text_line_unit(canvas_obj, text, x_start, y_start, font_name="Helvetica", font_size=10, is_bold=False):
+    """Dibuja una línea de texto y ajusta la posición Y."""
+    font = font_name + "-Bold" if is_bold else font_name
+    canvas_obj.setFont(font, font_size)
+    canvas_obj.drawString(x_start, y_start, str(text))
+    return y_start - 15
+
+def draw_centered_text_right_unit(canvas_obj, y_pos, text, x_start, width, font_name="Helvetica", font_size=10, is_bold=False):
+    """Centra el texto dentro de un ancho específico."""
+    font = font_name + "-Bold" if is_bold else font_name
+    canvas_obj.setFont(font, font_size)
+    text_width = canvas_obj.stringWidth(text, font, font_size)
+    x = x_start + (width - text_width) / 2
+    canvas_obj.drawString(x, y_pos, text.upper())
+
+@lru_cache(maxsize=1)
+def _dimensiones_encabezado():
+    """Decodifica la imagen del encabezado una sola vez por proceso."""
+    return ImageReader(HEADER_IMAGE).getSize()
+
+
+# PLANTILLA ESTÁTICA DEL RECIBO (FORM XOBJECTS)
+# Todo lo que no depende del recibo (encabezado, etiquetas, descripciones de
+# categorías, firma institucional) se dibuja UNA vez por documento como un form
+# XObject de reportlab (beginForm/endForm) y se estampa en cada página con
+# doForm. Por recibo solo se emiten los campos variables.
+# Los forms que no son de página completa se definen con la línea base en y=0 y
+# se estampan desplazados (translate) a la altura que corresponda.
+
+FORMA_ENCABEZADO = 'recibo_encabezado'
+FORMA_ETIQUETAS = 'recibo_etiquetas'
+FORMA_TITULO_CATEGORIAS = 'recibo_titulo_categorias'
+FORMA_FIRMAS = 'recibo_firmas'
+
+# Filas del cuerpo: (etiqueta columna 1, etiqueta columna 2). Cada fila ocupa 20 pt.
+ETIQUETAS_CUERPO = (
+    ("Estado:", "Nº Recibo:"),
+    ("Recibí de:", "Monto Recibido (Bs.):"),
+    ("Rif/C.I:", "Nº Transferencia:"),
+    ("Dirección:", "Fecha:"),
+    ("Concepto:", None),
+)
+ALTO_FILA_CUERPO = 20
+
+CATEGORY_DESCRIPTIONS = {
+    'categoria1': ("TITULO DE TIERRA URBANA - TITULO DE ADJUDICACION EN PROPIEDAD", "Una milésima de Bolívar, Art. 58 de la Ley Especial de Regularización"),
+    'categoria2': ("TITULO DE TIERRA URBANA - TITULO DE ADJUDICACION MAS VIVIENDA", "Una milésima de Bolívar, más gastos administrativos (140 unidades ancladas a la moneda de mayor valor estipulada por el BCV)"),
+    'categoria3': ("VIVIENDA UNIFAMILIAR Y MULTIFAMILIAR (EDIFICIOS) TIERRA: Municipal", "Precio: Gastos Administrativos (140 unidades ancladas a la moneda de mayor valor estipulada por el BCV)"),
+    'categoria4': ("VIVIENDA UNIFAMILIAR Y MULTIFAMILIAR (EDIFICIOS) TIERRA: Tierra Privada", "Precio: Gastos Administrativos (140 unidades ancladas a la moneda de mayor valor estipulada por el BCV)"),
+    'categoria5': ("VIVIENDA UNIFAMILIAR Y MULTIFAMILIAR (EDIFICIOS) TIERRA: Tierra INAVI o de cualquier Ente transferido al INTU", "Precio: Gastos Administrativos (140 unidades ancladas a la moneda de mayor valor estipulada por el BCV)"),
+    'categoria6': ("EXCEDENTES: Con título de Tierra Urbana, hasta 400 mt2 una milésima por mt2", "Según el Art 33 de la Ley Especial de Regularización"),
+    'categoria7': ("Con Título INAVI (Gastos Administrativos):", "140 unidades ancladas a la moneda de mayor valor estipulada por el BCV)"),
+    'categoria8': ("ESTUDIOS TÉCNICOS:", "Medición detallada de la parcela para obtener representación gráfica (plano)"),
+    'categoria9': ("ARRENDAMIENTOS DE LOCALES COMERCIALES:", "Número de unidades establecidas en el contrato, ancladas a la moneda de mayor valor estipulada por el BCV"),
+    'categoria10': ("ARRENDAMIENTOS DE TERRENOS", "Número de unidades establecidas en el contrato, ancladas a la moneda de mayor valor estipulada por el BCV"),
+}
+
+
+def _definir_forma(c, nombre, dibujar, lowery=0, uppery=None):
+    """
+    Define el form `nombre` en el documento del canvas si aún no existe. `lowery`
+    y `uppery` delimitan su caja (por defecto, la página completa).
+    """
+    if c.hasForm(nombre):
+        return
+    c.beginForm(nombre, lowery=lowery, uppery=uppery)
+    dibujar()
+    c.endForm()
+
+
+def _estampar_forma(c, nombre, y=0):
+    """Dibuja un form ya definido con su línea base desplazada a la altura `y`."""
+    c.saveState()
+    c.translate(0, y)
+    c.doForm(nombre)
+    c.restoreState()
+
+
+@lru_cache(maxsize=4)
+def _geometria_encabezado(width, height):
+    """
+    Posición de la imagen del encabezado (o None si no está disponible) y altura
+    del título. Depende solo del tamaño de página, por lo que se calcula una vez.
+    """
+    imagen = None
+    current_y = height - 50
+
+    if os.path.exists(HEADER_IMAGE):
+        try:
+            img_width, img_height = _dimensiones_encabezado()
+            scale = min(1.0, 480 / img_width) 
+            draw_width = img_width * scale
+            draw_height = img_height * scale
+            x_center = (width - draw_width) / 2
+            y_top = height - draw_height - 20
+            imagen = (x_center, y_top, draw_width, draw_height)
+            current_y = y_top - 25
+        except Exception as e:
+            logger.error(f"⚠️ Error cargando encabezado: {e}")
+
+    return imagen, current_y
+
+
+# ⚙️ MÓDULOS DE DIBUJO PARA PDF UNITARIO (Para una función generar_pdf_recibo_unitario más limpia)
+
+def _draw_recibo_header(c, width, height):
+    """Dibuja el encabezado y el título del recibo unitario."""
+    imagen, current_y = _geometria_encabezado(width, height)
+
+    def dibujar():
+        if imagen:
+            x_center, y_top, draw_width, draw_height = imagen
+            c.drawImage(HEADER_IMAGE, x=x_center, y=y_top, width=draw_width, height=draw_height)
+
+        c.setFont("Helvetica-Bold", 13)
+        titulo_texto = "RECIBO DE PAGO"
+        titulo_width = c.stringWidth(titulo_texto, "Helvetica-Bold", 13)
+        titulo_x = (width - titulo_width) / 2
+        c.drawString(titulo_x, current_y, titulo_texto)
+
+    _definir_forma(c, FORMA_ENCABEZADO, dibujar)
+    c.doForm(FORMA_ENCABEZADO)
+    
+    return current_y - 25
+
+def _draw_recibo_body_data(c, recibo_obj, y_start, X1_TITLE, X1_DATA, X2_TITLE, X2_DATA):
+    """Dibuja los datos principales del recibo (Estado, Nombre, Monto, etc.)."""
+    
+    num_recibo = str(recibo_obj.numero_recibo).zfill(4) if recibo_obj.numero_recibo else 'N/A'
+    monto_formateado = format_currency(recibo_obj.total_monto_bs)
+    fecha_str = recibo_obj.fecha.strftime("%d/%m/%Y")
+    num_transf = recibo_obj.numero_transferencia if recibo_obj.numero_transferencia else 'N/A'
+
+    # Etiquetas fijas (form), con la primera fila en y=0.
+    def dibujar_etiquetas():
+        for fila, (titulo1, titulo2) in enumerate(ETIQUETAS_CUERPO):
+            y_fila = -fila * ALTO_FILA_CUERPO
+            draw_text_line_unit(c, titulo1, X1_TITLE, y_fila, is_bold=True)
+            if titulo2:
+                draw_text_line_unit(c, titulo2, X2_TITLE, y_fila, is_bold=True)
+
+    _definir_forma(c, FORMA_ETIQUETAS, dibujar_etiquetas, lowery=-len(ETIQUETAS_CUERPO) * ALTO_FILA_CUERPO, uppery=ALTO_FILA_CUERPO)
+    _estampar_forma(c, FORMA_ETIQUETAS, y_start)
+
+    # Datos variables, en el mismo orden de filas que ETIQUETAS_CUERPO.
+    valores = (
+        (recibo_obj.estado, num_recibo),
+        (recibo_obj.nombre, monto_formateado),
+        (recibo_obj.rif_cedula_identidad, num_transf),
+        (recibo_obj.direccion_inmueble, fecha_str),
+        (recibo_obj.concepto, None),
+    )
+    c.setFont("Helvetica", 10)
+    for fila, (valor1, valor2) in enumerate(valores):
+        y_fila = y_start - fila * ALTO_FILA_CUERPO
+        c.drawString(X1_DATA, y_fila, str(valor1))
+        if valor2 is not None:
+            c.drawString(X2_DATA, y_fila, str(valor2))
+
+    # Misma altura final que el trazado original: última fila - 15 - 25.
+    return y_start - (len(ETIQUETAS_CUERPO) - 1) * ALTO_FILA_CUERPO - 40
+
+def _draw_categorias_section(c, recibo_obj, y_start, X1_TITLE):
+    """Dibuja la sección de categorías detalladas en el recibo unitario."""
+    
+    categorias = {
+        f'categoria{i}': getattr(recibo_obj, f'categoria{i}') for i in range(1, 11)
+    }
+    hay_categorias = any(categorias.values())
+    current_y = y_start
+
+    if hay_categorias:
+        def dibujar_titulo():
+            c.setFont("Helvetica-Bold", 10)
+            c.drawString(X1_TITLE, 0, "FORMA DE PAGO Y DESCRIPCION DE LA REGULARIZACION")
+
+        _definir_forma(c, FORMA_TITULO_CATEGORIAS, dibujar_titulo, lowery=-10, uppery=15)
+        _estampar_forma(c, FORMA_TITULO_CATEGORIAS, current_y)
+        current_y -= 25
+
+        for key, (title, detail) in CATEGORY_DESCRIPTIONS.items():
+            if categorias.get(key, False):
+                def dibujar_categoria(title=title, detail=detail):
+                    draw_text_line_unit(c, title, X1_TITLE, 0, font_size=9, is_bold=True)
+                    c.drawString(520, 0, "X")
+                    draw_text_line_unit(c, detail, X1_TITLE, -15, font_size=8, is_bold=False)
+
+                nombre_forma = f'recibo_{key}'
+                _definir_forma(c, nombre_forma, dibujar_categoria, lowery=-25, uppery=15)
+                _estampar_forma(c, nombre_forma, current_y)
+                current_y -= 35
+
+    return current_y - 70
+
+def _draw_signatures_section(c, recibo_obj, y_start, width):
+    """Dibuja la sección de firmas del recibo unitario."""
+    current_y = y_start
+    line_width = 200
+    left_line_x = (width / 2 - line_width - 20)
+    right_line_x = (width / 2 + 20)
+
+    # LÍNEAS DE FIRMA Y FIRMA INSTITUCIÓN (fijas, form con las líneas en y=0)
+    def dibujar_firmas():
+        c.line(left_line_x, 0, left_line_x + line_width, 0)
+        c.line(right_line_x, 0, right_line_x + line_width, 0)
+
+        draw_centered_text_right_unit(c, -15, "Firma", left_line_x, line_width)
+
+        y_sig_inst = -15
+        draw_centered_text_right_unit(c, y_sig_inst, "Recibido por:", right_line_x, line_width)
+        y_sig_inst -= 13
+        draw_centered_text_right_unit(c, y_sig_inst, "PRESLEY ORTEGA", right_line_x, line_width, is_bold=True)
+        y_sig_inst -= 12
+        draw_centered_text_right_unit(c, y_sig_inst, "GERENTE DE ADMINISTRACIÓN Y SERVICIOS", right_line_x, line_width, font_size=9)
+        y_sig_inst -= 15
+        draw_centered_text_right_unit(c, y_sig_inst, "Designado según gaceta oficial n°43.062 de fecha", right_line_x, line_width, font_size=8)
+        y_sig_inst -= 10
+        draw_centered_text_right_unit(c, y_sig_inst, "16 de febrero de 2025 y Providencia de", right_line_x, line_width, font_size=8)
+        y_sig_inst -= 10
+        draw_centered_text_right_unit(c, y_sig_inst, "n°016-2024 de fecha 16 de diciembre de 2024", right_line_x, line_width, font_size=8)
+
+    _definir_forma(c, FORMA_FIRMAS, dibujar_firmas, lowery=-90, uppery=10)
+    _estampar_forma(c, FORMA_FIRMAS, current_y)
+
+    # FIRMA CLIENTE (variable)
+    y_sig = current_y - 28
+    draw_centered_text_right_unit(c, y_sig, recibo_obj.nombre, left_line_x, line_width, is_bold=True)
+    y_sig -= 12
+    draw_centered_text_right_unit(c, y_sig, f"C.I./RIF: {recibo_obj.rif_cedula_identidad}", left_line_x, line_width, font_size=9)
+
+
+# FUNCIÓN PRINCIPAL DE PDF UNITARIO
+
+def _dibujar_recibo(c, recibo_obj, width, height):
+    """
+    Dibuja un recibo completo sobre el canvas a partir de la página actual y la
+    cierra con showPage(). Se usa tanto para el PDF unitario como para el lote.
+    """
+    # Coordenadas
+    X1_TITLE = 60
+    X1_DATA = 160
+    X2_TITLE = 310
+    X2_DATA = 470
+    
+    # 1. Dibujar Encabezado
+    current_y = _draw_recibo_header(c, width, height)
+    
+    # 2. Dibujar Datos del Cuerpo
+    current_y = _draw_recibo_body_data(c, recibo_obj, current_y, X1_TITLE, X1_DATA, X2_TITLE, X2_DATA)
+    
+    # 3. Dibujar Categorías
+    if current_y < 350: 
+        logger.warning("Poco espacio disponible para dibujar la sección de categorías.")
+        
+    current_y = _draw_categorias_section(c, recibo_obj, current_y, X1_TITLE)
+    
+    # 4. Dibujar Firmas
+    if current_y < 150:
+        c.showPage()
+        current_y = height - 100
+    
+    _draw_signatures_section(c, recibo_obj, current_y, width)
+
+    c.showPage()
+
+
+def construir_pdf_recibo(recibo_obj, destino):
+    """Escribe el PDF de un recibo en `destino` (ruta de archivo o buffer)."""
+    c = canvas.Canvas(destino, pagesize=letter)
+    width, height = letter
+
+    _dibujar_recibo(c, recibo_obj, width, height)
+
+    c.save()
+
+
+def generar_pdf_recibo_unitario(recibo_obj):
+    """
+    Genera el contenido del PDF individual para un recibo de forma modular.
+    Retorna directamente el HttpResponse para forzar la descarga.
+    """
+    buffer = io.BytesIO()
+    construir_pdf_recibo(recibo_obj, buffer)
+    buffer.seek(0)
+    
+    filename = nombre_archivo_recibo(recibo_obj)
+    
+    response = HttpResponse(
+        buffer.getvalue(),
+        content_type='application/pdf'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# GENERACIÓN MASIVA: ZIP DE PDFs Y PDF ÚNICO POR LOTE
+
+def construir_zip_recibos(recibos, destino):
+    """
+    Genera un PDF independiente por recibo y los comprime en un ZIP escrito en
+    `destino` (ruta de archivo o buffer). Retorna la cantidad de PDFs generados.
+    """
+    count_success = 0
+
+    with zipfile.ZipFile(destino, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for recibo in recibos:
+            try:
+                pdf_response = generar_pdf_recibo_unitario(recibo)
+                num_recibo_zfill = str(recibo.numero_recibo).zfill(4) if recibo.numero_recibo else '0000'
+                filename = f"Recibo_N_{num_recibo_zfill}_{recibo.rif_cedula_identidad}.pdf"
+                zipf.writestr(filename, pdf_response.content)
+                count_success += 1
+            except Exception as e:
+                logger.error(f"Error al generar el PDF para el recibo PK={recibo.pk}: {e}")
+
+    return count_success
+
+
+def _cerrar_pagina_fallida(c, recibo_obj, width, height):
+    """
+    Termina la página de un recibo que falló a mitad del dibujo: cierra los
+    estados gráficos que quedaron abiertos, tapa lo que alcanzó a dibujarse y
+    deja la página marcada. El recibo siguiente empieza en una página limpia.
+    """
+    while c.state_stack:
+        c.restoreState()
+    c.setFillColorRGB(1, 1, 1)
+    c.rect(0, 0, width, height, stroke=0, fill=1)
+    c.setFillColorRGB(0, 0, 0)
+    c.setFont("Helvetica-Bold", 14)
+    num_recibo_zfill = str(recibo_obj.numero_recibo).zfill(4) if recibo_obj.numero_recibo else '0000'
+    c.drawCentredString(width / 2, height / 2, f"RECIBO N°{num_recibo_zfill} (PK={recibo_obj.pk}): NO SE PUDO GENERAR")
+    c.showPage()
+
+
+def construir_pdf_lote(recibos):
+    """
+    Dibuja todos los recibos como páginas de UN SOLO PDF sobre un mismo canvas.
+    Las fuentes y la imagen del encabezado se incrustan una sola vez (reportlab
+    reutiliza el XObject de una imagen dibujada varias veces con la misma ruta),
+    en lugar de repetir todo el documento por cada archivo como en el ZIP.
+    Un recibo que no se puede dibujar deja una página marcada en su lugar.
+    Retorna (bytes_del_pdf, cantidad_generada).
+    """
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+    count_success = 0
+
+    for recibo in recibos:
+        try:
+            _dibujar_recibo(c, recibo, width, height)
+            count_success += 1
+        except Exception as e:
+            logger.error(f"Error al dibujar el recibo PK={recibo.pk} en el lote: {e}")
+            _cerrar_pagina_fallida(c, recibo, width, height)
+
+    c.save()
+    return buffer.getvalue(), count_success
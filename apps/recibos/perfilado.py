@@ -0,0 +1,227 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# PERFILADO BAJO DEMANDA (solo personal autorizado)
+# Una petición de un usuario is_staff con la cabecera "X-Perfilar: 1" o el
+# parámetro ?perfilar=1 se ejecuta bajo perfilado y deja en RECIBOS_PERFILES_DIR:
+#   - <id>.prof       estadísticas de cProfile (pstats, snakeviz, etc.)
+#   - <id>.collapsed  pilas muestreadas en formato "collapsed" (flamegraph.pl,
+#                     speedscope, inferno)
+#   - <id>.json       vista, ruta, duración, usuario y modo
+# Con ?perfilar=muestreo solo corre el muestreador de pilas (casi sin costo
+# adicional, útil cuando cProfile distorsiona los tiempos). El muestreador es
+# un hilo que lee la pila del hilo de la petición con sys._current_frames().
+# Las respuestas transmitidas (ZIP, CSV) se perfilan hasta enviar el último bloque.
+# Las vistas async corren en otro hilo y no quedan cubiertas.
+
+# Identificador de captura: fecha-hora y sufijo aleatorio.
+PATRON_CAPTURA = re.compile(r'^\d{8}-\d{6}-[0-9a-f]{6}$')
+
+# Funciones listadas en el resumen de texto de un .prof.
+FUNCIONES_RESUMEN = 40
+
+
+# I. ACTIVACIÓN
+
+def modo_solicitado(request):
+    """'cprofile', 'muestreo' o None si la petición no pide perfilado o el usuario no es personal."""
+    valor = request.headers.get('X-Perfilar') or request.GET.get('perfilar')
+    if not valor or not settings.RECIBOS_PERFILADO_ACTIVO:
+        return None
+    usuario = getattr(request, 'user', None)
+    if not (usuario and usuario.is_authenticated and usuario.is_staff):
+        return None
+    return 'muestreo' if valor == 'muestreo' else 'cprofile'
+
+
+# II. CAPTURA
+
+class MuestreadorPilas:
+    """Cuenta las pilas del hilo `hilo_id` tomadas cada `intervalo` segundos."""
+
+    def __init__(self, hilo_id, intervalo):
+        self.hilo_id = hilo_id
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._ejecutar, name='perfilado-muestreo', daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        self._hilo.join()
+
+    def _ejecutar(self):
+        while not self._detener.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo_id)
+            marcos = []
+            while frame is not None:
+                codigo = frame.f_code
+                modulo = frame.f_globals.get('__name__', '?')
+                marcos.append(f"{modulo}.{getattr(codigo, 'co_qualname', codigo.co_name)}".replace(';', ':'))
+                frame = frame.f_back
+            if marcos:
+                self.pilas[';'.join(reversed(marcos))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{pila} {veces}\n' for pila, veces in self.pilas.most_common())
+
+
+class Captura:
+    """Perfilado de una petición: cProfile (opcional) y muestreo de pilas del hilo actual."""
+
+    def __init__(self, modo):
+        self.id = f'{timezone.localtime():%Y%m%d-%H%M%S}-{secrets.token_hex(3)}'
+        self.modo = modo
+        self.perfil = cProfile.Profile() if modo == 'cprofile' else None
+        self.muestreador = MuestreadorPilas(
+            threading.get_ident(), settings.RECIBOS_PERFILADO_INTERVALO_MS / 1000,
+        )
+        self.inicio = None
+
+    def iniciar(self):
+        self.inicio = time.perf_counter()
+        self.muestreador.iniciar()
+        if self.perfil is not None:
+            try:
+                self.perfil.enable()
+            except ValueError:
+                # Otro perfilador ya está activo en el hilo: queda solo el muestreo.
+                self.perfil, self.modo = None, 'muestreo'
+
+    def terminar(self, request, response):
+        if self.perfil is not None:
+            self.perfil.disable()
+        self.muestreador.detener()
+        ms = (time.perf_counter() - self.inicio) * 1000
+        try:
+            self._guardar(request, response, ms)
+        except OSError as e:
+            logger.error(f"No se pudo guardar el perfil {self.id}: {e}")
+
+    def envolver(self, contenido, request, response):
+        """Iterador de una respuesta transmitida que termina la captura al agotarse."""
+        try:
+            yield from contenido
+        finally:
+            self.terminar(request, response)
+
+    def _guardar(self, request, response, ms):
+        directorio = settings.RECIBOS_PERFILES_DIR
+        os.makedirs(directorio, exist_ok=True)
+        base = os.path.join(directorio, self.id)
+        if self.perfil is not None:
+            self.perfil.dump_stats(f'{base}.prof')
+        with open(f'{base}.collapsed', 'w', encoding='utf-8') as archivo:
+            archivo.write(self.muestreador.collapsed())
+
+        coincidencia = getattr(request, 'resolver_match', None)
+        datos = {
+            'id': self.id,
+            'fecha': timezone.now().isoformat(timespec='seconds'),
+            'vista': coincidencia.view_name if coincidencia else '-',
+            'metodo': request.method,
+            'ruta': request.get_full_path(),
+            'usuario': request.user.get_username(),
+            'modo': self.modo,
+            'ms': round(ms, 1),
+            'estado': response.status_code if response is not None else None,
+            'muestras': sum(self.muestreador.pilas.values()),
+        }
+        with open(f'{base}.json', 'w', encoding='utf-8') as archivo:
+            json.dump(datos, archivo, ensure_ascii=False)
+        logger.info(f"Perfil {self.id}: {datos['vista']} en {datos['ms']:.0f} ms ({self.modo}).")
+        depurar_perfiles()
+
+
+class PerfiladoMiddleware:
+    """Perfila las peticiones del personal que lo soliciten (va después de AuthenticationMiddleware)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        modo = modo_solicitado(request)
+        if modo is None:
+            return self.get_response(request)
+
+        captura = Captura(modo)
+        captura.iniciar()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            captura.terminar(request, None)
+            raise
+        if response.streaming and not response.is_async:
+            response.streaming_content = captura.envolver(response.streaming_content, request, response)
+        else:
+            captura.terminar(request, response)
+        response['X-Perfil'] = captura.id
+        return response
+
+
+# III. CONSULTA Y LIMPIEZA
+
+def ruta_perfil(captura, extension):
+    """Ruta de un archivo de la captura, o None si el identificador no es válido."""
+    if not PATRON_CAPTURA.match(captura or '') or extension not in ('prof', 'collapsed', 'json'):
+        return None
+    return os.path.join(settings.RECIBOS_PERFILES_DIR, f'{captura}.{extension}')
+
+
+def listar_perfiles():
+    """Metadatos de las capturas guardadas, la más reciente primero."""
+    directorio = settings.RECIBOS_PERFILES_DIR
+    if not os.path.isdir(directorio):
+        return []
+    perfiles = []
+    for nombre in sorted(os.listdir(directorio), reverse=True):
+        if not nombre.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directorio, nombre), encoding='utf-8') as archivo:
+                perfiles.append(json.load(archivo))
+        except (OSError, ValueError):
+            continue
+    return perfiles
+
+
+def resumen_perfil(captura, orden='cumulative'):
+    """Texto de pstats con las funciones principales del .prof, o None si no existe."""
+    ruta = ruta_perfil(captura, 'prof')
+    if ruta is None or not os.path.exists(ruta):
+        return None
+    salida = io.StringIO()
+    pstats.Stats(ruta, stream=salida).strip_dirs().sort_stats(orden).print_stats(FUNCIONES_RESUMEN)
+    return salida.getvalue()
+
+
+def depurar_perfiles():
+    """Conserva solo las últimas RECIBOS_PERFILES_MAX capturas."""
+    directorio = settings.RECIBOS_PERFILES_DIR
+    capturas = sorted({
+        nombre.split('.')[0] for nombre in os.listdir(directorio) if PATRON_CAPTURA.match(nombre.split('.')[0])
+    })
+    for captura in capturas[:max(0, len(capturas) - settings.RECIBOS_PERFILES_MAX)]:
+        for extension in ('prof', 'collapsed', 'json'):
+            try:
+                os.remove(os.path.join(directorio, f'{captura}.{extension}'))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,329 @@
+import csv
+import gzip
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .admision import fcntl
+from .contribuyentes import recalcular_todos
+from .models import Recibo
+from .particiones import TABLA_NUMEROS, es_postgresql, tabla_particionada
+from .versiones import incrementar_version_datos
+
+logger = logging.getLogger(__name__)
+
+# PURGA MASIVA DE RECIBOS (acción "clear_logs")
+# `Recibo.objects.all().delete()` carga toda la tabla en memoria para enviar
+# señales y resolver cascadas. La purga evita el ORM:
+#   1. Respaldo: la tabla completa se escribe en RECIBOS_RESPALDOS_DIR como CSV
+#      comprimido (gzip), por lotes, antes de borrar nada.
+#   2. Borrado: TRUNCATE en PostgreSQL (en la misma transacción que el respaldo,
+#      con la tabla bloqueada para escritura) o DELETE por lotes de ids en
+#      transacciones cortas. Solo se borran filas incluidas en el respaldo.
+#   3. La versión de los datos se incrementa una sola vez al final y se
+#      recalculan los totales de los contribuyentes (que se conservan).
+# La purga corre siempre en el comando `purgar_recibos`: el dashboard lo lanza
+# como un proceso aparte (sesión propia), así un timeout, el reciclado o el
+# apagado de un worker de gunicorn no la cortan a mitad de camino.
+# El progreso se publica en un archivo de estado compartido entre procesos, así
+# cualquier worker puede mostrarlo. Antes de borrar se guarda un punto de
+# control (respaldo, id máximo y total): si el proceso muere en el borrado por
+# lotes, el estado queda 'interrumpida' y `purgar_recibos --reanudar` termina
+# de borrar las mismas filas ya respaldadas.
+
+ARCHIVO_ESTADO = 'purga_estado.json'
+
+# Candado (flock) que tiene tomado el proceso que ejecuta la purga. El sistema
+# lo libera si el proceso muere, así una purga cortada nunca queda "en curso".
+ARCHIVO_CANDADO = 'purga.lock'
+
+# Filas por lote al respaldar y al borrar.
+FILAS_POR_LOTE = 5_000
+
+
+class PurgaEnCurso(Exception):
+    """Ya hay una purga ejecutándose (en este u otro proceso)."""
+
+
+class PurgaNoReanudable(Exception):
+    """No hay una purga interrumpida con punto de control para reanudar."""
+
+
+def directorio_respaldos():
+    directorio = Path(settings.RECIBOS_RESPALDOS_DIR)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+# I. ESTADO Y PROGRESO
+
+def estado_purga():
+    """
+    Estado de la última purga ({} si nunca se ejecutó una). Una purga que quedó
+    'en_curso' pero cuyo proceso ya no la ejecuta se informa como 'interrumpida'.
+    """
+    try:
+        with open(directorio_respaldos() / ARCHIVO_ESTADO, encoding='utf-8') as archivo:
+            estado = json.load(archivo)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if estado.get('estado') == 'en_curso' and not _purga_activa(estado):
+        estado['estado'] = 'interrumpida'
+    return estado
+
+
+def _guardar_estado(**datos):
+    directorio = directorio_respaldos()
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix='.tmp-', suffix='.json')
+    with os.fdopen(descriptor, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo)
+    os.replace(temporal, directorio / ARCHIVO_ESTADO)
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _candado_tomado():
+    """True si algún proceso tiene el candado de la purga."""
+    with open(directorio_respaldos() / ARCHIVO_CANDADO, 'a') as archivo:
+        try:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(archivo, fcntl.LOCK_UN)
+        return False
+
+
+def _purga_activa(estado):
+    if fcntl is None:
+        # Sin flock (Windows): se comprueba que el proceso siga vivo.
+        return _proceso_vivo(estado.get('pid', 0))
+    return _candado_tomado()
+
+
+def purga_en_curso():
+    return estado_purga().get('estado') == 'en_curso'
+
+
+_candado = threading.Lock()
+
+
+@contextmanager
+def _candado_purga():
+    """Exclusión entre procesos mientras dura la purga. Lanza PurgaEnCurso si otro la tiene."""
+    if fcntl is None:
+        with _candado:
+            if purga_en_curso():
+                raise PurgaEnCurso("Ya hay una limpieza de recibos en curso.")
+        yield
+        return
+    with open(directorio_respaldos() / ARCHIVO_CANDADO, 'a') as archivo:
+        try:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise PurgaEnCurso("Ya hay una limpieza de recibos en curso.")
+        try:
+            yield
+        finally:
+            fcntl.flock(archivo, fcntl.LOCK_UN)
+
+
+# II. RESPALDO Y BORRADO
+
+def _columnas():
+    return [campo.attname for campo in Recibo._meta.concrete_fields]
+
+
+def _respaldar(queryset, ruta, progreso, lote):
+    """Escribe `queryset` en un CSV gzip por lotes. Retorna la cantidad de filas."""
+    columnas = _columnas()
+    filas = 0
+    temporal = ruta.with_name(f'.tmp-{ruta.name}')
+    try:
+        with gzip.open(temporal, 'wt', encoding='utf-8', newline='') as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow(columnas)
+            for fila in queryset.values_list(*columnas).order_by('pk').iterator(chunk_size=lote):
+                escritor.writerow(fila)
+                filas += 1
+                if filas % lote == 0:
+                    progreso('respaldando', filas)
+        os.replace(temporal, ruta)
+    except BaseException:
+        temporal.unlink(missing_ok=True)
+        raise
+    return filas
+
+
+def _borrar_por_lotes(using, id_maximo, total, progreso, lote, eliminadas=0):
+    """DELETE de a `lote` ids (cada lote en su propia transacción). `eliminadas`: las ya borradas antes."""
+    conexion = connections[using]
+    tabla = conexion.ops.quote_name(Recibo._meta.db_table)
+    while True:
+        with transaction.atomic(using=using), conexion.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {tabla} WHERE id IN "
+                f"(SELECT id FROM {tabla} WHERE id <= %s ORDER BY id LIMIT %s)",
+                [id_maximo, lote],
+            )
+            borradas = cursor.rowcount
+        if borradas <= 0:
+            return eliminadas
+        eliminadas += borradas
+        progreso('eliminando', eliminadas, total)
+
+
+def _truncar(cursor):
+    tabla = Recibo._meta.db_table
+    if tabla_particionada(cursor):
+        # TRUNCATE no dispara triggers: la tabla de números únicos se vacía aparte.
+        cursor.execute(f"TRUNCATE {tabla}, {TABLA_NUMEROS}")
+    else:
+        cursor.execute(f"TRUNCATE {tabla}")
+
+
+def purgar_recibos(metodo='auto', using='default', progreso=None, lote=FILAS_POR_LOTE,
+                   punto_control=None, reanudar=None):
+    """
+    Respalda y elimina todos los recibos. `metodo`: 'truncate' (solo
+    PostgreSQL), 'lotes' o 'auto' (truncate si es posible). `progreso(fase,
+    filas, total=None)` recibe el avance y `punto_control(datos)` el respaldo,
+    id máximo y total antes de empezar a borrar por lotes. Con `reanudar` (esos
+    mismos datos) no se respalda: se borran las filas que quedaron del id máximo
+    hacia abajo. Retorna un dict con el resultado.
+    """
+    progreso = progreso or (lambda *args: None)
+    conexion = connections[using]
+    if reanudar:
+        metodo = 'lotes'
+    if metodo == 'auto':
+        metodo = 'truncate' if es_postgresql(conexion) else 'lotes'
+    if metodo == 'truncate' and not es_postgresql(conexion):
+        raise ValueError("TRUNCATE solo está disponible en PostgreSQL; use el método 'lotes'.")
+
+    inicio = time.monotonic()
+    ruta = directorio_respaldos() / f"recibos_{timezone.now():%Y%m%d_%H%M%S}.csv.gz"
+    queryset = Recibo.objects.using(using)
+
+    if metodo == 'truncate':
+        with transaction.atomic(using=using), conexion.cursor() as cursor:
+            # Bloquea escrituras (las lecturas siguen): nada entra entre el respaldo y el TRUNCATE.
+            cursor.execute(f"LOCK TABLE {Recibo._meta.db_table} IN SHARE ROW EXCLUSIVE MODE")
+            total = _respaldar(queryset, ruta, progreso, lote)
+            progreso('eliminando', 0, total)
+            _truncar(cursor)
+        eliminadas = total
+        progreso('eliminando', eliminadas, total)
+    elif reanudar:
+        ruta, id_maximo, total = Path(reanudar['respaldo']), reanudar['id_maximo'], reanudar['total']
+        previas = total - queryset.filter(id__lte=id_maximo).count()
+        progreso('eliminando', previas, total)
+        eliminadas = _borrar_por_lotes(using, id_maximo, total, progreso, lote, eliminadas=previas)
+    else:
+        id_maximo = queryset.aggregate(Max('id'))['id__max'] or 0
+        total = _respaldar(queryset.filter(id__lte=id_maximo), ruta, progreso, lote)
+        if punto_control:
+            punto_control({'respaldo': str(ruta), 'id_maximo': id_maximo, 'total': total})
+        progreso('eliminando', 0, total)
+        eliminadas = _borrar_por_lotes(using, id_maximo, total, progreso, lote)
+
+    recalcular_todos(using=using)
+    incrementar_version_datos()
+    resultado = {
+        'metodo': metodo,
+        'respaldo': str(ruta),
+        'total': total,
+        'eliminadas': eliminadas,
+        'segundos': round(time.monotonic() - inicio, 2),
+    }
+    logger.info(
+        f"Purga de recibos ({metodo}): {eliminadas} eliminados en {resultado['segundos']} s; respaldo en {ruta.name}."
+    )
+    return resultado
+
+
+# III. EJECUCIÓN CON ESTADO COMPARTIDO (comando purgar_recibos)
+
+def ejecutar_purga(metodo='auto', progreso=None, lote=FILAS_POR_LOTE, reanudar=False):
+    """
+    Ejecuta la purga publicando su avance en el archivo de estado. Con
+    `reanudar`, termina la purga interrumpida (PurgaNoReanudable si no hay una
+    con punto de control). Lanza PurgaEnCurso si ya hay otra en ejecución.
+    """
+    with _candado_purga():
+        anterior = estado_purga()
+        control = None
+        if reanudar:
+            # Con el candado tomado aquí, una purga 'en_curso' es una que quedó interrumpida.
+            control = anterior.get('punto_control')
+            if anterior.get('estado') not in ('en_curso', 'interrumpida') or not control:
+                raise PurgaNoReanudable("No hay una limpieza interrumpida que se pueda reanudar.")
+            metodo = 'lotes'
+        base = {'pid': os.getpid(), 'inicio': timezone.now().isoformat(), 'metodo': metodo}
+        if control:
+            base['punto_control'] = control
+        _guardar_estado(
+            estado='en_curso', fase='eliminando' if control else 'respaldando', filas=0, total=None, **base,
+        )
+
+        ultimo = 0.0
+
+        def publicar(fase, filas, total=None):
+            nonlocal ultimo
+            # Como máximo una escritura del estado cada 0,2 s.
+            if time.monotonic() - ultimo >= 0.2:
+                _guardar_estado(estado='en_curso', fase=fase, filas=filas, total=total, **base)
+                ultimo = time.monotonic()
+            if progreso:
+                progreso(fase, filas, total)
+
+        def guardar_punto_control(datos):
+            # Sin límite de frecuencia: a partir de aquí la purga se puede reanudar.
+            base['punto_control'] = datos
+            _guardar_estado(estado='en_curso', fase='eliminando', filas=0, total=datos['total'], **base)
+
+        try:
+            resultado = purgar_recibos(
+                metodo, progreso=publicar, lote=lote, punto_control=guardar_punto_control, reanudar=control,
+            )
+        except Exception as e:
+            logger.error(f"Error en la purga de recibos: {e}")
+            _guardar_estado(estado='error', error=str(e), fin=timezone.now().isoformat(), **base)
+            raise
+        _guardar_estado(estado='terminada', fin=timezone.now().isoformat(), **{**base, **resultado})
+        return resultado
+
+
+def iniciar_purga_en_segundo_plano(metodo='auto'):
+    """
+    Lanza `manage.py purgar_recibos` como un proceso aparte, fuera del worker
+    web. Su salida va a purga.log en RECIBOS_RESPALDOS_DIR. Lanza PurgaEnCurso
+    si ya hay una purga en ejecución.
+    """
+    if purga_en_curso():
+        raise PurgaEnCurso("Ya hay una limpieza de recibos en curso.")
+    with open(directorio_respaldos() / 'purga.log', 'ab') as registro:
+        return subprocess.Popen(
+            [sys.executable, 'manage.py', 'purgar_recibos', '--si', '--metodo', metodo],
+            cwd=str(settings.BASE_DIR), stdin=subprocess.DEVNULL, stdout=registro, stderr=registro,
+            start_new_session=True,
+        )
@@ -0,0 +1,324 @@
+import pandas as pd
+from django.db.models import QuerySet, Sum
+from decimal import Decimal
+import logging
+import io
+import os
+from django.http import HttpResponse
+from django.utils import timezone
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_LEFT, TA_CENTER
+from reportlab.lib.units import inch
+from .constants import CATEGORY_CHOICES_MAP
+from .memoria import etapa_memoria
+from .utils import HEADER_IMAGE, format_currency
+
+logger = logging.getLogger(__name__)
+
+CUSTOM_BLUE_DARK_TABLE = colors.HexColor("#427FBB")
+CUSTOM_GREY_VERY_LIGHT = colors.HexColor("#F7F7F7")
+
+# I. GENERACIÓN DE REPORTES (Excel y PDF)
+
+def _totales(recibos):
+    """
+    (cantidad, monto total) de los recibos del reporte: en la base si es un
+    queryset, o en memoria si es una lista combinada con el archivo frío.
+    """
+    if isinstance(recibos, QuerySet):
+        return recibos.count(), recibos.aggregate(total=Sum('total_monto_bs'))['total'] or Decimal(0)
+    return len(recibos), sum((recibo.total_monto_bs for recibo in recibos), Decimal(0))
+
+
+@etapa_memoria('reporte_excel')
+def construir_reporte_excel(queryset, filtros_aplicados, destino):
+    """
+    Escribe el reporte Excel (.xlsx) con datos detallados y totales en `destino`
+    (ruta de archivo o buffer).
+    """
+    
+    data = []
+
+    headers = [
+        'Número Recibo',
+        'Nombre',
+        'Cédula/RIF',
+        'Fecha',
+        'Estado',
+        'Monto Total (Bs.)',
+        'Tasa del Día', 
+        'Gastos Administrativos', 
+        'N° Transferencia',
+        'Concepto',
+        'Categorías'
+    ]
+
+    with etapa_memoria('reporte_excel.materializar_orm'):
+        recibos = list(queryset)
+
+    with etapa_memoria('reporte_excel.dataframe'):
+        for recibo in recibos:
+            categoria_detalle_nombres = [
+                CATEGORY_CHOICES_MAP.get(f'categoria{i}', f'Categoría {i} (Desconocida)')
+                for i in range(1, 11) if getattr(recibo, f'categoria{i}')
+            ]
+
+            categorias_concatenadas = ','.join(categoria_detalle_nombres)
+
+            row = [
+                "{:04d}".format(recibo.numero_recibo), 
+                recibo.nombre,
+                recibo.rif_cedula_identidad,
+                recibo.fecha.strftime('%Y-%m-%d'),
+                recibo.estado,
+                recibo.total_monto_bs, 
+                recibo.tasa_dia, 
+                recibo.gastos_administrativos, 
+                recibo.numero_transferencia,
+                recibo.concepto.strip(),
+                categorias_concatenadas
+            ]
+            data.append(row)
+
+        total_registros, total_monto_bs = _totales(queryset)
+    
+        # Datos de la hoja 'info_reporte'
+        info_data = [
+            ['Fecha de Generación', timezone.now().strftime('%Y-%m-%d %H:%M:%S')],
+            ['Período del Reporte', filtros_aplicados.get('periodo', 'Todos los períodos')],
+            ['Estado Filtrado', filtros_aplicados.get('estado', 'Todos los estados')],
+            ['Categorías Filtradas', filtros_aplicados.get('categorias', 'Todas las categorías')],
+            ['Total de Registros', total_registros],
+            ['Monto Total (Bs)', total_monto_bs],
+        ]
+        info_df = pd.DataFrame(info_data, columns=['Parámetro', 'Valor'])
+
+
+        df_recibos = pd.DataFrame(data, columns=headers)
+
+    with etapa_memoria('reporte_excel.xlsxwriter'), pd.ExcelWriter(destino, engine='xlsxwriter') as writer:
+
+        info_df.to_excel(writer, index=False, sheet_name='info_reporte')
+
+        df_recibos.to_excel(writer, index=False, sheet_name='Recibos', startrow=0, header=True)
+
+        workbook = writer.book
+        worksheet_recibos = writer.sheets['Recibos']
+
+        # Formatos de Excel para datos numéricos
+        money_format = workbook.add_format({'num_format': '#,##0.00', 'align': 'right'})
+        tasa_format = workbook.add_format({'num_format': '#,##0.0000', 'align': 'right'}) 
+        bold_format = workbook.add_format({'bold': True, 'bg_color': '#EAEAEA'})
+
+        # Ajuste de ancho de columnas y aplicación de formatos
+        worksheet_recibos.set_column('A:A', 15)
+        worksheet_recibos.set_column('B:C', 25)
+        worksheet_recibos.set_column('D:D', 12)
+        worksheet_recibos.set_column('E:E', 15)
+        worksheet_recibos.set_column('F:F', 18, money_format) 
+        worksheet_recibos.set_column('G:G', 18, tasa_format) 
+        worksheet_recibos.set_column('H:H', 18, money_format) 
+        worksheet_recibos.set_column('I:I', 20)
+        worksheet_recibos.set_column('J:J', 40)
+        worksheet_recibos.set_column('K:K', 50)
+
+
+        for col_num, value in enumerate(headers):
+            worksheet_recibos.write(0, col_num, value, bold_format)
+
+        worksheet_info = writer.sheets['info_reporte']
+        worksheet_info.set_column('A:A', 30)
+        worksheet_info.set_column('B:B', 40)
+
+        worksheet_info.write(0, 0, 'Parámetro', bold_format)
+        worksheet_info.write(0, 1, 'Valor', bold_format)
+        
+        # Aplicar formato de moneda al total en la hoja de info
+        worksheet_info.write_number(5, 1, total_monto_bs, money_format)
+
+
+def generar_reporte_excel(request_filters, queryset, filtros_aplicados):
+    """
+    Genera un reporte Excel (.xlsx) con datos detallados y totales.
+    Optimizado con campos adicionales y mejor formateo.
+    """
+    output = io.BytesIO()
+    construir_reporte_excel(queryset, filtros_aplicados, output)
+    output.seek(0)
+
+    filename = f"Reporte_Recibos_Masivo_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    response = HttpResponse(
+        output,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    response['Content-Disposition'] = f'attachment;filename="{filename}"'
+    return response
+
+
+# FUNCIÓN PRINCIPAL DE PDF REPORTE MASIVO
+
+def draw_report_logo_and_page_number(canvas, doc):
+    """Callback para dibujar el encabezado y pie de página en reportes masivos."""
+    canvas.saveState()
+    width, height = doc.pagesize
+
+    page_number = canvas.getPageNumber()
+
+    ruta_imagen = HEADER_IMAGE
+
+    if page_number == 1 and os.path.exists(ruta_imagen):
+        try:
+            img = ImageReader(ruta_imagen)
+            img_width, img_height = img.getSize()
+            scale = min(1.0, 700 / img_width)
+            draw_width = img_width * scale
+            draw_height = img_height * scale
+            x_center = (width - draw_width) / 2
+            y_top = height - draw_height - 10
+            canvas.drawImage(ruta_imagen, x=x_center, y=y_top, width=draw_width, height=draw_height)
+        except Exception as e:
+            logger.error(f"Error ReportLab al dibujar el encabezado en PDF: {e}")
+            pass
+
+    canvas.setFont('Helvetica', 8)
+    footer_text = f"Página {page_number}"
+
+    canvas.drawString(width - 70, 30, footer_text)
+    canvas.drawString(36, 30, f"Reporte generado el: {timezone.now().strftime('%d/%m/%Y %H:%M')}")
+
+    canvas.restoreState()
+
+
+@etapa_memoria('reporte_pdf')
+def construir_pdf_reporte(queryset, filtros_aplicados, destino):
+    """Escribe el reporte PDF masivo en `destino` (ruta de archivo o buffer)."""
+    doc = SimpleDocTemplate(
+        destino,
+        pagesize=landscape(letter),
+        leftMargin=36,
+        rightMargin=36,
+        topMargin=110, 
+        bottomMargin=40
+    )
+
+    Story = []
+    styles = getSampleStyleSheet()
+
+    # Definición de estilos
+    styles.add(ParagraphStyle(name='CenteredTitle', alignment=TA_CENTER, fontSize=16, fontName='Helvetica-Bold'))
+    styles.add(ParagraphStyle(
+        name='FilterTextLeft',
+        alignment=TA_LEFT,
+        fontSize=9, 
+        fontName='Helvetica', 
+        spaceAfter=2,
+        leftIndent=0,
+        firstLineIndent=0,
+        leading=12 
+    ))
+    styles.add(ParagraphStyle(name='ResumenTitleLeft', alignment=TA_LEFT, fontSize=11, fontName='Helvetica-Bold', spaceBefore=5, spaceAfter=5, firstLineIndent=0, leftIndent=0))
+
+    total_registros, total_monto_bs = _totales(queryset)
+
+    Story.append(Paragraph("REPORTE DE RECIBOS DE PAGO", styles['CenteredTitle']))
+    Story.append(Spacer(1, 10))
+
+    periodo_str = filtros_aplicados.get('periodo', 'Todos los períodos')
+    estado_str = filtros_aplicados.get('estado', 'Todos los estados')
+    categorias_str = filtros_aplicados.get('categorias', 'Todas las categorías')
+    
+    Story.append(Paragraph(f"<b>Período:</b> {periodo_str}", styles['FilterTextLeft']))
+    Story.append(Paragraph(f"<b>Estado:</b> {estado_str}, <b>Categorías:</b> {categorias_str}", styles['FilterTextLeft']))
+    Story.append(Spacer(1, 8))
+
+
+    table_data = []
+    table_headers = [
+        'Recibo', 'Nombre', 'Cédula/RIF', 'Monto (Bs)', 'Fecha', 'Estado',
+        'Transferencia', 'Concepto'
+    ]
+    table_data.append(table_headers)
+
+    col_widths = [
+        0.7 * inch, 1.7 * inch, 1.1 * inch, 1.0 * inch, 0.8 * inch, 0.9 * inch, 1.3 * inch, 2.5 * inch
+    ]
+
+    with etapa_memoria('reporte_pdf.materializar_orm'):
+        recibos = list(queryset)
+
+    with etapa_memoria('reporte_pdf.tabla'):
+        for recibo in recibos:
+            concepto_paragrah = Paragraph(recibo.concepto.strip() if recibo.concepto else '', styles['FilterTextLeft']) 
+        
+            table_data.append([
+                "{:04d}".format(recibo.numero_recibo) if recibo.numero_recibo else '', 
+                recibo.nombre,
+                recibo.rif_cedula_identidad,
+                format_currency(recibo.total_monto_bs),
+                recibo.fecha.strftime('%d/%m/%Y'),
+                recibo.estado,
+                recibo.numero_transferencia if recibo.numero_transferencia else '',
+                concepto_paragrah 
+            ])
+
+        table = Table(table_data, colWidths=col_widths) 
+
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), CUSTOM_BLUE_DARK_TABLE),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (3, 1), (3, -1), 'RIGHT'), 
+            ('ALIGN', (4, 1), (4, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+            ('BACKGROUND', (0, 1), (-1, -1), CUSTOM_GREY_VERY_LIGHT), 
+            ('BACKGROUND', (0, 1), (-1, 1), colors.white), 
+            ('BACKGROUND', (0, 3), (-1, 3), colors.white), 
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey),
+            ('BOX', (0, 0), (-1, -1), 0.5, colors.black),
+            ('VALIGN', (7, 1), (7, -1), 'TOP'), 
+            ('ALIGN', (7, 1), (7, -1), 'LEFT'),
+        ]))
+
+    Story.append(table)
+    Story.append(Spacer(1, 20))
+
+
+    Story.append(Paragraph("RESUMEN DEL REPORTE:", styles['ResumenTitleLeft']))
+    Story.append(Paragraph(f"<b>Total de Recibos:</b> {total_registros}", styles['FilterTextLeft']))
+    Story.append(Paragraph(f"<b>Monto Total Bs:</b> {format_currency(total_monto_bs)}", styles['FilterTextLeft']))
+    Story.append(Spacer(1, 1))
+    Story.append(Paragraph(f"<b>Período Filtrado:</b> {periodo_str}", styles['FilterTextLeft']))
+    Story.append(Paragraph(f"<b>Estado Filtrado:</b> {estado_str}", styles['FilterTextLeft']))
+    Story.append(Paragraph(f"<b>Categorías Filtradas:</b> {categorias_str}", styles['FilterTextLeft']))
+
+    logo_footer_callback = lambda canvas, doc: draw_report_logo_and_page_number(
+        canvas, doc
+    )
+
+    with etapa_memoria('reporte_pdf.reportlab'):
+        doc.build(
+            Story,
+            onFirstPage=logo_footer_callback,
+            onLaterPages=logo_footer_callback
+        )
+
+
+def generar_pdf_reporte(queryset, filtros_aplicados):
+
+    buffer = io.BytesIO()
+    construir_pdf_reporte(queryset, filtros_aplicados, buffer)
+    buffer.seek(0)
+
+    filename = f"Reporte_Recibos_PDF_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    response = HttpResponse(
+        buffer.getvalue(),
+        content_type='application/pdf'
+    )
+    response['Content-Disposition'] = f'attachment;filename="{filename}"'
+    return response
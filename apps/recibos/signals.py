@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .contribuyentes import actualizar_totales
+from .models import Recibo, TasaBCV
+from .tasas import invalidar_cache_tasas
+from .versiones import incrementar_version_datos
+
+
+@receiver(post_save, sender=Recibo, dispatch_uid='recibos_version_post_save')
+@receiver(post_delete, sender=Recibo, dispatch_uid='recibos_version_post_delete')
+def invalidar_version_datos(sender, using, **kwargs):
+    """
+    Cualquier alta, modificación, anulación o eliminación cambia la versión, al
+    confirmarse la transacción: si cambiara antes, un lector concurrente
+    guardaría en caché los datos viejos bajo la versión nueva.
+    """
+    transaction.on_commit(incrementar_version_datos, using=using)
+
+
+@receiver(post_save, sender=Recibo, dispatch_uid='recibos_contribuyente_post_save')
+@receiver(post_delete, sender=Recibo, dispatch_uid='recibos_contribuyente_post_delete')
+def actualizar_totales_contribuyente(sender, instance, using, signal, raw=False, **kwargs):
+    """Recalcula los totales del contribuyente del recibo (y del anterior si cambió el RIF)."""
+    if not raw:
+        actualizar_totales(instance.contribuyentes_afectados(eliminado=signal is post_delete), using=using)
+
+
+@receiver(post_save, sender=TasaBCV, dispatch_uid='recibos_tasas_post_save')
+@receiver(post_delete, sender=TasaBCV, dispatch_uid='recibos_tasas_post_delete')
+def invalidar_tasas(sender, **kwargs):
+    """La copia en memoria de las tasas de este proceso se vuelve a leer."""
+    invalidar_cache_tasas()
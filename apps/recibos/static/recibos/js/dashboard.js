@@ -128,7 +128,10 @@ document.addEventListener('DOMContentLoaded', function() {
     // Manejar la selección de archivos
     excelFileInput.addEventListener('change', function() {
         if (this.files.length > 0) {
-            const fileName = this.files[0].name;
+            // Varios libros o un ZIP se importan en paralelo en el servidor.
+            const fileName = this.files.length > 1
+                ? `${this.files.length} archivos (${Array.from(this.files).map(f => f.name).join(', ')})`
+                : this.files[0].name;
             
             appendLog(`Archivo detectado: "${fileName}". Interfaz lista para subida.`, 'client', false);
 
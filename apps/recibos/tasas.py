@@ -0,0 +1,167 @@
+import bisect
+import csv
+import io
+import logging
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery
+from django.db.models.functions import Abs
+
+from .models import Recibo, TasaBCV
+
+logger = logging.getLogger(__name__)
+
+# TASA BCV DEL DÍA
+# La tasa oficial se guarda una vez por fecha en `recibos_tasa_bcv`. Cada
+# proceso mantiene en memoria la tabla completa (unas pocas miles de filas),
+# ordenada por fecha, durante RECIBOS_TASAS_CACHE_SEGUNDOS:
+#   - tasa_vigente(fecha): búsqueda binaria, sin consultas.
+#   - tabla_tasas(): la lista (fecha, tasa) que el importador cruza con todas
+#     las filas del libro de una vez (merge por fecha, ver importacion.py).
+# Guardar o borrar una tasa invalida la copia del proceso actual; los demás la
+# renuevan al vencer el plazo.
+# El total de un recibo es gastos_administrativos x tasa; verificar_montos
+# compara cada recibo con la tasa almacenada en una sola consulta.
+
+_tabla = {'fechas': [], 'tasas': [], 'cargada': None}
+_candado = threading.Lock()
+
+
+# I. CACHÉ EN MEMORIA
+
+def invalidar_cache_tasas():
+    with _candado:
+        _tabla['cargada'] = None
+
+
+def _vigente():
+    with _candado:
+        cargada = _tabla['cargada']
+        if cargada is not None and time.monotonic() - cargada < settings.RECIBOS_TASAS_CACHE_SEGUNDOS:
+            return _tabla['fechas'], _tabla['tasas']
+
+    filas = list(TasaBCV.objects.order_by('fecha').values_list('fecha', 'tasa'))
+    fechas, tasas = [fila[0] for fila in filas], [fila[1] for fila in filas]
+    with _candado:
+        _tabla.update(fechas=fechas, tasas=tasas, cargada=time.monotonic())
+    return fechas, tasas
+
+
+def tabla_tasas():
+    """Lista de (fecha, tasa) ordenada por fecha."""
+    fechas, tasas = _vigente()
+    return list(zip(fechas, tasas))
+
+
+def tasa_vigente(fecha):
+    """Tasa publicada en `fecha` o, si ese día no hubo publicación, la anterior más cercana. None si no hay."""
+    fechas, tasas = _vigente()
+    posicion = bisect.bisect_right(fechas, fecha)
+    return tasas[posicion - 1] if posicion else None
+
+
+# II. CARGA DE TASAS
+
+def _parsear_tasa(valor):
+    texto = str(valor).strip().replace(' ', '')
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    return Decimal(texto)
+
+
+def _parsear_fecha(valor):
+    for formato in ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y'):
+        try:
+            return datetime.strptime(valor.strip(), formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha inválida: '{valor}'")
+
+
+def leer_tasas_csv(contenido):
+    """
+    {fecha: tasa} desde un CSV de dos columnas (fecha; tasa), con o sin
+    encabezado, separado por ',' o ';'. Acepta fechas dd/mm/aaaa o ISO y tasas
+    con coma decimal.
+    """
+    texto = contenido.decode('utf-8-sig') if isinstance(contenido, bytes) else contenido
+    separador = ';' if ';' in texto.split('\n', 1)[0] else ','
+    tasas = {}
+    for numero, fila in enumerate(csv.reader(io.StringIO(texto), delimiter=separador), start=1):
+        if len(fila) < 2 or not fila[0].strip():
+            continue
+        try:
+            tasas[_parsear_fecha(fila[0])] = _parsear_tasa(fila[1])
+        except (ValueError, InvalidOperation):
+            if numero == 1:
+                continue  # encabezado
+            raise ValueError(f"Línea {numero}: no se pudo leer '{separador.join(fila)}'.")
+    return tasas
+
+
+def tasas_desde_recibos():
+    """
+    {fecha: tasa} con la tasa más repetida de cada fecha entre los recibos
+    vigentes (GROUP BY fecha, tasa_dia), para sembrar la tabla.
+    """
+    grupos = (
+        Recibo.objects.filter(anulado=False, tasa_dia__gt=0)
+        .values('fecha', 'tasa_dia').annotate(n=Count('pk'))
+        .order_by('fecha', '-n', 'tasa_dia')
+        .values_list('fecha', 'tasa_dia')
+    )
+    tasas = {}
+    for fecha, tasa in grupos:
+        tasas.setdefault(fecha, tasa)
+    return tasas
+
+
+def guardar_tasas(tasas, reemplazar=True):
+    """
+    Upsert en lote de {fecha: tasa}. Sin `reemplazar`, las fechas que ya
+    tienen tasa se conservan. Retorna la cantidad de fechas procesadas.
+    """
+    objetos = [TasaBCV(fecha=fecha, tasa=tasa) for fecha, tasa in sorted(tasas.items())]
+    if reemplazar:
+        TasaBCV.objects.bulk_create(
+            objetos, batch_size=500,
+            update_conflicts=True, unique_fields=['fecha'], update_fields=['tasa', 'fecha_modificacion'],
+        )
+    else:
+        TasaBCV.objects.bulk_create(objetos, batch_size=500, ignore_conflicts=True)
+    invalidar_cache_tasas()
+    return len(objetos)
+
+
+# III. VERIFICACIÓN DE MONTOS (una sola consulta)
+
+def recibos_con_tasa_bcv(queryset=None):
+    """
+    Anota cada recibo con la tasa BCV vigente en su fecha (`tasa_bcv`), el monto
+    esperado (gastos_administrativos x tasa_bcv) y la `diferencia` con el total
+    registrado. La tasa sale de una subconsulta por el índice único de la fecha.
+    """
+    queryset = Recibo.objects.filter(anulado=False) if queryset is None else queryset
+    tasa_bcv = TasaBCV.objects.filter(fecha__lte=OuterRef('fecha')).order_by('-fecha').values('tasa')[:1]
+    decimal = DecimalField(max_digits=17, decimal_places=2)
+    return queryset.annotate(
+        tasa_bcv=Subquery(tasa_bcv, output_field=TasaBCV._meta.get_field('tasa')),
+    ).annotate(
+        monto_esperado=ExpressionWrapper(F('gastos_administrativos') * F('tasa_bcv'), output_field=decimal),
+    ).annotate(
+        diferencia=ExpressionWrapper(F('total_monto_bs') - F('monto_esperado'), output_field=decimal),
+    )
+
+
+def discrepancias_montos(tolerancia=Decimal('0.01'), queryset=None):
+    """Recibos cuyo total difiere en más de `tolerancia` Bs del calculado con la tasa BCV."""
+    return (
+        recibos_con_tasa_bcv(queryset)
+        .annotate(diferencia_absoluta=Abs('diferencia'))
+        .filter(diferencia_absoluta__gt=tolerancia)
+        .order_by('fecha', 'numero_recibo')
+    )
@@ -1,3 +1,1562 @@
-from django.test import TestCase
+import base64
+import calendar
+import csv
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from sistema_gestion.routers import PrimaryReplicaRouter, leyendo_de_primaria, usar_primaria
+from .admision import estado_admision, metricas_admision, operacion_pesada
+from .archivo_frio import (
+    ArchivoFrioError, archivar_anio, combinar_con_archivo, numero_maximo_archivado,
+    parquet_disponible, recibo_archivado,
+)
+from .artefactos import depurar_artefactos, recuperar_artefacto
+from .cambios import lineas_cambios
+from .busqueda import construir_filtro_busqueda, rellenar_campos_busqueda
+from .memoria import informe_memoria, metricas_memoria
+from .consultas_lentas import _admite_analyze, _es_select, esperar_registros, leer_registros
+from .contribuyentes import actualizar_totales, rellenar_contribuyentes, vincular_contribuyentes
+from .cache_reportes import obtener_reporte
+from .exportaciones import ejecutar_exportacion
+from .filtros import filtrar_recibos_reporte, firma_filtros_reporte, parsear_fecha
+from . import importacion
+from .importacion import (
+    ErrorImportacion, importar_varios_archivos, leer_csv, mensaje_resumen, preparar_archivo, preparar_libros,
+)
+from .forms import ReciboForm
+from .models import Contribuyente, Recibo, SecuenciaCambios, TasaBCV, VersionDatos
+from .purga import ejecutar_purga, estado_purga, purgar_recibos
+from .tasas import guardar_tasas, invalidar_cache_tasas, tasa_vigente
+from .versiones import incrementar_version_datos, obtener_version_datos
+
+
+# I. UTILIDADES COMUNES DE LOS TESTS
+
+def crear_recibos(cantidad, anulado=False, numero_inicial=1, **extra):
+    """Crea `cantidad` recibos con datos deterministas en una sola inserción."""
+    fecha_base = date(2025, 1, 1)
+    recibos = []
+    for i in range(cantidad):
+        datos = {
+            'numero_recibo': numero_inicial + i,
+            'estado': 'MIRANDA' if i % 2 else 'ZULIA',
+            'nombre': f'Contribuyente Prueba {numero_inicial + i}',
+            'rif_cedula_identidad': f'V{10000000 + numero_inicial + i}',
+            'direccion_inmueble': 'Calle Principal, Casa 1',
+            'ente_liquidado': 'INTU',
+            'categoria1': i % 3 == 0,
+            'categoria2': i % 3 == 1,
+            'gastos_administrativos': Decimal('140.00'),
+            'tasa_dia': Decimal('36.5000'),
+            'total_monto_bs': Decimal('5110.00'),
+            'numero_transferencia': f'TRF{numero_inicial + i}',
+            'fecha': fecha_base + timedelta(days=i % 90),
+            'concepto': 'Pago de regularización',
+            'anulado': anulado,
+        }
+        datos.update(extra)
+        recibo = Recibo(**datos)
+        recibo.actualizar_campos_busqueda()
+        recibos.append(recibo)
+    contribuyentes = vincular_contribuyentes(recibos)
+    creados = Recibo.objects.bulk_create(recibos)
+    actualizar_totales(contribuyentes)
+    return creados
+
+
+def libro_excel(cantidad, nombre='Contribuyente', **columnas):
+    """Libro .xlsx (bytes) con el formato de carga: hoja 'Hoja2' y encabezado en la fila 4."""
+    import pandas as pd
+    from .importacion import COLUMNAS_CANONICAS
+
+    filas = []
+    for i in range(cantidad):
+        fila = dict.fromkeys(COLUMNAS_CANONICAS, '')
+        fila.update({
+            'estado': 'Zulia', 'nombre': f'{nombre} {i}',
+            'rif_cedula_identidad': f'V-{20000000 + i}',
+            'direccion_inmueble': 'calle 1', 'ente_liquidado': 'intu', 'categoria1': 'x',
+            'gastos_administrativos': '140,00', 'tasa_dia': '36,5', 'total_monto_bs': '5.110,00',
+            'numero_transferencia': f'trf{i}', 'conciliado': 'no', 'fecha': '15/03/2025', 'concepto': 'pago',
+        })
+        fila.update(columnas)
+        filas.append(fila)
+    buffer = io.BytesIO()
+    pd.DataFrame(filas, columns=COLUMNAS_CANONICAS).to_excel(buffer, sheet_name='Hoja2', startrow=3, index=False)
+    return buffer.getvalue()
+
+
+class PresupuestoConsultasMixin:
+    """
+    Fija el número EXACTO de consultas SQL y un presupuesto de tiempo para una
+    petición. Si alguno se supera, el fallo imprime todo el SQL capturado para
+    identificar de inmediato la consulta N+1 o el COUNT repetido.
+    """
+
+    def assertPresupuesto(self, consultas, segundos, funcion):
+        factor = getattr(settings, 'RECIBOS_TEST_FACTOR_TIEMPO', 1)
+
+        # Se capturan todas las conexiones (primaria y réplica) para que el
+        # conteo no dependa del enrutamiento.
+        with ExitStack() as stack:
+            capturas = {
+                alias: stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in connections
+            }
+            inicio = time.perf_counter()
+            resultado = funcion()
+            duracion = time.perf_counter() - inicio
+
+        capturadas = [
+            (alias, q) for alias, captura in capturas.items() for q in captura.captured_queries
+        ]
+        sql_capturado = '\n'.join(
+            f"  {i}. [{alias}] ({q['time']}s) {q['sql']}"
+            for i, (alias, q) in enumerate(capturadas, start=1)
+        )
+
+        if len(capturadas) != consultas:
+            self.fail(
+                f"Se esperaban {consultas} consultas y se ejecutaron {len(capturadas)}:\n"
+                f"{sql_capturado}"
+            )
+        if duracion > segundos * factor:
+            self.fail(
+                f"La petición tardó {duracion:.3f}s (presupuesto {segundos * factor:.3f}s). "
+                f"Consultas ejecutadas:\n{sql_capturado}"
+            )
+        return resultado
+
+
+# II. REGRESIÓN DE CONSULTAS Y LATENCIA POR VISTA
+
+class RendimientoVistasTests(PresupuestoConsultasMixin, TestCase):
+    """
+    Tamaños de fixture fijos: 60 recibos vigentes y 30 anulados. Los conteos
+    están fijados a propósito; si un cambio los altera, actualícelos solo
+    después de justificar la consulta nueva.
+    """
+    databases = {'default', 'replica'}
+
+    RECIBOS_VIGENTES = 60
+    RECIBOS_ANULADOS = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_recibos(cls.RECIBOS_VIGENTES)
+        crear_recibos(cls.RECIBOS_ANULADOS, anulado=True, numero_inicial=1001)
+        cls.recibo = Recibo.objects.filter(anulado=False).order_by('pk').first()
+
+    def setUp(self):
+        # Los conteos se fijan con la caché de fragmentos vacía (render en frío).
+        cache.clear()
+
+    def test_dashboard(self):
+        # Versión de los datos + COUNT del paginador + página de recibos + estados únicos del filtro
+        response = self.assertPresupuesto(
+            4, 0.5, lambda: self.client.get(reverse('recibos:dashboard'))
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['recibos']), 20)
+
+    def test_dashboard_con_cache_caliente(self):
+        self.client.get(reverse('recibos:dashboard'))
+        # El panel de filtros sale de la caché: ya no se consultan los estados únicos.
+        response = self.assertPresupuesto(
+            3, 0.5, lambda: self.client.get(reverse('recibos:dashboard'))
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_dashboard_con_filtros_y_busqueda(self):
+        params = {
+            'estado': 'MIRANDA',
+            'fecha_inicio': '2025-01-01',
+            'fecha_fin': '2025-03-31',
+            'categoria1': 'on',
+            'q': 'Contribuyente',
+        }
+        response = self.assertPresupuesto(
+            4, 0.5, lambda: self.client.get(reverse('recibos:dashboard'), params)
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_recibos_anulados(self):
+        response = self.assertPresupuesto(
+            2, 0.5, lambda: self.client.get(reverse('recibos:recibos_anulados'))
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['recibos']), 20)
+
+    def test_recibos_anulados_busqueda(self):
+        response = self.assertPresupuesto(
+            2, 0.5,
+            lambda: self.client.get(reverse('recibos:recibos_anulados'), {'q': '1005'})
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_modificar_recibo_get(self):
+        url = reverse('recibos:modificar_recibo', kwargs={'pk': self.recibo.pk})
+        response = self.assertPresupuesto(1, 0.5, lambda: self.client.get(url))
+        self.assertEqual(response.status_code, 200)
+
+    def test_modificar_recibo_post(self):
+        url = reverse('recibos:modificar_recibo', kwargs={'pk': self.recibo.pk})
+        datos = {
+            'numero_recibo': self.recibo.numero_recibo,
+            'estado': 'Mérida',
+            'nombre': 'nombre modificado',
+            'rif_cedula_identidad': 'v-10.000.001',
+            'direccion_inmueble': 'Otra dirección',
+            'ente_liquidado': 'intu',
+            'gastos_administrativos': '140.00',
+            'tasa_dia': '36.5000',
+            'total_monto_bs': '5110.00',
+            'numero_transferencia': 'trf-1',
+            'fecha': '2025-02-01',
+            'concepto': 'Pago',
+        }
+        # Recibo + validación de unicidad de numero_recibo + secuencia de cambios +
+        # UPDATE + totales del contribuyente (cambió la fecha; el RIF normalizado es el mismo)
+        response = self.assertPresupuesto(5, 0.5, lambda: self.client.post(url, datos))
+        self.assertEqual(response.status_code, 302)
+        self.recibo.refresh_from_db()
+        self.assertEqual(self.recibo.estado, 'MERIDA')
+
+    def test_reporte_excel(self):
+        # Versión de los datos + recibos filtrados + SUM del total (el COUNT reutiliza la caché del queryset)
+        response = self.assertPresupuesto(
+            3, 2.0,
+            lambda: self.client.get(reverse('recibos:generar_reporte'), {'action': 'excel'})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Type'],
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+
+    def test_reporte_pdf(self):
+        # Versión de los datos + COUNT + SUM + recibos filtrados (el len() del mensaje reutiliza la caché)
+        response = self.assertPresupuesto(
+            4, 3.0,
+            lambda: self.client.get(reverse('recibos:generar_reporte'), {'action': 'pdf'})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+    def test_generar_zip_recibos(self):
+        pks = Recibo.objects.filter(anulado=False).values_list('pk', flat=True)[:25]
+        pks_str = ','.join(map(str, pks))
+        response = self.assertPresupuesto(
+            1, 3.0,
+            lambda: self.client.get(reverse('recibos:generar_zip_recibos'), {'pks': pks_str})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+
+    def test_generar_pdf_lote(self):
+        pks = Recibo.objects.filter(anulado=False).values_list('pk', flat=True)[:25]
+        pks_str = ','.join(map(str, pks))
+        response = self.assertPresupuesto(
+            1, 1.5,
+            lambda: self.client.get(reverse('recibos:generar_pdf_lote'), {'pks': pks_str})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+        # Una página por recibo y la imagen del encabezado incrustada una sola vez.
+        self.assertEqual(len(re.findall(rb'/Type /Page\b(?!s)', response.content)), 25)
+        self.assertEqual(response.content.count(b'/Subtype /Image'), 1)
+
+        # La plantilla estática se define una vez por documento como form XObject:
+        # encabezado, etiquetas, título de categorías, categoría 1, categoría 2 y firmas.
+        self.assertEqual(response.content.count(b'/Subtype /Form'), 6)
+
+    def test_pdf_lote_marca_la_pagina_del_recibo_que_falla(self):
+        from .pdf_recibos import construir_pdf_lote
+
+        recibos = list(Recibo.objects.filter(anulado=False).order_by('pk')[:3])
+        recibos[1].fecha = None  # falla después de estampar el encabezado
+        with self.assertLogs('apps.recibos.pdf_recibos', 'ERROR'):
+            contenido, generados = construir_pdf_lote(recibos)
+
+        # La página a medio dibujar se cierra marcada: el recibo siguiente no se dibuja encima.
+        self.assertEqual(generados, 2)
+        self.assertEqual(len(re.findall(rb'/Type /Page\b(?!s)', contenido)), 3)
+        flujos = [
+            zlib.decompress(base64.a85decode(flujo, adobe=True))
+            for flujo in re.findall(rb'/ASCII85Decode /FlateDecode \][^>]*>>\s*stream\r?\n(.*?~>)', contenido, re.S)
+        ]
+        self.assertEqual(sum(b'NO SE PUDO GENERAR' in flujo for flujo in flujos), 1)
+
+
+# III. ENRUTAMIENTO PRIMARIA / RÉPLICA
+
+class EnrutamientoReplicaTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_recibos(3)
+
+    def _aliases_usados(self, funcion):
+        with CaptureQueriesContext(connections['default']) as primaria, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            funcion()
+        return len(primaria), len(replica)
+
+    def test_router_lecturas_a_replica_y_escrituras_a_primaria(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Recibo), 'replica')
+        self.assertEqual(router.db_for_write(Recibo), 'default')
+        with usar_primaria():
+            self.assertEqual(router.db_for_read(Recibo), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'recibos'))
+
+    def test_dashboard_lee_de_replica(self):
+        primaria, replica = self._aliases_usados(
+            lambda: self.client.get(reverse('recibos:dashboard'))
+        )
+        self.assertEqual(primaria, 0)
+        self.assertGreater(replica, 0)
+
+    def test_post_y_lectura_posterior_van_a_primaria(self):
+        recibo = Recibo.objects.first()
+        primaria, replica = self._aliases_usados(
+            lambda: self.client.post(
+                reverse('recibos:dashboard'), {'action': 'anular', 'recibo_id': recibo.pk}
+            )
+        )
+        self.assertEqual(replica, 0)
+        self.assertIn(settings.REPLICA_PIN_COOKIE, self.client.cookies)
+
+        # La cookie de fijación mantiene la siguiente lectura en la primaria.
+        primaria, replica = self._aliases_usados(
+            lambda: self.client.get(reverse('recibos:recibos_anulados'))
+        )
+        self.assertGreater(primaria, 0)
+        self.assertEqual(replica, 0)
+
+
+# IV. ARRANQUE DE WORKERS (IMPORTACIONES PEREZOSAS)
+
+class ImportacionesPerezosasTests(TestCase):
+
+    def test_vistas_no_cargan_pandas_ni_reportlab(self):
+        script = (
+            "import django, sys; django.setup(); "
+            "from django.urls import get_resolver; get_resolver().url_patterns; "
+            "print('pandas' in sys.modules, 'reportlab' in sys.modules)"
+        )
+        salida = subprocess.run(
+            [sys.executable, '-c', script],
+            cwd=str(settings.BASE_DIR), env=os.environ.copy(),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        self.assertEqual(salida, 'False False')
+
+    def test_utils_mantiene_acceso_perezoso(self):
+        from . import utils
+        from .pdf_recibos import generar_pdf_recibo_unitario
+        self.assertIs(utils.generar_pdf_recibo_unitario, generar_pdf_recibo_unitario)
+
+
+# V. CACHÉ DE FRAGMENTOS DEL DASHBOARD
+
+class CacheFragmentosDashboardTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_recibos(3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_guardar_recibo_incrementa_version_de_datos(self):
+        version = obtener_version_datos()
+        recibo = Recibo.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            recibo.save()
+            # Hasta la confirmación, los lectores siguen con la versión anterior.
+            self.assertEqual(obtener_version_datos(), version)
+        self.assertGreater(obtener_version_datos(), version)
+
+    def test_version_vive_en_la_base(self):
+        version = obtener_version_datos()
+        incrementar_version_datos()
+        incrementar_version_datos()
+        # Vaciar la caché no la reinicia: es una fila de la base, incrementada con UPDATE.
+        cache.clear()
+        self.assertEqual(obtener_version_datos(), version + 2)
+        self.assertEqual(VersionDatos.objects.get(pk=1).valor, version + 2)
+
+    def test_fila_se_renderiza_de_nuevo_al_modificar(self):
+        recibo = Recibo.objects.order_by('-fecha', '-numero_recibo').first()
+        self.client.get(reverse('recibos:dashboard'))
+
+        recibo.nombre = 'Nombre Actualizado'
+        with self.captureOnCommitCallbacks(execute=True):
+            recibo.save()
+        response = self.client.get(reverse('recibos:dashboard'))
+        self.assertContains(response, 'Nombre Actualizado')
+
+    def test_panel_de_filtros_refleja_estados_nuevos(self):
+        self.client.get(reverse('recibos:dashboard'))
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_recibos(1, numero_inicial=500, estado='FALCON')[0].save()
+        response = self.client.get(reverse('recibos:dashboard'))
+        self.assertContains(response, 'value="FALCON"')
+
+
+# VI. BÚSQUEDA TIPADA E ÍNDICES PARCIALES (EXPLAIN)
+
+class BusquedaTipadaTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_recibos(40)
+        crear_recibos(40, anulado=True, numero_inicial=500)
+
+    def _plan(self, queryset):
+        return queryset.explain()
+
+    def assertUsaIndice(self, plan, indice=None):
+        """El plan debe resolverse con índices, nunca con un recorrido completo."""
+        lineas = plan.splitlines()
+        recorridos = [
+            l for l in lineas
+            if ('SCAN recibos_pago' in l and 'USING' not in l) or 'Seq Scan' in l
+        ]
+        self.assertFalse(recorridos, f"Recorrido completo de la tabla:\n{plan}")
+        if indice:
+            self.assertIn(indice, plan)
+
+    def test_parser_numerico(self):
+        self.assertEqual(
+            construir_filtro_busqueda(' 1005 '),
+            Q(numero_recibo=1005) | Q(pk=1005) | Q(numero_transferencia__prefijo='1005'),
+        )
+        filtro = construir_filtro_busqueda('12345678')
+        self.assertIn(
+            ('rif_normalizado__in', ['12345678', 'V12345678', 'E12345678', 'J12345678',
+                                          'G12345678', 'P12345678', 'C12345678']),
+            filtro.children,
+        )
+
+    def test_parser_rif_y_texto(self):
+        self.assertEqual(
+            construir_filtro_busqueda('v-12.345.678'),
+            Q(rif_normalizado__prefijo='V12345678') | Q(numero_transferencia__prefijo='V-12.345.678'),
+        )
+        self.assertEqual(
+            construir_filtro_busqueda('  maría   pérez '),
+            Q(nombre_normalizado__prefijo='MARIA PEREZ') | Q(estado='MARIA   PEREZ')
+            | Q(numero_transferencia__prefijo='MARÍA   PÉREZ'),
+        )
+        self.assertIsNone(construir_filtro_busqueda('   '))
+
+    def test_orden_anulados_usa_indice_parcial(self):
+        queryset = Recibo.objects.filter(anulado=True).order_by('-fecha_anulacion')[:20]
+        self.assertUsaIndice(self._plan(queryset), 'recibos_anulados_fecha_idx')
+
+    def test_orden_dashboard_usa_indice_parcial(self):
+        queryset = Recibo.objects.filter(anulado=False).order_by('-fecha', '-numero_recibo')[:20]
+        self.assertUsaIndice(self._plan(queryset), 'recibos_vigentes_fecha_idx')
+
+    def test_busqueda_numerica_usa_indices_exactos(self):
+        for texto in ('520', '10000520'):
+            queryset = Recibo.objects.filter(anulado=True).filter(construir_filtro_busqueda(texto))
+            self.assertUsaIndice(self._plan(queryset))
+
+    def test_busqueda_general_por_transferencia_y_estado(self):
+        # Como antes de las columnas normalizadas: "todos" también busca la transferencia y el estado.
+        response = self.client.get(reverse('recibos:dashboard'), {'q': 'trf2'})
+        self.assertEqual(
+            sorted(r.numero_recibo for r in response.context['recibos']), [2] + list(range(20, 30))
+        )
+        for texto in ('TRF52', 'miranda'):
+            queryset = Recibo.objects.filter(anulado=True).filter(construir_filtro_busqueda(texto))
+            self.assertUsaIndice(self._plan(queryset))
+        self.assertEqual(
+            Recibo.objects.filter(anulado=True).filter(construir_filtro_busqueda('Miranda')).count(), 20
+        )
+
+    def test_campo_relacion_en_field_busca_en_todos(self):
+        # `contribuyente` es una columna de Recibo pero no un campo del selector: no es un 500.
+        response = self.client.get(
+            reverse('recibos:dashboard'), {'q': 'contribuyente prueba 3', 'field': 'contribuyente'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(r.numero_recibo for r in response.context['recibos']), [3] + list(range(30, 40))
+        )
+
+    def test_busqueda_en_vista_anulados(self):
+        response = self.client.get(reverse('recibos:recibos_anulados'), {'q': '520'})
+        self.assertEqual([r.numero_recibo for r in response.context['recibos']], [520])
+
+        response = self.client.get(reverse('recibos:recibos_anulados'), {'q': 'V-10000.521'})
+        self.assertEqual([r.numero_recibo for r in response.context['recibos']], [521])
+
+        response = self.client.get(reverse('recibos:recibos_anulados'), {'q': 'contribuyente prueba 53'})
+        self.assertEqual(
+            sorted(r.numero_recibo for r in response.context['recibos']), list(range(530, 540))
+        )
+
+
+# VII. DESCARGAS CONDICIONALES Y ENTREGA DE ARTEFACTOS
+
+class ArtefactosTemporalesMixin:
+    """Cada test usa su propio directorio de artefactos y una caché vacía."""
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(RECIBOS_ARTEFACTOS_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.directorio = directorio.name
+        cache.clear()
+
+
+class DescargasCondicionalesTests(ArtefactosTemporalesMixin, PresupuestoConsultasMixin, TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_recibos(5)
+        cls.recibo = Recibo.objects.order_by('pk').first()
+
+    def test_pdf_recibo_responde_304_con_el_mismo_etag(self):
+        url = reverse('recibos:generar_pdf_recibo', kwargs={'pk': self.recibo.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        self.assertIn('Last-Modified', response)
+
+        # Solo se consulta el recibo para calcular su versión; no se genera el PDF.
+        response = self.assertPresupuesto(
+            1, 0.5, lambda: self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_pdf_recibo_cambia_de_etag_al_modificar(self):
+        url = reverse('recibos:generar_pdf_recibo', kwargs={'pk': self.recibo.pk})
+        etag = self.client.get(url)['ETag']
+
+        self.recibo.nombre = 'Nombre Actualizado'
+        self.recibo.save()
+        with override_settings(RECIBOS_CACHE_RECIBOS_MAX_MB=0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        # El PDF de la versión anterior se expulsa; el recién generado se conserva.
+        self.assertEqual(len(os.listdir(os.path.join(self.directorio, 'recibos'))), 1)
+
+    def test_reporte_responde_304_sin_generar(self):
+        parametros = {'action': 'excel', 'estado': 'ZULIA'}
+        response = self.client.get(reverse('recibos:generar_reporte'), parametros)
+        self.assertEqual(response.status_code, 200)
+
+        # Solo se lee la versión de los datos para calcular el ETag.
+        response = self.assertPresupuesto(
+            1, 0.5,
+            lambda: self.client.get(
+                reverse('recibos:generar_reporte'), parametros, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        )
+        self.assertEqual(response.status_code, 304)
+
+        # Un cambio en los datos invalida el ETag del reporte.
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_recibos(1, numero_inicial=100)[0].save()
+        response = self.client.get(
+            reverse('recibos:generar_reporte'), parametros, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_entrega_delegada_al_servidor_web(self):
+        url = reverse('recibos:generar_pdf_recibo', kwargs={'pk': self.recibo.pk})
+
+        with override_settings(RECIBOS_ENTREGA_ARTEFACTOS='x-accel'):
+            response = self.client.get(url)
+        self.assertEqual(response.content, b'')
+        self.assertTrue(response['X-Accel-Redirect'].startswith('/artefactos-internos/recibos/'))
+
+        with override_settings(RECIBOS_ENTREGA_ARTEFACTOS='x-sendfile'):
+            response = self.client.get(url)
+        self.assertTrue(os.path.isfile(response['X-Sendfile']))
+        self.assertTrue(response['X-Sendfile'].startswith(self.directorio))
+
+
+# VIII. CACHÉ DE REPORTES GENERADOS
+
+class CacheReportesTests(ArtefactosTemporalesMixin, PresupuestoConsultasMixin, TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_recibos(20)
+
+    def _reporte(self, **parametros):
+        return self.client.get(reverse('recibos:generar_reporte'), parametros)
+
+    def test_firma_normaliza_filtros_equivalentes(self):
+        self.assertEqual(
+            firma_filtros_reporte({'estado': 'zulia ', 'fecha_inicio': '2025-01-01',
+                                   'categoria2': 'on', 'categoria1': 'on', 'q': '', 'field': 'nombre'}),
+            firma_filtros_reporte({'categoria1': 'on', 'categoria2': 'on', 'estado': 'ZULIA',
+                                   'fecha_inicio': '2025-01-01', 'page': '3', 'categoria3': ''}),
+        )
+        self.assertNotEqual(
+            firma_filtros_reporte({'estado': 'ZULIA'}), firma_filtros_reporte({'estado': 'MIRANDA'})
+        )
+
+    def test_reporte_identico_o_equivalente_se_sirve_de_cache(self):
+        self.assertEqual(self._reporte(action='excel', estado='ZULIA').status_code, 200)
+
+        for parametros in ({'estado': 'ZULIA'}, {'estado': 'zulia', 'q': '', 'page': '2'}):
+            response = self.assertPresupuesto(
+                1, 0.5, lambda: self._reporte(action='excel', **parametros)
+            )
+            self.assertEqual(response.status_code, 200)
+
+    def test_cambio_en_los_datos_regenera_el_reporte(self):
+        self._reporte(action='pdf')
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_recibos(1, numero_inicial=100)[0].save()
+
+        with CaptureQueriesContext(connections['replica']) as consultas:
+            self.assertEqual(self._reporte(action='pdf').status_code, 200)
+        self.assertGreater(len(consultas), 0)
+
+    def test_expulsion_lru_respeta_el_limite(self):
+        directorio = os.path.join(self.directorio, 'reportes')
+        os.makedirs(directorio)
+        for i, nombre in enumerate(('viejo', 'medio', 'nuevo')):
+            ruta = os.path.join(directorio, f'{nombre}.xlsx')
+            with open(ruta, 'wb') as archivo:
+                archivo.write(b'x' * 100)
+            os.utime(ruta, (1000 + i, 1000 + i))
+
+        # Un acceso reciente salva al archivo más viejo de la expulsión.
+        recuperar_artefacto(Path(directorio) / 'viejo.xlsx')
+
+        self.assertEqual(depurar_artefactos('reportes', 200), (1, 100))
+        self.assertEqual(sorted(os.listdir(directorio)), ['nuevo.xlsx', 'viejo.xlsx'])
+
+    def test_precalentar_reportes_mensuales(self):
+        call_command('precalentar_reportes', meses=1, formatos=['excel'], stdout=io.StringIO())
+
+        hoy = date.today()
+        response = self.assertPresupuesto(
+            1, 0.5,
+            lambda: self._reporte(
+                action='excel', fecha_inicio=hoy.replace(day=1).isoformat(),
+                fecha_fin=hoy.replace(day=calendar.monthrange(hoy.year, hoy.month)[1]).isoformat(),
+            )
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+# IX. DESCARGAS ASÍNCRONAS (ASGI)
+
+class DescargasAsincronasTests(ArtefactosTemporalesMixin, TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_recibos(6)
+
+    async def _descargar(self, url, parametros):
+        response = await self.async_client.get(url, parametros)
+        contenido = b''
+        if response.status_code == 200:
+            contenido = b''.join([bloque async for bloque in response.streaming_content])
+        return response, contenido
+
+    async def test_zip_asincrono_se_transmite_por_bloques(self):
+        pks = [pk async for pk in Recibo.objects.values_list('pk', flat=True)]
+        response, contenido = await self._descargar(
+            reverse('recibos:generar_zip_recibos_async'), {'pks': ','.join(map(str, pks))}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        self.assertEqual(len(contenido), int(response['Content-Length']))
+        with zipfile.ZipFile(io.BytesIO(contenido)) as zipf:
+            self.assertEqual(len(zipf.namelist()), 6)
+
+    async def test_reporte_asincrono_comparte_cache_y_etag_con_la_vista_sincrona(self):
+        parametros = {'action': 'excel', 'estado': 'ZULIA'}
+        response, contenido = await self._descargar(reverse('recibos:generar_reporte_async'), parametros)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(contenido.startswith(b'PK'))
+
+        response_sincrona = await self.async_client.get(
+            reverse('recibos:generar_reporte'), parametros, headers={'if-none-match': response['ETag']}
+        )
+        self.assertEqual(response_sincrona.status_code, 304)
+
+    async def test_ejecutor_conserva_el_enrutamiento_a_la_primaria(self):
+        # Tras una escritura la petición queda fijada a la primaria; la exportación también.
+        with usar_primaria():
+            self.assertTrue(await ejecutar_exportacion(leyendo_de_primaria))
+        self.assertFalse(await ejecutar_exportacion(leyendo_de_primaria))
+
+    async def test_pks_invalidos_redirigen_al_dashboard(self):
+        response = await self.async_client.get(
+            reverse('recibos:generar_zip_recibos_async'), {'pks': '1,abc'}
+        )
+        self.assertRedirects(response, reverse('recibos:dashboard'), fetch_redirect_response=False)
+
+
+# X. CONTROL DE ADMISIÓN DE OPERACIONES PESADAS
+
+@override_settings(RECIBOS_PESADAS_MAX=1, RECIBOS_PESADAS_ESPERA_SEGUNDOS=0, RECIBOS_PESADAS_COLA_MAX=4)
+class ControlAdmisionTests(ArtefactosTemporalesMixin, TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_recibos(3)
+
+    def _url_zip(self):
+        pks = ','.join(str(pk) for pk in Recibo.objects.values_list('pk', flat=True))
+        return reverse('recibos:generar_zip_recibos') + f'?pks={pks}'
+
+    def test_rechaza_con_el_cupo_lleno_y_lo_informa(self):
+        with operacion_pesada('prueba'):
+            self.assertEqual(estado_admision()['activas'], 1)
+            response = self.client.get(self._url_zip(), follow=True)
+
+        mensajes = [str(m) for m in response.context['messages']]
+        self.assertTrue(any('El servidor está ocupado: 1/1' in m for m in mensajes), mensajes)
+        self.assertContains(response, 'Operaciones pesadas: 1/1 en curso')
+        self.assertEqual(metricas_admision()['zip']['rechazadas'], 1)
+
+    @override_settings(RECIBOS_PESADAS_ESPERA_SEGUNDOS=5)
+    def test_espera_en_cola_hasta_que_se_libera_una_ranura(self):
+        ocupada, liberar = threading.Event(), threading.Event()
+
+        def ocupar():
+            with operacion_pesada('prueba'):
+                ocupada.set()
+                liberar.wait(5)
+
+        hilo = threading.Thread(target=ocupar)
+        hilo.start()
+        ocupada.wait(5)
+        threading.Timer(0.3, liberar.set).start()
+
+        response = self.client.get(self._url_zip())
+        hilo.join()
+
+        self.assertEqual(response.status_code, 200)
+        metricas = metricas_admision()['zip']
+        self.assertEqual((metricas['admitidas'], metricas['encoladas']), (1, 1))
+        self.assertGreaterEqual(metricas['espera_max_s'], 0.2)
+
+    @override_settings(RECIBOS_PESADAS_ESPERA_SEGUNDOS=5, RECIBOS_WORKERS_WEB=3)
+    def test_la_cola_deja_libre_al_menos_un_worker(self):
+        with operacion_pesada('prueba'):
+            # Otra petición ya espera turno (un proceso vivo: este).
+            turno = Path(self.directorio) / '.admision' / 'cola' / f'{os.getpid()}-espera'
+            turno.touch()
+            inicio = time.monotonic()
+            response = self.client.get(self._url_zip(), follow=True)
+            estado = estado_admision()
+
+        # COLA_MAX=4, pero 1 ranura + 1 en cola ya dejan un solo worker libre: se rechaza sin esperar.
+        self.assertLess(time.monotonic() - inicio, 1)
+        self.assertEqual(estado['cola_maxima'], 1)
+        self.assertLess(estado['activas'] + estado['en_cola'], settings.RECIBOS_WORKERS_WEB)
+        self.assertTrue(any('El servidor está ocupado' in str(m) for m in response.context['messages']))
+
+    def test_estado_y_metricas_en_json(self):
+        with operacion_pesada('prueba'):
+            datos = self.client.get(reverse('recibos:estado_operaciones_pesadas')).json()
+        self.assertEqual(datos['estado']['activas'], 1)
+        self.assertEqual(datos['metricas']['prueba']['admitidas'], 1)
+
+
+# XI. FILTROS DE FECHA Y PARTICIONADO POR AÑO
+
+class FiltrosFechaParticionadoTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_recibos(30)
+
+    def test_fechas_se_convierten_a_date_y_las_invalidas_se_ignoran(self):
+        self.assertEqual(parsear_fecha(' 2025-01-10 '), date(2025, 1, 10))
+        self.assertIsNone(parsear_fecha('10/01/2025'))
+        self.assertIsNone(parsear_fecha(None))
+
+        queryset, filtros = filtrar_recibos_reporte({'fecha_inicio': '2025-01-10', 'fecha_fin': 'mañana'})
+        self.assertEqual(queryset.count(), 21)
+        self.assertEqual(filtros['periodo'], 'Desde: 2025-01-10')
+
+        response = self.client.get(reverse('recibos:dashboard'), {'fecha_inicio': 'x', 'fecha_fin': '2025-01-05'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['paginator'].count, 5)
+
+    def test_crear_particiones_requiere_postgresql(self):
+        with self.assertRaisesMessage(CommandError, 'solo está disponible en PostgreSQL'):
+            call_command('crear_particiones', stdout=io.StringIO())
+
+
+# XII. ARCHIVO FRÍO DE AÑOS CERRADOS (PARQUET)
+
+@skipUnless(parquet_disponible(), "pyarrow no está instalado")
+class ArchivoFrioTests(ArtefactosTemporalesMixin, TestCase):
+    databases = {'default', 'replica'}
+
+    ANIO_CERRADO = date.today().year - 1
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_recibos(10, fecha=date(cls.ANIO_CERRADO, 6, 1))
+        crear_recibos(2, anulado=True, numero_inicial=50, fecha=date(cls.ANIO_CERRADO, 7, 1))
+        crear_recibos(5, numero_inicial=100, fecha=date.today())
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(RECIBOS_ARCHIVO_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.archivado = archivar_anio(self.ANIO_CERRADO)
+
+    def test_archivar_mueve_el_anio_al_parquet(self):
+        self.assertEqual(self.archivado['filas'], 12)
+        self.assertEqual((self.archivado['numero_min'], self.archivado['numero_max']), (1, 51))
+        self.assertEqual(Decimal(self.archivado['total_monto_bs']), Decimal('5110.00') * 12)
+        self.assertFalse(Recibo.objects.filter(fecha__year=self.ANIO_CERRADO).exists())
+        self.assertEqual(Recibo.objects.count(), 5)
+        self.assertEqual(numero_maximo_archivado(), 51)
+
+        with self.assertRaises(ArchivoFrioError):
+            archivar_anio(date.today().year)
+
+    def test_reportes_combinan_base_y_archivo(self):
+        params = {'fecha_inicio': f'{self.ANIO_CERRADO}-01-01'}
+        _, recibos = obtener_reporte('excel', params)
+        self.assertEqual(len(recibos), 15)
+        self.assertEqual([r.fecha.year for r in recibos[:5]], [date.today().year] * 5)
+        self.assertTrue(all(getattr(r, 'archivado', False) for r in recibos[5:]))
+
+        # Los filtros del reporte se aplican también sobre el archivo.
+        _, recibos = obtener_reporte('pdf', {**params, 'estado': 'zulia', 'q': 'contribuyente prueba 1'})
+        self.assertEqual(sorted(r.numero_recibo for r in recibos), [1, 100, 102, 104])
+
+        # Un período solo con años vivos no lee el archivo.
+        queryset, _ = filtrar_recibos_reporte({'fecha_inicio': f'{date.today().year}-01-01'})
+        self.assertIs(combinar_con_archivo(queryset, {'fecha_inicio': f'{date.today().year}-01-01'}), queryset)
+
+    def test_pdf_de_recibo_archivado(self):
+        recibo = recibo_archivado(Recibo.objects.order_by('pk').first().pk - 1)
+        self.assertIsNotNone(recibo)
+        response = self.client.get(reverse('recibos:generar_pdf_recibo', args=[recibo.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn(f'Recibo_N_{recibo.numero_recibo:04d}', response['Content-Disposition'])
+
+
+# XIII. PURGA MASIVA (ACCIÓN clear_logs)
+
+class RespaldosTemporalesMixin:
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(RECIBOS_RESPALDOS_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+
+class PurgaRecibosTests(RespaldosTemporalesMixin, TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_recibos(30)
+
+    def test_respalda_y_elimina_por_lotes(self):
+        version = obtener_version_datos()
+        avance = []
+        resultado = purgar_recibos('lotes', progreso=lambda fase, filas, total=None: avance.append((fase, filas)), lote=7)
+
+        self.assertEqual((resultado['total'], resultado['eliminadas']), (30, 30))
+        self.assertFalse(Recibo.objects.exists())
+        self.assertGreater(obtener_version_datos(), version)
+        self.assertEqual(
+            [filas for fase, filas in avance if fase == 'eliminando'], [0, 7, 14, 21, 28, 30]
+        )
+
+        with gzip.open(resultado['respaldo'], 'rt', encoding='utf-8') as archivo:
+            filas = list(csv.DictReader(archivo))
+        self.assertEqual(len(filas), 30)
+        self.assertEqual({int(f['numero_recibo']) for f in filas}, set(range(1, 31)))
+
+    def test_truncate_requiere_postgresql(self):
+        with self.assertRaises(ValueError):
+            purgar_recibos('truncate')
+        self.assertEqual(Recibo.objects.count(), 30)
+
+
+class PurgaProcesoAparteTests(RespaldosTemporalesMixin, TestCase):
+    databases = {'default', 'replica'}
+
+    def test_clear_logs_lanza_el_comando_fuera_del_worker(self):
+        crear_recibos(3)
+        with mock.patch('apps.recibos.purga.subprocess.Popen') as popen:
+            response = self.client.post(reverse('recibos:dashboard'), {'action': 'clear_logs'})
+        self.assertEqual(response.status_code, 302)
+
+        argumentos, opciones = popen.call_args
+        self.assertEqual(argumentos[0][1:], ['manage.py', 'purgar_recibos', '--si', '--metodo', 'auto'])
+        self.assertTrue(opciones['start_new_session'])
+        # La petición no borra nada: lo hace el proceso lanzado.
+        self.assertEqual(Recibo.objects.count(), 3)
+        self.assertContains(self.client.get(reverse('recibos:dashboard')), 'Limpieza iniciada')
+
+    def test_purga_interrumpida_se_reanuda_con_el_mismo_respaldo(self):
+        crear_recibos(30)
+
+        def cortar(fase, filas, total=None):
+            # Simula que el proceso muere a mitad del borrado (no es una Exception).
+            if fase == 'eliminando' and filas >= 14:
+                raise SystemExit(1)
+
+        with self.assertRaises(SystemExit):
+            ejecutar_purga('lotes', progreso=cortar, lote=7)
+        estado = estado_purga()
+        self.assertEqual(estado['estado'], 'interrumpida')
+        self.assertEqual(estado['punto_control']['total'], 30)
+        self.assertEqual(Recibo.objects.count(), 16)
+        self.assertContains(self.client.get(reverse('recibos:dashboard')), 'purgar_recibos --reanudar')
+
+        call_command('purgar_recibos', '--reanudar', stdout=io.StringIO())
+        final = estado_purga()
+        self.assertEqual((final['estado'], final['eliminadas']), ('terminada', 30))
+        self.assertEqual(final['respaldo'], estado['punto_control']['respaldo'])
+        self.assertFalse(Recibo.objects.exists())
+        with gzip.open(final['respaldo'], 'rt', encoding='utf-8') as archivo:
+            self.assertEqual(len(list(csv.DictReader(archivo))), 30)
+
+        with self.assertRaises(CommandError):
+            call_command('purgar_recibos', '--reanudar', stdout=io.StringIO())
+
+
+# XIV. EXPORTACIÓN PARA ANÁLISIS (CSV / PARQUET)
+
+class ExportacionAnaliticaTests(ArtefactosTemporalesMixin, TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_recibos(6)
+        crear_recibos(1, numero_inicial=50, tasa_dia=Decimal('36.1234'), total_monto_bs=Decimal('1234567.89'))
+
+    def _exportar(self, **params):
+        return self.client.get(reverse('recibos:exportar_datos'), params)
+
+    def test_csv_transmitido_con_valores_tipados(self):
+        response = self._exportar(formato='csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+
+        filas = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(filas), 7)
+        fila = next(f for f in filas if f['numero_recibo'] == '50')
+        # Decimales exactos, fechas ISO y booleanos como true/false.
+        self.assertEqual((fila['tasa_dia'], fila['total_monto_bs']), ('36.1234', '1234567.89'))
+        self.assertEqual(fila['fecha'], '2025-01-01')
+        self.assertEqual((fila['categoria1'], fila['categoria2']), ('true', 'false'))
+
+        # Mismos filtros del dashboard; con el ETag se responde 304.
+        response = self._exportar(formato='csv', estado='zulia')
+        self.assertEqual(b''.join(response.streaming_content).decode().count('\n'), 1 + 4)
+        response = self.client.get(
+            reverse('recibos:exportar_datos'), {'formato': 'csv', 'estado': 'zulia'},
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(reverse('recibos:exportar_datos'), {'formato': 'xml'}, follow=True)
+        self.assertContains(response, 'Formato de exportación no válido')
+
+    @skipUnless(parquet_disponible(), "pyarrow no está instalado")
+    def test_parquet_con_esquema_tipado(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        response = self._exportar(formato='parquet')
+        self.assertEqual(response.status_code, 200)
+        tabla = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(tabla.num_rows, 7)
+        self.assertEqual(tabla.schema.field('fecha').type, pa.date32())
+        self.assertEqual(tabla.schema.field('total_monto_bs').type, pa.decimal128(15, 2))
+        self.assertEqual(tabla.schema.field('categoria1').type, pa.bool_())
+        self.assertEqual(
+            sum(tabla.column('total_monto_bs').to_pylist()), Decimal('5110.00') * 6 + Decimal('1234567.89')
+        )
+
+        # La segunda descarga con los mismos datos reutiliza el archivo generado (solo lee la versión).
+        with self.assertNumQueries(1, using='replica'):
+            self.assertEqual(self._exportar(formato='parquet').status_code, 200)
+
+
+# XV. IMPORTACIÓN PARALELA DE VARIOS LIBROS
+
+class ImportacionVariosLibrosTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def _zip(self, *libros):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as comprimido:
+            for nombre, contenido in libros:
+                comprimido.writestr(nombre, contenido)
+        return SimpleUploadedFile('oficinas.zip', buffer.getvalue(), content_type='application/zip')
+
+    def test_bloques_contiguos_y_modo_atomico_o_por_archivo(self):
+        crear_recibos(1, numero_inicial=10)
+        subido = self._zip(
+            ('zulia.xlsx', libro_excel(3)), ('__MACOSX/._zulia.xlsx', b''), ('lara.xlsx', libro_excel(2)),
+        )
+        resumen = importar_varios_archivos([subido], procesos=1)
+        self.assertTrue(resumen['exito'])
+        self.assertEqual(
+            [(a['nombre'], a['desde'], a['hasta']) for a in resumen['archivos']],
+            [('zulia.xlsx', '0011', '0013'), ('lara.xlsx', '0014', '0015')],
+        )
+        self.assertEqual(Recibo.objects.filter(pk__in=resumen['pks']).count(), 5)
+        self.assertIn('5 recibos generados', mensaje_resumen(resumen))
+
+        # Un libro con errores: en modo atómico no se importa ninguno...
+        libros = [
+            SimpleUploadedFile('bueno.xlsx', libro_excel(2)),
+            SimpleUploadedFile('malo.xlsx', b'no es un libro de Excel'),
+        ]
+        resumen = importar_varios_archivos(libros, procesos=1)
+        self.assertFalse(resumen['exito'])
+        self.assertEqual(resumen['pks'], [])
+        self.assertIn('Hoja2', resumen['archivos'][1]['error'])
+
+        # ...y por archivo se importan los válidos.
+        for libro in libros:
+            libro.seek(0)
+        resumen = importar_varios_archivos(libros, atomico=False, procesos=1)
+        self.assertEqual([a['creados'] for a in resumen['archivos']], [2, 0])
+        self.assertEqual(Recibo.objects.count(), 8)
+
+    @override_settings(RECIBOS_IMPORTACION_PROCESOS=2)
+    def test_carga_multiple_desde_el_dashboard_en_procesos(self):
+        response = self.client.post(reverse('recibos:dashboard'), {
+            'action': 'upload',
+            'archivo_recibo': [
+                SimpleUploadedFile('a.xlsx', libro_excel(2, nombre='Oficina A')),
+                SimpleUploadedFile('b.xlsx', libro_excel(1, nombre='Oficina B')),
+            ],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('recibos:generar_zip_recibos'), response['Location'])
+        self.assertEqual(
+            list(Recibo.objects.order_by('numero_recibo').values_list('numero_recibo', 'nombre')),
+            [(1, 'Oficina A 0'), (2, 'Oficina A 1'), (3, 'Oficina B 0')],
+        )
+
+
+    def test_zip_que_excede_los_limites_se_rechaza_antes_de_descomprimir(self):
+        with override_settings(RECIBOS_IMPORTACION_ZIP_MAX_MB=1):
+            # ~2 MB de ceros comprimen a unos pocos KB.
+            with self.assertRaisesMessage(ErrorImportacion, 'superan los 1 MB'):
+                importar_varios_archivos([self._zip(('a.csv', b'0' * (2 * 1024 * 1024)))], procesos=1)
+        with override_settings(RECIBOS_IMPORTACION_ZIP_MAX_LIBROS=1):
+            with self.assertRaisesMessage(ErrorImportacion, 'el máximo es 1'):
+                importar_varios_archivos([self._zip(('a.xlsx', b''), ('b.csv', b''))], procesos=1)
+        self.assertFalse(Recibo.objects.exists())
+
+    def test_pool_roto_se_reemplaza_y_el_lote_se_lee_igual(self):
+        roto = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('fork'))
+        with self.assertRaises(BrokenProcessPool):
+            roto.submit(os._exit, 1).result()
+
+        with mock.patch.object(importacion, '_pool', roto), self.assertLogs('apps.recibos.importacion', 'WARNING'):
+            resultados = preparar_libros(
+                [('a.xlsx', libro_excel(2)), ('b.xlsx', libro_excel(1))], procesos=2,
+            )
+            # El pool roto se descartó: la próxima carga crea uno nuevo.
+            self.assertIsNone(importacion._pool)
+        self.assertEqual([(nombre, len(filas), error) for nombre, filas, error, _ in resultados],
+                         [('a.xlsx', 2, None), ('b.xlsx', 1, None)])
+
+
+# XVI. IMPORTACIÓN DESDE CSV
+
+class ImportacionCSVTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def test_csv_equivale_al_excel(self):
+        import pandas as pd
+
+        df = pd.read_excel(io.BytesIO(libro_excel(3, nombre='Señor Núñez')), sheet_name='Hoja2', header=3, dtype=str)
+        # Exportación típica de Excel en español: ';' y Windows-1252.
+        contenido = df.to_csv(index=False, sep=';').encode('cp1252')
+
+        desde_excel = preparar_archivo(io.BytesIO(libro_excel(3, nombre='Señor Núñez')), 'oficina.xlsx')
+        desde_csv = preparar_archivo(io.BytesIO(contenido), 'oficina.csv')
+        self.assertEqual(desde_csv, desde_excel)
+        self.assertEqual(desde_csv[0]['nombre'], 'Señor Núñez 0')
+        self.assertEqual(desde_csv[0]['total_monto_bs'], Decimal('5110.00'))
+
+        with self.assertRaisesMessage(ErrorImportacion, 'Revise el encabezado (primera línea)'):
+            leer_csv(io.BytesIO(b'estado;nombre\nZulia;Ana\n'))
+
+        response = self.client.post(reverse('recibos:dashboard'), {
+            'action': 'upload', 'archivo_recibo': SimpleUploadedFile('oficina.csv', contenido),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Recibo.objects.count(), 3)
+
+
+# XVII. COLUMNAS DE BÚSQUEDA NORMALIZADAS
+
+class BusquedaNormalizadaTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def test_save_mantiene_columnas_y_busqueda_sin_acentos(self):
+        crear_recibos(30)
+        recibo = Recibo.objects.get(numero_recibo=7)
+        recibo.nombre, recibo.rif_cedula_identidad = 'José Ñúñez-Peña', 'v-12.345.678'
+        recibo.save(update_fields=['nombre', 'rif_cedula_identidad'])
+        recibo.refresh_from_db()
+        self.assertEqual((recibo.nombre_normalizado, recibo.rif_normalizado), ('JOSE NUNEZ PENA', 'V12345678'))
+
+        for params in ({'q': 'jose nunez'}, {'q': 'JOSÉ ñúñez-p', 'field': 'nombre'},
+                       {'q': 'V 12.345', 'field': 'rif_cedula_identidad'}, {'q': '12345678'}):
+            response = self.client.get(reverse('recibos:dashboard'), params)
+            self.assertEqual([r.numero_recibo for r in response.context['recibos']], [7], params)
+
+        # El prefijo se resuelve con el índice de la columna normalizada.
+        plan = Recibo.objects.filter(construir_filtro_busqueda('contribuyente prueba 1')).explain()
+        self.assertIn('nombre_normalizado', plan)
+        self.assertNotRegex(plan, r'SCAN recibos_pago\s*$')
+
+    def test_relleno_por_lotes(self):
+        # bulk_create sin actualizar_campos_busqueda(): filas previas a la migración.
+        Recibo.objects.bulk_create([
+            Recibo(numero_recibo=i, nombre=f'María {i}', rif_cedula_identidad=f'E-8.{i:03d}.000', estado='ZULIA',
+                   direccion_inmueble='-', ente_liquidado='-', gastos_administrativos=0, tasa_dia=0,
+                   total_monto_bs=0, fecha=date(2025, 1, 1), concepto='-')
+            for i in range(1, 8)
+        ])
+        avances = []
+        self.assertEqual(rellenar_campos_busqueda(Recibo, lote=3, progreso=lambda *a: avances.append(a)), 7)
+        self.assertEqual(len(avances), 3)
+        self.assertEqual(
+            Recibo.objects.get(numero_recibo=5).nombre_normalizado, 'MARIA 5'
+        )
+        self.assertEqual(Recibo.objects.filter(rif_normalizado__prefijo='E8').count(), 7)
+        # Repetirlo no actualiza nada.
+        self.assertEqual(rellenar_campos_busqueda(Recibo, lote=3), 0)
+
+
+# XVIII. CONTRIBUYENTES Y TOTALES POR PAGADOR
+
+class ContribuyentesTests(PresupuestoConsultasMixin, TestCase):
+    databases = {'default', 'replica'}
+
+    def test_totales_se_mantienen_con_importacion_y_cambios(self):
+        from .importacion import importar_recibos_desde_excel
+
+        for _ in range(2):
+            exito, _, _ = importar_recibos_desde_excel(SimpleUploadedFile('libro.xlsx', libro_excel(3)))
+            self.assertTrue(exito)
+        self.assertEqual(Contribuyente.objects.count(), 3)
+        pagador = Contribuyente.objects.get(rif_normalizado='V20000000')
+        self.assertEqual(
+            (pagador.cantidad_recibos, pagador.total_pagado, pagador.ultimo_pago, pagador.rif),
+            (2, Decimal('10220.00'), date(2025, 3, 15), 'V20000000'),
+        )
+
+        primero, segundo = pagador.recibos.order_by('numero_recibo')
+        primero.anulado = True
+        primero.save()
+        segundo.rif_cedula_identidad = 'v 20.000.001'
+        segundo.save()
+        pagador.refresh_from_db()
+        self.assertEqual((pagador.cantidad_recibos, pagador.total_pagado, pagador.ultimo_pago), (0, 0, None))
+        self.assertEqual(Contribuyente.objects.get(rif_normalizado='V20000001').cantidad_recibos, 3)
+
+        Recibo.objects.filter(rif_normalizado='V20000001').first().delete()
+        self.assertEqual(Contribuyente.objects.get(rif_normalizado='V20000001').total_pagado, Decimal('10220.00'))
+
+        # Historial: contribuyente + COUNT del paginador + página de recibos.
+        url = reverse('recibos:historial_contribuyente', args=['v-20000000'])
+        response = self.assertPresupuesto(3, 0.5, lambda: self.client.get(url))
+        self.assertEqual([r.anulado for r in response.context['recibos']], [True])
+        self.assertIn('recibos_contribuyente_idx', str(
+            Recibo.objects.filter(contribuyente=pagador).order_by('-fecha', '-numero_recibo').explain()
+        ))
+
+        consulta = reverse('recibos:consultar_contribuyentes')
+        resultados = self.client.get(consulta, {'q': '20000001'}).json()['resultados']
+        self.assertEqual([(r['rif'], r['cantidad_recibos']) for r in resultados], [('V20000001', 2)])
+        self.assertEqual(len(self.client.get(consulta, {'q': 'contribuyente'}).json()['resultados']), 3)
+        self.assertEqual(self.client.get(consulta).status_code, 400)
+
+    def test_relleno_de_recibos_sin_contribuyente(self):
+        recibos = [
+            Recibo(numero_recibo=i, nombre='Ana Pérez', rif_cedula_identidad='E-81.000', estado='ZULIA',
+                   direccion_inmueble='-', ente_liquidado='-', gastos_administrativos=0, tasa_dia=0,
+                   total_monto_bs=Decimal('10.50'), fecha=date(2025, 1, i), concepto='-', anulado=i == 4)
+            for i in range(1, 5)
+        ]
+        for recibo in recibos:
+            recibo.actualizar_campos_busqueda()
+        Recibo.objects.bulk_create(recibos)
+
+        self.assertEqual(rellenar_contribuyentes(lote=3), 4)
+        pagador = Contribuyente.objects.get()
+        self.assertEqual(
+            (pagador.rif_normalizado, pagador.cantidad_recibos, pagador.total_pagado, pagador.ultimo_pago),
+            ('E81000', 3, Decimal('31.50'), date(2025, 1, 3)),
+        )
+        self.assertEqual(rellenar_contribuyentes(lote=3), 0)
+
+
+# XIX. TASAS BCV
+
+class TasasBCVTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        # La tabla en memoria es del proceso: no debe pasar de una prueba a otra.
+        invalidar_cache_tasas()
+        self.addCleanup(invalidar_cache_tasas)
+        guardar_tasas({date(2025, 3, 14): Decimal('36.5000'), date(2025, 3, 17): Decimal('37.0000')})
+
+    def test_tasa_vigente_en_memoria(self):
+        self.assertEqual(tasa_vigente(date(2025, 3, 14)), Decimal('36.5000'))
+        # Sábado sin publicación: rige la del viernes. Ya no se consulta la base.
+        with self.assertNumQueries(0, using='default'), self.assertNumQueries(0, using='replica'):
+            self.assertEqual(tasa_vigente(date(2025, 3, 15)), Decimal('36.5000'))
+            self.assertIsNone(tasa_vigente(date(2025, 3, 1)))
+        TasaBCV.objects.create(fecha=date(2025, 3, 15), tasa=Decimal('36.8000'))
+        self.assertEqual(tasa_vigente(date(2025, 3, 16)), Decimal('36.8000'))
+
+        datos = {
+            'numero_recibo': 1, 'estado': 'Zulia', 'nombre': 'ana', 'rif_cedula_identidad': 'V1',
+            'direccion_inmueble': '-', 'ente_liquidado': 'intu', 'gastos_administrativos': '100',
+            'tasa_dia': '', 'total_monto_bs': '3700', 'numero_transferencia': 't1', 'fecha': '2025-03-17',
+            'concepto': 'pago',
+        }
+        form = ReciboForm(datos)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['tasa_dia'], Decimal('37.0000'))
+        self.assertFalse(ReciboForm({**datos, 'fecha': '2025-01-01'}).is_valid())
+
+    def test_importacion_completa_tasas_y_verificacion(self):
+        from .importacion import importar_recibos_desde_excel
+
+        libro = libro_excel(2, tasa_dia='', total_monto_bs='', fecha='16/03/2025')
+        exito, _, pks = importar_recibos_desde_excel(SimpleUploadedFile('libro.xlsx', libro))
+        self.assertTrue(exito)
+        self.assertEqual(
+            set(Recibo.objects.filter(pk__in=pks).values_list('tasa_dia', 'total_monto_bs')),
+            {(Decimal('36.5000'), Decimal('5110.00'))},
+        )
+
+        Recibo.objects.filter(pk=pks[0]).update(total_monto_bs=Decimal('5000.00'))
+        salida = io.StringIO()
+        call_command('verificar_montos', stdout=salida)
+        self.assertIn('Recibos revisados: 2 (0 sin tasa', salida.getvalue())
+        self.assertIn('1 recibo(s) con diferencia mayor a 0.01 Bs (suma de diferencias: -110', salida.getvalue())
+
+
+# XX. FUENTE DE CAMBIOS
+
+class FuenteCambiosTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def _leer(self, cursor):
+        lineas = [json.loads(linea) for linea in ''.join(lineas_cambios(cursor)).splitlines()]
+        return lineas[:-1], lineas[-1]
+
+    def test_cada_cambio_avanza_la_secuencia(self):
+        from .importacion import importar_recibos_desde_excel
+
+        exito, _, pks = importar_recibos_desde_excel(SimpleUploadedFile('libro.xlsx', libro_excel(3)))
+        self.assertTrue(exito)
+        # Un lote del importador comparte un único número de secuencia.
+        self.assertEqual(len(set(Recibo.objects.filter(pk__in=pks).values_list('secuencia_cambio', flat=True))), 1)
+        _, trailer = self._leer((0, 0))
+        self.assertEqual((trailer['filas'], trailer['completo']), (3, True))
+        cursor = tuple(int(parte) for parte in trailer['cursor'].split('-'))
+
+        recibo = Recibo.objects.get(pk=pks[0])
+        recibo.concepto = 'Modificado'
+        recibo.save()
+        Recibo.objects.filter(pk=pks[1]).update(anulado=True)
+        # Las columnas derivadas no cuentan como cambio.
+        Recibo.objects.filter(pk=pks[2]).update(nombre_normalizado='X')
+
+        filas, trailer = self._leer(cursor)
+        self.assertEqual([fila['id'] for fila in filas], [pks[0], pks[1]])
+        self.assertEqual(filas[0]['concepto'], 'Modificado')
+        self.assertTrue(filas[1]['anulado'])
+        self.assertEqual(trailer['cursor'], f"{filas[1]['secuencia_cambio']}-{pks[1]}")
+        self.assertEqual(self._leer((filas[1]['secuencia_cambio'], pks[1]))[1]['filas'], 0)
+        self.assertEqual(SecuenciaCambios.objects.get(pk=1).valor, filas[1]['secuencia_cambio'])
+
+    @skipUnless(connections['default'].vendor == 'postgresql', "Solo PostgreSQL numera por id de transacción")
+    def test_cambio_no_confirmado_queda_retenido(self):
+        # La prueba corre dentro de una transacción abierta: sus cambios no se entregan todavía.
+        recibo = crear_recibos(1)[0]
+        recibo.save()
+        self.assertGreaterEqual(recibo.secuencia_cambio, SecuenciaCambios.limite_confirmado('default'))
+        self.assertEqual(self._leer((0, 0))[1]['filas'], 0)
+
+    @override_settings(RECIBOS_CAMBIOS_TOKEN='secreto')
+    def test_vista_requiere_autorizacion(self):
+        crear_recibos(3)
+        url = reverse('recibos:cambios_recibos')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer otro'}).status_code, 403)
+
+        autorizado = {'Authorization': 'Bearer secreto'}
+        self.assertEqual(self.client.get(url, {'desde': 'x'}, headers=autorizado).status_code, 400)
+        response = self.client.get(url, {'limite': 2}, headers=autorizado)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lineas = [json.loads(linea) for linea in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(lineas), 3)
+        self.assertEqual((lineas[-1]['filas'], lineas[-1]['completo']), (2, False))
+
+
+# XXI. ADMINISTRACIÓN DE RECIBOS
+
+class ReciboAdminTests(PresupuestoConsultasMixin, TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth.models import User
+
+        crear_recibos(30)
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.url = reverse('admin:recibos_recibo_changelist')
+
+    def test_changelist_busca_por_columnas_indexadas(self):
+        response = self.client.get(self.url, {'q': 'contribuyente prueba 1'})
+        self.assertEqual(response.status_code, 200)
+        # Prefijo sobre nombre_normalizado: 1 y 10..19 (el 1 es también el id).
+        self.assertEqual(response.context['cl'].result_count, 11)
+        self.assertIsNone(response.context['cl'].full_result_count)
+
+        with CaptureQueriesContext(connections['replica']) as consultas:
+            self.client.get(self.url, {'q': 'V10000005'})
+        sql = ' '.join(consulta['sql'] for consulta in consultas.captured_queries)
+        self.assertIn('rif_normalizado', sql)
+        self.assertNotIn('LIKE', sql.upper())
+
+    def test_acciones_anular_y_exportar(self):
+        pks = list(Recibo.objects.order_by('pk').values_list('pk', flat=True)[:3])
+        secuencia = SecuenciaCambios.objects.get(pk=1).valor
+        response = self.client.post(self.url, {'action': 'anular_seleccionados', '_selected_action': pks})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Recibo.objects.filter(anulado=True).count(), 3)
+        self.assertEqual(set(Recibo.objects.filter(pk__in=pks).values_list('secuencia_cambio', flat=True)), {secuencia + 1})
+        self.assertEqual(Contribuyente.objects.filter(cantidad_recibos=0).count(), 3)
+
+        response = self.client.post(self.url, {'action': 'exportar_csv', '_selected_action': pks[:2]})
+        self.assertTrue(response.streaming)
+        filas = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(filas[0][:2], ['id', 'numero_recibo'])
+
+
+# XXII. REGISTRO DE CONSULTAS LENTAS
+
+class ConsultasLentasTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_recibos(5)
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.archivo = os.path.join(directorio.name, 'consultas_lentas.jsonl')
+
+    def test_registra_consultas_con_origen_y_plan(self):
+        # Umbral mínimo: todas las consultas de la petición cuentan como lentas.
+        with override_settings(RECIBOS_CONSULTAS_LENTAS_MS=0.000001, RECIBOS_CONSULTAS_LENTAS_ARCHIVO=self.archivo):
+            self.assertEqual(self.client.get(reverse('recibos:dashboard')).status_code, 200)
+            esperar_registros()
+            registros = list(leer_registros())
+
+            salida = io.StringIO()
+            call_command('consultas_lentas', '--top', '3', '--plan', stdout=salida)
+
+        self.assertTrue(registros)
+        self.assertEqual({registro['origen'] for registro in registros}, {'recibos:dashboard'})
+        recibos = [registro for registro in registros if 'recibos_pago' in registro['sql']]
+        self.assertTrue(recibos)
+        self.assertTrue(all(registro['plan'] and 'recibos_pago' in registro['plan'] for registro in recibos))
+        self.assertIn('Origen: recibos:dashboard', salida.getvalue())
+        self.assertIn('1. ', salida.getvalue())
+
+    def test_explain_analyze_solo_en_select_sin_efectos(self):
+        leer = 'SELECT "id" FROM "recibos_pago" WHERE "anulado" = %s'
+        self.assertTrue(_admite_analyze(leer))
+        # Sin FROM no hay plan: ni siquiera se pide EXPLAIN.
+        self.assertFalse(_es_select('SELECT pg_advisory_xact_lock(%s)'))
+        self.assertFalse(_es_select('SELECT pg_current_xact_id()::text::bigint'))
+        # Con FROM pero con efectos: EXPLAIN sin ANALYZE.
+        for sql in (
+            leer + ' FOR UPDATE',
+            leer + ' FOR NO KEY UPDATE',
+            'SELECT pg_try_advisory_lock(id) FROM "recibos_pago"',
+            'SELECT nextval(\'recibos_seq\') FROM "recibos_pago"',
+        ):
+            self.assertTrue(_es_select(sql), sql)
+            self.assertFalse(_admite_analyze(sql), sql)
+
+    def test_bajo_el_umbral_no_registra(self):
+        with override_settings(RECIBOS_CONSULTAS_LENTAS_MS=60_000, RECIBOS_CONSULTAS_LENTAS_ARCHIVO=self.archivo):
+            self.client.get(reverse('recibos:dashboard'))
+            esperar_registros()
+            self.assertEqual(list(leer_registros()), [])
+
+
+# XXIII. PERFILADO BAJO DEMANDA
+
+class PerfiladoTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth.models import User
+
+        crear_recibos(20)
+        cls.personal = User.objects.create_user('soporte', password='clave-segura', is_staff=True)
+        cls.usuario = User.objects.create_user('operador', password='clave-segura')
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(
+            RECIBOS_PERFILES_DIR=directorio.name, RECIBOS_PERFILADO_INTERVALO_MS=0.1, RECIBOS_PERFILADO_ACTIVO=True,
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.directorio = directorio.name
+
+    def test_personal_perfila_y_consulta_capturas(self):
+        self.client.force_login(self.personal)
+        response = self.client.get(reverse('recibos:dashboard'), {'perfilar': '1'})
+        self.assertEqual(response.status_code, 200)
+        captura = response['X-Perfil']
+        self.assertEqual(
+            sorted(os.listdir(self.directorio)), [f'{captura}.collapsed', f'{captura}.json', f'{captura}.prof'],
+        )
+        with open(os.path.join(self.directorio, f'{captura}.collapsed'), encoding='utf-8') as archivo:
+            for linea in archivo:
+                self.assertRegex(linea, r'^\S.* \d+\n$')
+
+        response = self.client.get(reverse('recibos:perfiles'))
+        self.assertContains(response, 'recibos:dashboard')
+        self.assertContains(response, captura)
+        resumen = self.client.get(reverse('recibos:descargar_perfil', args=[captura, 'txt']))
+        self.assertIn('function calls', resumen.content.decode())
+        self.assertEqual(self.client.get(reverse('recibos:descargar_perfil', args=['..', 'prof'])).status_code, 404)
+
+        # Solo muestreo: sin .prof.
+        captura = self.client.get(reverse('recibos:dashboard'), HTTP_X_PERFILAR='muestreo')['X-Perfil']
+        self.assertFalse(os.path.exists(os.path.join(self.directorio, f'{captura}.prof')))
+
+    def test_sin_permiso_no_perfila(self):
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse('recibos:dashboard'), {'perfilar': '1'})
+        self.assertNotIn('X-Perfil', response)
+        self.assertEqual(os.listdir(self.directorio), [])
+        self.assertEqual(self.client.get(reverse('recibos:perfiles')).status_code, 302)
+
+    def test_desactivado_no_perfila_ni_al_personal(self):
+        self.client.force_login(self.personal)
+        with override_settings(RECIBOS_PERFILADO_ACTIVO=False):
+            response = self.client.get(reverse('recibos:dashboard'), {'perfilar': '1'})
+        self.assertNotIn('X-Perfil', response)
+        self.assertEqual(os.listdir(self.directorio), [])
+
+
+# XXIV. PERFIL DE MEMORIA POR ETAPA
+
+class PerfilMemoriaTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def test_etapas_de_importacion_y_reporte(self):
+        import tracemalloc
+        from .importacion import importar_recibos_desde_excel
+        from .reportes import construir_reporte_excel
+
+        # Sin el ajuste no se mide nada.
+        with informe_memoria() as informe:
+            importar_recibos_desde_excel(SimpleUploadedFile('libro.xlsx', libro_excel(3)))
+        self.assertEqual(informe, [])
+        self.assertFalse(tracemalloc.is_tracing())
+
+        self.addCleanup(tracemalloc.stop)
+        with override_settings(RECIBOS_PERFIL_MEMORIA=True), informe_memoria() as informe:
+            exito, _, pks = importar_recibos_desde_excel(SimpleUploadedFile('libro.xlsx', libro_excel(3)))
+            construir_reporte_excel(Recibo.objects.filter(pk__in=pks), {}, io.BytesIO())
+        self.assertTrue(exito)
+
+        etapas = [resultado['etapa'] for resultado in informe]
+        self.assertEqual(etapas, [
+            'importacion.leer_excel', 'importacion.preprocesamiento', 'importacion.insercion_orm', 'importacion',
+            'reporte_excel.materializar_orm', 'reporte_excel.dataframe', 'reporte_excel.xlsxwriter', 'reporte_excel',
+        ])
+        por_etapa = {resultado['etapa']: resultado for resultado in informe}
+        self.assertGreater(por_etapa['importacion']['pico_mb'], 0)
+        self.assertGreaterEqual(por_etapa['importacion']['pico_mb'], por_etapa['importacion']['neto_mb'])
+        self.assertTrue(por_etapa['importacion.leer_excel']['sitios'])
+        self.assertGreaterEqual(metricas_memoria()['reporte_excel.xlsxwriter']['ejecuciones'], 1)
@@ -2,6 +2,7 @@ from django.urls import path
 from . import views 
 from apps.recibos.views import PaginaBaseView
 from .views import generar_zip_recibos
+from . import views_async
 app_name = 'recibos'
 
 urlpatterns = [
@@ -17,4 +18,16 @@ urlpatterns = [
     path('anulados/', views.recibos_anulados, name='recibos_anulados'), 
     path('', PaginaBaseView.as_view(), name='base'),
     path('generar-zip-recibos/', views.generar_zip_recibos, name='generar_zip_recibos'),
+    path('generar-pdf-lote/', views.generar_pdf_lote, name='generar_pdf_lote'),
+    path('exportar-datos/', views.exportar_datos, name='exportar_datos'),
+    path('cambios/', views.cambios_recibos, name='cambios_recibos'),
+    path('operaciones-pesadas/', views.estado_operaciones_pesadas, name='estado_operaciones_pesadas'),
+    path('contribuyentes/consulta/', views.consultar_contribuyentes, name='consultar_contribuyentes'),
+    path('contribuyentes/<str:rif>/', views.historial_contribuyente, name='historial_contribuyente'),
+    path('perfiles/', views.perfiles, name='perfiles'),
+    path('perfiles/<str:captura>.<str:formato>', views.descargar_perfil, name='descargar_perfil'),
+
+    # Descargas asíncronas (servir con ASGI: uvicorn sistema_gestion.asgi:application)
+    path('async/generar-zip-recibos/', views_async.generar_zip_recibos_async, name='generar_zip_recibos_async'),
+    path('async/generar-reporte/', views_async.generar_reporte_async, name='generar_reporte_async'),
 ]
\ No newline at end of file
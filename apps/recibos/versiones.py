@@ -0,0 +1,44 @@
+import time
+
+from django.db import router
+from django.db.models import F
+
+# Versión global de los datos de recibos. Cambia con cada alta, modificación,
+# anulación o eliminación y sirve como parte de las claves de caché que dependen
+# del conjunto completo de recibos (panel de filtros, reportes, etc.).
+# Se guarda en la base (VersionDatos) y no en la caché:
+#   - El incremento es un UPDATE atómico: dos workers que incrementan a la vez
+#     no pierden ninguno (cache.incr de FileBasedCache es leer y escribir).
+#   - Se lee de la misma base que los datos de la petición (réplica o primaria).
+#     La réplica aplica los cambios en orden, así que la versión leída nunca es
+#     más nueva que los datos con que luego se arma la caché.
+
+
+def _version_inicial():
+    # Basada en el reloj (microsegundos): si la fila se pierde y se vuelve a
+    # crear, la nueva versión nunca coincide con una anterior.
+    return time.time_ns() // 1000
+
+
+def obtener_version_datos(using=None):
+    """Retorna la versión actual de los datos de recibos, leída de la base de lectura del contexto."""
+    from .models import VersionDatos
+
+    using = using or router.db_for_read(VersionDatos)
+    version = VersionDatos.objects.using(using).filter(pk=1).values_list('valor', flat=True).first()
+    if version is None:
+        # La fila la crea la migración; si falta, se crea en la primaria.
+        fila, _ = VersionDatos.objects.using(router.db_for_write(VersionDatos)).get_or_create(
+            pk=1, defaults={'valor': _version_inicial()},
+        )
+        version = fila.valor
+    return version
+
+
+def incrementar_version_datos(using=None):
+    """Invalida todas las cachés que dependen de la versión global de los datos."""
+    from .models import VersionDatos
+
+    using = using or router.db_for_write(VersionDatos)
+    if not VersionDatos.objects.using(using).filter(pk=1).update(valor=F('valor') + 1):
+        VersionDatos.objects.using(using).get_or_create(pk=1, defaults={'valor': _version_inicial()})
@@ -1,18 +1,31 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.db.models import Q, Sum 
 from django.contrib import messages
-from .models import Recibo
+from django.contrib.admin.views.decorators import staff_member_required
+from .models import Contribuyente, Recibo
+import hmac
 import io
 import os
 import logging
 from django.urls import reverse
-from .utils import importar_recibos_desde_excel, generar_reporte_excel, generar_pdf_reporte, generar_pdf_recibo_unitario
 from django.conf import settings
 from django.views.generic import ListView, TemplateView
 from .forms import ReciboForm
 from .constants import CATEGORY_CHOICES, ESTADO_CHOICES_MAP
-import zipfile
+from .versiones import obtener_version_datos
+from .busqueda import construir_filtro_busqueda, construir_filtro_contribuyentes, normalizar_rif
+from .filtros import campo_de_busqueda, parsear_fecha
+from .archivo_frio import recibo_archivado
+from .utils import nombre_archivo_recibo
+from .admision import OperacionRechazada, estado_admision, metricas_admision, operacion_pesada
+from .memoria import metricas_memoria
+from .perfilado import listar_perfiles, resumen_perfil, ruta_perfil
+from .purga import PurgaEnCurso, estado_purga, iniciar_purga_en_segundo_plano
+from .artefactos import (
+    CONTENT_TYPE_PDF, calcular_etag, depurar_artefactos, escribir_artefacto,
+    recuperar_artefacto, respuesta_condicional, ruta_artefacto, servir_artefacto,
+)
 from django.utils import timezone
 from datetime import datetime
 import pytz 
@@ -44,54 +57,83 @@ class PaginaBaseView(TemplateView):
 
 def generar_pdf_recibo(request, pk):
     """
-    Genera el PDF de un recibo específico y retorna el HttpResponse para
-    la descarga directa. Delega la lógica de generación a utils.py.
+    Entrega el PDF de un recibo específico para su descarga directa. El archivo
+    se genera (en pdf_recibos.py) solo la primera vez para cada versión del
+    recibo; luego se sirve desde el almacenamiento de artefactos, o con un 304
+    si el navegador ya lo tiene. Los recibos de años archivados se leen del
+    archivo frío.
     """
     try:
-        recibo = get_object_or_404(Recibo, pk=pk)
-        return generar_pdf_recibo_unitario(recibo)
+        try:
+            recibo = Recibo.objects.get(pk=pk)
+        except Recibo.DoesNotExist:
+            recibo = recibo_archivado(pk)
+            if recibo is None:
+                raise Http404(f"No existe el recibo {pk}.")
+
+        # La versión del recibo la determina su fecha de modificación.
+        etag = calcular_etag('recibo', recibo.pk, recibo.fecha_modificacion.isoformat())
+        ultima_modificacion = recibo.fecha_modificacion.timestamp()
+
+        no_modificado = respuesta_condicional(request, etag, ultima_modificacion)
+        if no_modificado:
+            return no_modificado
+
+        ruta = ruta_artefacto('recibos', etag, 'pdf')
+        if not recuperar_artefacto(ruta):
+            from .pdf_recibos import construir_pdf_recibo
+            escribir_artefacto(ruta, lambda destino: construir_pdf_recibo(recibo, destino))
+            # Cada modificación deja huérfano el PDF de la versión anterior: el total se limita (LRU).
+            depurar_artefactos('recibos', settings.RECIBOS_CACHE_RECIBOS_MAX_MB * 1024 * 1024, conservar=ruta)
+
+        return servir_artefacto(
+            ruta, nombre_archivo_recibo(recibo), CONTENT_TYPE_PDF, etag, ultima_modificacion
+        )
     except Exception as e:
         logger.error(f"Error al generar PDF unitario para PK={pk}: {e}")
         messages.error(request, f"Error al generar el PDF: {e}")
         return redirect(reverse('recibos:dashboard')) 
 
-def generar_zip_recibos(request):
+def _recibos_desde_pks(request, formato):
     """
-    Toma una lista de PKs, genera el PDF de cada uno y los comprime en un ZIP.
+    Obtiene los recibos indicados en `?pks=1,2,3`. Retorna (recibos, None) o
+    (None, redirect) si falta el parámetro o tiene un formato inválido.
     """
     pks_str = request.GET.get('pks')
     if not pks_str:
-        messages.error(request, "No se encontraron IDs de recibos para generar el ZIP.")
-        return redirect(reverse('recibos:dashboard'))
+        messages.error(request, f"No se encontraron IDs de recibos para generar el {formato}.")
+        return None, redirect(reverse('recibos:dashboard'))
 
     try:
         pks = [int(pk) for pk in pks_str.split(',') if pk] 
-        recibos = Recibo.objects.filter(pk__in=pks)
+        recibos = Recibo.objects.filter(pk__in=pks).order_by('numero_recibo')
     except ValueError:
         messages.error(request, "Error en el formato de los IDs de recibos.")
-        return redirect(reverse('recibos:dashboard'))
+        return None, redirect(reverse('recibos:dashboard'))
     except Exception as e:
         messages.error(request, f"Error al buscar recibos: {e}")
-        return redirect(reverse('recibos:dashboard'))
+        return None, redirect(reverse('recibos:dashboard'))
 
-    zip_buffer = io.BytesIO()
-    count_success = 0
+    return recibos, None
 
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for recibo in recibos:
-            try:
-                pdf_response = generar_pdf_recibo_unitario(recibo)
-                pdf_buffer_value = pdf_response.content
 
-                num_recibo_zfill = str(recibo.numero_recibo).zfill(4) if recibo.numero_recibo else '0000'
-                filename = f"Recibo_N_{num_recibo_zfill}_{recibo.rif_cedula_identidad}.pdf"
+def generar_zip_recibos(request):
+    """
+    Toma una lista de PKs, genera el PDF de cada uno y los comprime en un ZIP.
+    """
+    from .pdf_recibos import construir_zip_recibos
 
-                zipf.writestr(filename, pdf_buffer_value)
-                count_success += 1
-            except Exception as e:
-                logger.error(f"Error al generar el PDF para el recibo PK={recibo.pk}: {e}")
+    recibos, error = _recibos_desde_pks(request, 'ZIP')
+    if error:
+        return error
 
-    zip_buffer.seek(0)
+    zip_buffer = io.BytesIO()
+    try:
+        with operacion_pesada('zip'):
+            count_success = construir_zip_recibos(recibos, zip_buffer)
+    except OperacionRechazada as e:
+        messages.warning(request, str(e))
+        return redirect(reverse('recibos:dashboard'))
 
     if count_success == 0:
         messages.error(request, "No se pudo generar ningún PDF. El ZIP está vacío.")
@@ -109,6 +151,41 @@ def generar_zip_recibos(request):
     return response
 
 
+def generar_pdf_lote(request):
+    """
+    Alternativa al ZIP: toma una lista de PKs y genera UN SOLO PDF con una página
+    (o más) por recibo. Es más liviano de generar y de descargar, y se imprime de
+    una sola vez.
+    """
+    from .pdf_recibos import construir_pdf_lote
+
+    recibos, error = _recibos_desde_pks(request, 'PDF')
+    if error:
+        return error
+
+    try:
+        with operacion_pesada('pdf_lote'):
+            contenido_pdf, count_success = construir_pdf_lote(recibos)
+    except OperacionRechazada as e:
+        messages.warning(request, str(e))
+        return redirect(reverse('recibos:dashboard'))
+
+    if count_success == 0:
+        messages.error(request, "No se pudo generar ningún recibo. El PDF está vacío.")
+        return redirect(reverse('recibos:dashboard'))
+
+    filename_pdf = f"Recibos_Masivos_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    response = HttpResponse(
+        contenido_pdf,
+        content_type='application/pdf'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename_pdf}"'
+
+    messages.success(request, f"Se generó el PDF con {count_success} recibo(s) exitosamente.")
+
+    return response
+
+
 # DASHBOARD Y FILTROS (ReciboListView)
 
 class ReciboListView(ListView):
@@ -141,32 +218,66 @@ class ReciboListView(ListView):
             return redirect(reverse('recibos:dashboard'))
 
         elif action == 'clear_logs':
-            Recibo.objects.all().delete()
-            messages.success(request, "Todos los recibos han sido eliminados de la base de datos.")
+            # Respaldo + borrado (purga.py) en el comando purgar_recibos, lanzado
+            # como proceso aparte: la petición no espera y el worker no lo ejecuta.
+            try:
+                iniciar_purga_en_segundo_plano()
+                messages.success(
+                    request,
+                    "Limpieza iniciada: se respalda la tabla y luego se eliminan todos los recibos. "
+                    "El avance se muestra en el panel."
+                )
+            except PurgaEnCurso as e:
+                messages.warning(request, str(e))
             return redirect(reverse('recibos:dashboard'))
 
         elif action == 'upload':
-            archivo_excel = request.FILES.get('archivo_recibo')
-            if not archivo_excel:
+            archivos = request.FILES.getlist('archivo_recibo')
+            if not archivos:
                 messages.error(request, "Por favor, sube un archivo Excel.")
             else:
                 try:
-                    success, message, recibos_pks = importar_recibos_desde_excel(archivo_excel)
+                    # Importación perezosa: pandas solo se carga cuando hay una carga real.
+                    from .importacion import (
+                        ErrorImportacion, importar_recibos_desde_excel, importar_varios_archivos, mensaje_resumen,
+                    )
+
+                    with operacion_pesada('importacion'):
+                        if len(archivos) == 1 and not archivos[0].name.lower().endswith('.zip'):
+                            success, message, recibos_pks = importar_recibos_desde_excel(archivos[0])
+                        else:
+                            # Varios libros (o un ZIP): se leen en paralelo y se informa un resumen.
+                            try:
+                                resumen = importar_varios_archivos(
+                                    archivos, atomico=not request.POST.get('por_archivo'),
+                                )
+                                success, message, recibos_pks = resumen['exito'], mensaje_resumen(resumen), resumen['pks']
+                            except ErrorImportacion as e:
+                                success, message, recibos_pks = False, str(e), None
+                            if not success and recibos_pks:
+                                # Importación por archivo con errores parciales: se avisa y se siguen entregando los PDF.
+                                messages.warning(request, message)
+                                success, message = True, None
 
                     if success and recibos_pks and isinstance(recibos_pks, list):
-                        messages.success(request, message)
+                        if message:
+                            messages.success(request, message)
 
                         if len(recibos_pks) == 1:
                             return redirect(reverse('recibos:generar_pdf_recibo', kwargs={'pk': recibos_pks[0]}))
                         else:
                             pks_str = ','.join(map(str, recibos_pks))
-                            return redirect(reverse('recibos:generar_zip_recibos') + f'?pks={pks_str}')
+                            vista_lote = 'recibos:generar_pdf_lote' if settings.RECIBOS_SALIDA_LOTE == 'pdf' else 'recibos:generar_zip_recibos'
+                            return redirect(reverse(vista_lote) + f'?pks={pks_str}')
 
                     elif success:
                         messages.warning(request, message)
                     else:
                         messages.error(request, f"Fallo en la carga de Excel: {message}")
 
+                except OperacionRechazada as e:
+                    messages.warning(request, str(e))
+
                 except Exception as e:
                     logger.error(f"Error al ejecutar la importación de Excel: {e}")
                     messages.error(request, f"Error interno en la lógica de importación: {e}")
@@ -182,48 +293,23 @@ class ReciboListView(ListView):
         search_query = self.request.GET.get('q')
         search_field = self.request.GET.get('field', '')
 
-        # --- Lógica de Búsqueda 
-        if search_query:
-            query_normalizado = search_query.strip()
-            
-            if search_field and search_field != 'todos' and hasattr(Recibo, search_field):
-                try:
-                    filtro = {f'{search_field}__icontains': query_normalizado}
-                    queryset = queryset.filter(**filtro)
-                except Exception as e:
-                    logger.error(f"Error al filtrar por campo dinámico {search_field}: {e}")
-            else:
-                q_objects = (
-                    Q(nombre__icontains=query_normalizado) |
-                    Q(rif_cedula_identidad__icontains=query_normalizado) |
-                    Q(numero_recibo__iexact=query_normalizado) |
-                    Q(numero_transferencia__icontains=query_normalizado) |
-                    Q(estado__icontains=query_normalizado)
-                )
-
-                try:
-                    recibo_id = int(query_normalizado)
-                    q_objects |= Q(pk=recibo_id)
-                except ValueError:
-                    pass
-
-                queryset = queryset.filter(q_objects)
+        # --- Lógica de Búsqueda: igualdad o prefijo sobre columnas indexadas (busqueda.py)
+        filtro_busqueda = construir_filtro_busqueda(search_query, campo_de_busqueda(search_field))
+        if filtro_busqueda is not None:
+            queryset = queryset.filter(filtro_busqueda)
 
         # --- Filtros de Estado y Fechas  ---
         estado_seleccionado = self.request.GET.get('estado')
         if estado_seleccionado and estado_seleccionado != "":
             queryset = queryset.filter(estado__iexact=estado_seleccionado)
 
-        fecha_inicio_str = self.request.GET.get('fecha_inicio')
-        fecha_fin_str = self.request.GET.get('fecha_fin')
-
-        try:
-            if fecha_inicio_str:
-                queryset = queryset.filter(fecha__gte=fecha_inicio_str)
-            if fecha_fin_str:
-                queryset = queryset.filter(fecha__lte=fecha_fin_str)
-        except ValueError:
-            pass
+        # Como objetos date para que PostgreSQL descarte las particiones de otros años.
+        fecha_inicio = parsear_fecha(self.request.GET.get('fecha_inicio'))
+        fecha_fin = parsear_fecha(self.request.GET.get('fecha_fin'))
+        if fecha_inicio:
+            queryset = queryset.filter(fecha__gte=fecha_inicio)
+        if fecha_fin:
+            queryset = queryset.filter(fecha__lte=fecha_fin)
 
         # --- Filtros de Categoría  ---
         category_filters = Q()
@@ -264,6 +350,22 @@ class ReciboListView(ListView):
             del request_get_copy['field']
 
         context['request_get'] = request_get_copy
+        # Query string de paginación calculada una sola vez (antes se parseaba en
+        # cada enlace con el filtro remove_query_param).
+        querystring = request_get_copy.urlencode()
+        context['paginacion_qs'] = f'&{querystring}' if querystring else ''
+
+        # Claves de la caché de fragmentos del template
+        context['cache_fragmentos_segundos'] = getattr(settings, 'RECIBOS_CACHE_FRAGMENTOS_SEGUNDOS', 3600)
+        context['data_version'] = obtener_version_datos()
+        # Fuera de los fragmentos cacheados: refleja la ocupación en cada render.
+        context['estado_operaciones'] = estado_admision()
+        purga = estado_purga()
+        context['purga'] = purga if purga.get('estado') in ('en_curso', 'interrumpida') else None
+        context['firma_filtros'] = '|'.join(
+            f'{clave}={self.request.GET.get(clave, "")}'
+            for clave in ['estado', 'fecha_inicio', 'fecha_fin'] + [codigo for codigo, _ in CATEGORY_CHOICES]
+        )
 
         return context
 
@@ -272,115 +374,148 @@ class ReciboListView(ListView):
 
 def generar_reporte_view(request):
     """
-    Función que maneja los filtros de reporte y delega la generación del archivo
-    (Excel o PDF) a las funciones auxiliares en utils.py.
+    Función que maneja los filtros de reporte y entrega el archivo (Excel o PDF).
+    Los filtros viven en filtros.py, la generación en reportes.py y los reportes
+    ya generados se reutilizan desde la caché de cache_reportes.py.
     """
-    
-    # 1. Preparación del Queryset base
-    recibos_queryset = Recibo.objects.filter(anulado=False).order_by('-fecha', '-numero_recibo')
+    from .cache_reportes import FORMATOS_REPORTE, etag_reporte, obtener_reporte
+
+    action = request.GET.get('action')
 
-    filters = Q()
-    filtros_aplicados = {}
-    periodo_str = 'Todas las fechas'
+    if action not in FORMATOS_REPORTE:
+        messages.error(request, "Acción de reporte no válida.")
+        return redirect(reverse('recibos:dashboard') + '?' + request.GET.urlencode())
 
-    # 2. Aplicación de Filtros 
-    estado_seleccionado = request.GET.get('estado')
-    if estado_seleccionado and estado_seleccionado != "":
-        filters &= Q(estado__iexact=estado_seleccionado)
-    filtros_aplicados['estado'] = estado_seleccionado if estado_seleccionado else 'Todos los estados'
+    # El contenido del reporte depende solo de los filtros y de la versión de
+    # los datos: si el navegador ya tiene esta versión se responde 304 sin consultar.
+    etag = etag_reporte(action, request.GET)
+    no_modificado = respuesta_condicional(request, etag)
+    if no_modificado:
+        return no_modificado
 
-    fecha_inicio_str = request.GET.get('fecha_inicio')
-    fecha_fin_str = request.GET.get('fecha_fin')
+    nombre_formato = 'Excel' if action == 'excel' else 'PDF'
+    extension, content_type, prefijo = FORMATOS_REPORTE[action]
 
-    # Manejo de período
     try:
-        if fecha_inicio_str:
-            filters &= Q(fecha__gte=fecha_inicio_str)
-            periodo_str = f"Desde: {fecha_inicio_str}"
-
-        if fecha_fin_str:
-            filters &= Q(fecha__lte=fecha_fin_str)
-            if periodo_str == 'Todas las fechas':
-                periodo_str = f"Hasta: {fecha_fin_str}"
-            else:
-                periodo_str = f"{periodo_str} Hasta: {fecha_fin_str}"
-    except ValueError:
-        pass
-    filtros_aplicados['periodo'] = periodo_str.replace('Todas las fechas Hasta: None', 'Todas las fechas')
-
-    # Manejo de categorías
-    selected_categories_names = []
-    category_filters = Q()
-    for codigo, nombre_display in CATEGORY_CHOICES:
-        if request.GET.get(codigo) == 'on':
-            category_filters |= Q(**{f'{codigo}': True})
-            selected_categories_names.append(nombre_display)
-
-    if category_filters:
-        filters &= category_filters
-        filtros_aplicados['categorias'] = ', '.join(selected_categories_names)
-    else:
-        filtros_aplicados['categorias'] = 'Todas las categorías'
+        ruta, recibos_filtrados = obtener_reporte(action, request.GET, etag)
 
-    # Manejo de búsqueda
-    search_query = request.GET.get('q')
-    search_field = request.GET.get('field', '')
-
-    if search_query:
-        query_normalizado = search_query.strip()
-        q_search = Q()
-        if search_field and search_field != 'todos' and hasattr(Recibo, search_field):
-            q_search = Q(**{f'{search_field}__icontains': query_normalizado})
+        if recibos_filtrados is None:
+            messages.success(request, f"El reporte {nombre_formato} se obtuvo de la caché (los datos no han cambiado).")
         else:
-            q_search = (
-                Q(nombre__icontains=query_normalizado) |
-                Q(rif_cedula_identidad__icontains=query_normalizado) |
-                Q(numero_recibo__iexact=query_normalizado) |
-                Q(numero_transferencia__icontains=query_normalizado) |
-                Q(estado__icontains=query_normalizado)
-            )
-            try:
-                recibo_id = int(query_normalizado)
-                q_search |= Q(pk=recibo_id)
-            except ValueError:
-                pass
-        filters &= q_search
-        filtros_aplicados['busqueda'] = search_query
-    else:
-        filtros_aplicados['busqueda'] = 'Ninguna'
+            messages.success(request, f"El reporte {nombre_formato} ({len(recibos_filtrados)} recibos) ha sido generado con éxito.")
 
-    # Filtrar el queryset final
-    recibos_filtrados = recibos_queryset.filter(filters)
-    
-    # Manejo de la acción (excel o pdf)
-    action = request.GET.get('action')
-    
-    if action == 'excel':
-        try:
-            response = generar_reporte_excel(request.GET, recibos_filtrados, filtros_aplicados)
-            messages.success(request, f"El reporte Excel ({len(recibos_filtrados)} recibos) ha sido generado con éxito.")
-            return response
-            
-        except Exception as e:
-            logger.error(f"Error al generar el reporte Excel: {e}")
-            messages.error(request, f"Error al generar el reporte Excel. Detalles: {e}")
-            return redirect(reverse('recibos:dashboard') + '?' + request.GET.urlencode())
+        filename = f"{prefijo}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+        return servir_artefacto(ruta, filename, content_type, etag, os.path.getmtime(ruta))
 
-    elif action == 'pdf':
-        try:
-            response = generar_pdf_reporte(recibos_filtrados, filtros_aplicados)
-            messages.success(request, f"El reporte PDF ({len(recibos_filtrados)} recibos) ha sido generado con éxito.")
-            return response
-            
-        except Exception as e:
-            logger.error(f"Error al generar el reporte PDF: {e}")
-            messages.error(request, f"Error al generar el reporte PDF. Consulte la consola del servidor: {e}")
-            return redirect(reverse('recibos:dashboard') + '?' + request.GET.urlencode())
-            
-    else:
-        messages.error(request, "Acción de reporte no válida.")
+    except OperacionRechazada as e:
+        messages.warning(request, str(e))
         return redirect(reverse('recibos:dashboard') + '?' + request.GET.urlencode())
 
+    except Exception as e:
+        logger.error(f"Error al generar el reporte {nombre_formato}: {e}")
+        messages.error(request, f"Error al generar el reporte {nombre_formato}. Detalles: {e}")
+        return redirect(reverse('recibos:dashboard') + '?' + request.GET.urlencode())
+
+
+# EXPORTACIÓN PARA ANÁLISIS (CSV / Parquet)
+
+def exportar_datos(request):
+    """
+    Exporta los recibos filtrados (mismos filtros del dashboard y los reportes)
+    en un formato tipado para análisis: CSV transmitido fila a fila o Parquet
+    generado por lotes y reutilizado desde el almacenamiento de artefactos.
+    """
+    from django.http import StreamingHttpResponse
+    from django.utils.http import quote_etag
+    from .analitica import FORMATOS_ANALITICA, etag_analitica, filas_csv, obtener_parquet, verificar_fuentes
+    from .archivo_frio import ArchivoFrioError
+
+    formato = request.GET.get('formato')
+    volver = reverse('recibos:dashboard') + '?' + request.GET.urlencode()
+
+    if formato not in FORMATOS_ANALITICA:
+        messages.error(request, "Formato de exportación no válido.")
+        return redirect(volver)
+
+    etag = etag_analitica(formato, request.GET)
+    no_modificado = respuesta_condicional(request, etag)
+    if no_modificado:
+        return no_modificado
+
+    extension, content_type = FORMATOS_ANALITICA[formato]
+    filename = f"recibos_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+    try:
+        verificar_fuentes(request.GET)
+
+        if formato == 'csv':
+            response = StreamingHttpResponse(filas_csv(request.GET), content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            response['ETag'] = quote_etag(etag)
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+
+        ruta = obtener_parquet(request.GET, etag)
+        return servir_artefacto(ruta, filename, content_type, etag, os.path.getmtime(ruta))
+
+    except OperacionRechazada as e:
+        messages.warning(request, str(e))
+        return redirect(volver)
+
+    except ArchivoFrioError as e:
+        messages.error(request, str(e))
+        return redirect(volver)
+
+    except Exception as e:
+        logger.error(f"Error al exportar los datos ({formato}): {e}")
+        messages.error(request, f"Error al exportar los datos. Detalles: {e}")
+        return redirect(volver)
+
+
+def _acceso_fuente_cambios(request):
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    token = settings.RECIBOS_CAMBIOS_TOKEN
+    esquema, _, recibido = request.headers.get('Authorization', '').partition(' ')
+    return bool(token) and esquema == 'Bearer' and hmac.compare_digest(recibido.encode(), token.encode())
+
+
+def cambios_recibos(request):
+    """
+    Fuente de cambios para sincronizar sistemas externos: recibos creados,
+    modificados o anulados después del cursor ?desde= (NDJSON, ver cambios.py).
+    Requiere personal autenticado o el token RECIBOS_CAMBIOS_TOKEN.
+    """
+    from django.http import StreamingHttpResponse
+    from .cambios import LIMITE_CAMBIOS, lineas_cambios, parsear_cursor
+
+    if not _acceso_fuente_cambios(request):
+        return JsonResponse({'error': "Acceso restringido al personal autorizado."}, status=403)
+    try:
+        cursor = parsear_cursor(request.GET.get('desde'))
+        limite = min(int(request.GET.get('limite') or LIMITE_CAMBIOS), LIMITE_CAMBIOS)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    response = StreamingHttpResponse(lineas_cambios(cursor, max(1, limite)), content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def estado_operaciones_pesadas(request):
+    """
+    Estado del cupo de operaciones pesadas (importaciones, ZIP, reportes) y sus
+    métricas acumuladas: admitidas, rechazadas, encoladas y tiempo de espera.
+    Incluye el avance de la última limpieza de recibos y, si se activó
+    RECIBOS_PERFIL_MEMORIA, la memoria de cada etapa de importación y reportes.
+    """
+    return JsonResponse({
+        'estado': estado_admision(),
+        'metricas': metricas_admision(),
+        'purga': estado_purga(),
+        'memoria': metricas_memoria(),
+    })
+
 
 # VISTAS DE MODIFICACIÓN Y ANULACIÓN
 
@@ -438,18 +573,13 @@ def recibos_anulados(request):
     Muestra la lista de recibos anulados con funcionalidad de búsqueda y paginación.
     """
 
-    # 1. Obtener todos los recibos anulados
+    # 1. Obtener todos los recibos anulados (índice parcial recibos_anulados_fecha_idx)
     queryset = Recibo.objects.filter(anulado=True).order_by('-fecha_anulacion')
 
-    # 2. Manejar la Búsqueda (Filtro por q)
-    query = request.GET.get('q')
-    if query:
-        query_normalizado = query.strip()
-        queryset = queryset.filter(
-            Q(numero_recibo__icontains=query_normalizado) |
-            Q(nombre__icontains=query_normalizado) |
-            Q(rif_cedula_identidad__icontains=query_normalizado)
-        )
+    # 2. Manejar la Búsqueda (Filtro por q): búsqueda tipada resuelta con índices
+    filtro_busqueda = construir_filtro_busqueda(request.GET.get('q'))
+    if filtro_busqueda is not None:
+        queryset = queryset.filter(filtro_busqueda)
 
     # 3. Manejar la Paginación (20 ítems por página)
     paginator = Paginator(queryset, 20)
@@ -460,4 +590,87 @@ def recibos_anulados(request):
         'titulo': 'Recibos Anulados',
         'recibos': recibos_page,
     }
-    return render(request, 'recibos/recibos_anulados.html', context)
\ No newline at end of file
+    return render(request, 'recibos/recibos_anulados.html', context)
+
+
+# CONTRIBUYENTES: HISTORIAL Y CONSULTA
+# Los totales se leen del contribuyente (se mantienen al guardar recibos); el
+# historial usa el índice (contribuyente, -fecha, -numero_recibo).
+
+# Máximo de contribuyentes por respuesta de la consulta JSON.
+LIMITE_CONSULTA_CONTRIBUYENTES = 20
+
+
+def _datos_contribuyente(contribuyente):
+    return {
+        'rif': contribuyente.rif,
+        'rif_normalizado': contribuyente.rif_normalizado,
+        'nombre': contribuyente.nombre,
+        'direccion': contribuyente.direccion,
+        'cantidad_recibos': contribuyente.cantidad_recibos,
+        'total_pagado': str(contribuyente.total_pagado),
+        'ultimo_pago': contribuyente.ultimo_pago.isoformat() if contribuyente.ultimo_pago else None,
+        'historial': reverse('recibos:historial_contribuyente', args=[contribuyente.rif_normalizado]),
+    }
+
+
+def historial_contribuyente(request, rif):
+    """
+    Recibos de un contribuyente (vigentes y anulados, más recientes primero)
+    con sus totales, paginados.
+    """
+    contribuyente = get_object_or_404(Contribuyente, rif_normalizado=normalizar_rif(rif))
+    queryset = contribuyente.recibos.order_by('-fecha', '-numero_recibo')
+
+    paginator = Paginator(queryset, 20)
+    recibos_page = paginator.get_page(request.GET.get('page'))
+
+    context = {
+        'titulo': f'Historial de {contribuyente.nombre}',
+        'contribuyente': contribuyente,
+        'recibos': recibos_page,
+    }
+    return render(request, 'recibos/historial_contribuyente.html', context)
+
+
+def consultar_contribuyentes(request):
+    """
+    Consulta JSON de contribuyentes por cédula, RIF o nombre (?q=), con sus
+    totales. Ejemplo: /contribuyentes/consulta/?q=V-12345678
+    """
+    filtro = construir_filtro_contribuyentes(request.GET.get('q'))
+    if filtro is None:
+        return JsonResponse({'error': "Indique la cédula, el RIF o el nombre a consultar (?q=)."}, status=400)
+
+    contribuyentes = Contribuyente.objects.filter(filtro).order_by('nombre_normalizado')[:LIMITE_CONSULTA_CONTRIBUYENTES]
+    return JsonResponse({'resultados': [_datos_contribuyente(c) for c in contribuyentes]})
+
+
+# --- PERFILES DE PETICIONES (perfilado.py) ---
+
+@staff_member_required
+def perfiles(request):
+    """Capturas de perfilado guardadas (ver PerfiladoMiddleware), la más reciente primero."""
+    context = {
+        'titulo': 'Perfiles de Peticiones',
+        'perfiles': listar_perfiles(),
+        'perfilado_activo': settings.RECIBOS_PERFILADO_ACTIVO,
+    }
+    return render(request, 'recibos/perfiles.html', context)
+
+
+@staff_member_required
+def descargar_perfil(request, captura, formato):
+    """Descarga el .prof o el .collapsed de una captura, o el resumen de pstats (formato 'txt')."""
+    from django.http import FileResponse
+
+    if formato == 'txt':
+        resumen = resumen_perfil(captura, request.GET.get('orden', 'cumulative'))
+        if resumen is None:
+            raise Http404("Perfil no encontrado.")
+        return HttpResponse(resumen, content_type='text/plain; charset=utf-8')
+
+    ruta = ruta_perfil(captura, formato)
+    if ruta is None or not os.path.exists(ruta):
+        raise Http404("Perfil no encontrado.")
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=os.path.basename(ruta))
@@ -0,0 +1,87 @@
+import logging
+import os
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils import timezone
+
+from .admision import OperacionRechazada
+from .artefactos import CONTENT_TYPE_ZIP, calcular_etag, respuesta_condicional, servir_artefacto
+from .cache_reportes import FORMATOS_REPORTE, etag_reporte
+from .exportaciones import ejecutar_exportacion, exportar_reporte, exportar_zip
+from .versiones import obtener_version_datos
+
+logger = logging.getLogger(__name__)
+
+# VISTAS ASÍNCRONAS DE DESCARGA (ASGI)
+# Equivalentes a generar_zip_recibos y generar_reporte_view para servir con
+# uvicorn/daphne: el render corre en el ejecutor acotado de exportaciones.py y
+# el archivo se transmite por bloques con un iterador asíncrono, por lo que
+# una exportación lenta no retiene un worker mientras se genera o se descarga.
+
+
+async def generar_zip_recibos_async(request):
+    """Versión asíncrona de generar_zip_recibos (`?pks=1,2,3`)."""
+    try:
+        pks = [int(pk) for pk in request.GET.get('pks', '').split(',') if pk]
+    except ValueError:
+        messages.error(request, "Error en el formato de los IDs de recibos.")
+        return redirect(reverse('recibos:dashboard'))
+
+    if not pks:
+        messages.error(request, "No se encontraron IDs de recibos para generar el ZIP.")
+        return redirect(reverse('recibos:dashboard'))
+
+    try:
+        version_datos = await sync_to_async(obtener_version_datos)()
+        ruta, cantidad = await ejecutar_exportacion(exportar_zip, pks, version_datos)
+    except OperacionRechazada as e:
+        messages.warning(request, str(e))
+        return redirect(reverse('recibos:dashboard'))
+    except Exception as e:
+        logger.error(f"Error al generar el ZIP asíncrono: {e}")
+        messages.error(request, f"Error al generar el ZIP: {e}")
+        return redirect(reverse('recibos:dashboard'))
+
+    if cantidad == 0:
+        messages.error(request, "No se pudo generar ningún PDF. El ZIP está vacío.")
+        return redirect(reverse('recibos:dashboard'))
+
+    filename_zip = f"Recibos_Masivos_{timezone.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    etag = calcular_etag('zip', version_datos, sorted(pks))
+    return servir_artefacto(ruta, filename_zip, CONTENT_TYPE_ZIP, etag, asincrono=True)
+
+
+async def generar_reporte_async(request):
+    """Versión asíncrona de generar_reporte_view (mismos parámetros y caché)."""
+    action = request.GET.get('action')
+
+    if action not in FORMATOS_REPORTE:
+        messages.error(request, "Acción de reporte no válida.")
+        return redirect(reverse('recibos:dashboard') + '?' + request.GET.urlencode())
+
+    params = request.GET.dict()
+    etag = await sync_to_async(etag_reporte)(action, params)
+    no_modificado = respuesta_condicional(request, etag)
+    if no_modificado:
+        return no_modificado
+
+    nombre_formato = 'Excel' if action == 'excel' else 'PDF'
+    extension, content_type, prefijo = FORMATOS_REPORTE[action]
+
+    try:
+        ruta, _ = await ejecutar_exportacion(exportar_reporte, action, params, etag)
+    except OperacionRechazada as e:
+        messages.warning(request, str(e))
+        return redirect(reverse('recibos:dashboard') + '?' + request.GET.urlencode())
+    except Exception as e:
+        logger.error(f"Error al generar el reporte {nombre_formato} asíncrono: {e}")
+        messages.error(request, f"Error al generar el reporte {nombre_formato}. Detalles: {e}")
+        return redirect(reverse('recibos:dashboard') + '?' + request.GET.urlencode())
+
+    filename = f"{prefijo}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return servir_artefacto(
+        ruta, filename, content_type, etag, os.path.getmtime(ruta), asincrono=True
+    )
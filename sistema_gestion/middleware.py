@@ -0,0 +1,42 @@
+from django.conf import settings
+
+from .routers import forzar_primaria, replica_configurada, restaurar_enrutamiento
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReplicaPinningMiddleware:
+    """
+    Decide por petición si las lecturas pueden ir a la réplica.
+
+    - Las peticiones que escriben (POST, etc.) leen siempre de la primaria.
+    - Tras una escritura se envía una cookie de corta duración; mientras exista,
+      las lecturas del mismo navegador siguen en la primaria. Así la redirección
+      posterior a una importación (PDF/ZIP de los recibos recién creados) o a una
+      modificación no depende del retraso de replicación.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cookie_name = getattr(settings, 'REPLICA_PIN_COOKIE', 'recibos_primaria')
+        self.pin_segundos = getattr(settings, 'REPLICA_PIN_SEGUNDOS', 15)
+
+    def __call__(self, request):
+        if not replica_configurada():
+            return self.get_response(request)
+
+        escribe = request.method not in METODOS_SEGUROS
+        token = forzar_primaria(escribe or self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            restaurar_enrutamiento(token)
+
+        if escribe:
+            response.set_cookie(
+                self.cookie_name, '1',
+                max_age=self.pin_segundos,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
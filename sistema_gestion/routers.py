@@ -0,0 +1,71 @@
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Indica si el flujo actual (petición, hilo o tarea async) debe leer de la primaria.
+_forzar_primaria = contextvars.ContextVar('forzar_primaria', default=False)
+
+PRIMARY_DB_ALIAS = 'default'
+
+
+def replica_configurada():
+    """Retorna True si existe un alias de réplica definido en DATABASES."""
+    alias = getattr(settings, 'REPLICA_DB_ALIAS', 'replica')
+    return alias in settings.DATABASES
+
+
+def leyendo_de_primaria():
+    return _forzar_primaria.get()
+
+
+def forzar_primaria(valor=True):
+    """
+    Fija el enrutamiento de lecturas para el contexto actual.
+    Retorna el token necesario para restaurar el valor anterior.
+    """
+    return _forzar_primaria.set(valor)
+
+
+def restaurar_enrutamiento(token):
+    _forzar_primaria.reset(token)
+
+
+@contextmanager
+def usar_primaria():
+    """
+    Context manager para flujos de lectura-después-de-escritura fuera de una
+    petición (comandos de gestión, tareas en segundo plano).
+    """
+    token = forzar_primaria(True)
+    try:
+        yield
+    finally:
+        restaurar_enrutamiento(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Enruta las lecturas a la réplica (si existe) y todas las escrituras a la primaria.
+
+    Las lecturas vuelven a la primaria cuando el contexto lo exige: peticiones
+    POST y las peticiones que siguen a una escritura reciente (ver
+    ReplicaPinningMiddleware), de modo que una importación o modificación se vea
+    de inmediato aunque la réplica tenga retraso.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_configurada() or leyendo_de_primaria():
+            return PRIMARY_DB_ALIAS
+        return getattr(settings, 'REPLICA_DB_ALIAS', 'replica')
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaria y réplica contienen los mismos datos.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica se alimenta por replicación física, nunca por migraciones.
+        return db == PRIMARY_DB_ALIAS
@@ -27,10 +27,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'sistema_gestion.middleware.ReplicaPinningMiddleware',
+    'apps.recibos.consultas_lentas.OrigenConsultasMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.recibos.perfilado.PerfiladoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -70,6 +73,50 @@ DATABASES = {
     }
 }
 
+# -----------------------------------------------------------------
+# CONEXIONES PERSISTENTES Y RÉPLICA DE LECTURA
+# -----------------------------------------------------------------
+
+# Segundos que una conexión se reutiliza entre peticiones (0 = cerrar siempre).
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+# Verifica la conexión reutilizada antes de usarla (evita errores tras reinicios de PostgreSQL).
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+
+# Réplica opcional: solo se activa si se define DB_REPLICA_HOST en el entorno.
+REPLICA_DB_ALIAS = 'replica'
+DATABASE_ROUTERS = ['sistema_gestion.routers.PrimaryReplicaRouter']
+
+# Tras una escritura, las lecturas del mismo usuario van a la primaria durante estos segundos.
+REPLICA_PIN_SEGUNDOS = int(os.getenv('REPLICA_PIN_SEGUNDOS', '15'))
+REPLICA_PIN_COOKIE = 'recibos_primaria'
+
+
+def configurar_conexiones(databases):
+    """
+    Aplica conexiones persistentes a la primaria y agrega el alias 'replica'
+    cuando las variables DB_REPLICA_* están definidas. Los valores no
+    definidos para la réplica se heredan de la primaria.
+    """
+    primaria = databases['default']
+    primaria.setdefault('CONN_MAX_AGE', DB_CONN_MAX_AGE)
+    primaria.setdefault('CONN_HEALTH_CHECKS', DB_CONN_HEALTH_CHECKS)
+
+    if os.getenv('DB_REPLICA_HOST'):
+        databases[REPLICA_DB_ALIAS] = {
+            **primaria,
+            'NAME': os.getenv('DB_REPLICA_NAME', primaria.get('NAME')),
+            'USER': os.getenv('DB_REPLICA_USER', primaria.get('USER')),
+            'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', primaria.get('PASSWORD')),
+            'HOST': os.getenv('DB_REPLICA_HOST'),
+            'PORT': os.getenv('DB_REPLICA_PORT', primaria.get('PORT')),
+            # En tests, la réplica apunta a la misma base de datos de prueba.
+            'TEST': {'MIRROR': 'default'},
+        }
+    return databases
+
+
+configurar_conexiones(DATABASES)
+
 # -----------------------------------------------------------------
 # 3. AUTENTICACIÓN Y LOCALIZACIÓN
 # -----------------------------------------------------------------
@@ -110,4 +157,116 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# -----------------------------------------------------------------
+# 5. RENDIMIENTO DE LA APP RECIBOS
+# -----------------------------------------------------------------
+
+# Precarga pandas/reportlab en el proceso maestro (usar junto a `gunicorn --preload`).
+RECIBOS_PRECARGAR_MOTORES = os.getenv('RECIBOS_PRECARGAR_MOTORES', 'False') == 'True'
+
+# Caché por defecto (memoria local del proceso). En producción se usa una caché
+# compartida entre workers para que la versión de datos sea la misma en todos.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'recibos-default',
+    }
+}
+
+# Segundos que se conservan los fragmentos cacheados del dashboard (filas y panel de filtros).
+RECIBOS_CACHE_FRAGMENTOS_SEGUNDOS = int(os.getenv('RECIBOS_CACHE_FRAGMENTOS_SEGUNDOS', '3600'))
+
+# Formato de descarga tras una carga masiva: 'zip' (un PDF por recibo) o 'pdf'
+# (un único PDF multipágina, más liviano de generar y de transferir).
+RECIBOS_SALIDA_LOTE = os.getenv('RECIBOS_SALIDA_LOTE', 'zip')
+
+# Procesos que leen en paralelo los libros de una carga múltiple (ZIP o varios
+# archivos). Con 1 se leen uno tras otro en el proceso de la petición.
+RECIBOS_IMPORTACION_PROCESOS = int(os.getenv('RECIBOS_IMPORTACION_PROCESOS', str(min(4, os.cpu_count() or 1))))
+
+# Límites de un ZIP de carga, comprobados antes de descomprimir: tamaño total
+# descomprimido de los libros (MB) y cantidad de libros.
+RECIBOS_IMPORTACION_ZIP_MAX_MB = int(os.getenv('RECIBOS_IMPORTACION_ZIP_MAX_MB', '200'))
+RECIBOS_IMPORTACION_ZIP_MAX_LIBROS = int(os.getenv('RECIBOS_IMPORTACION_ZIP_MAX_LIBROS', '200'))
+
+# Almacenamiento de artefactos generados (PDF de recibos y reportes) y forma de
+# entregarlos: 'django' (FileResponse), 'x-accel' (nginx, X-Accel-Redirect) o
+# 'x-sendfile' (Apache mod_xsendfile / lighttpd).
+RECIBOS_ARTEFACTOS_DIR = os.getenv('RECIBOS_ARTEFACTOS_DIR', str(BASE_DIR / 'artefactos'))
+RECIBOS_ENTREGA_ARTEFACTOS = os.getenv('RECIBOS_ENTREGA_ARTEFACTOS', 'django')
+# Location `internal` de nginx que apunta a RECIBOS_ARTEFACTOS_DIR (solo 'x-accel').
+RECIBOS_ARTEFACTOS_URL_INTERNA = os.getenv('RECIBOS_ARTEFACTOS_URL_INTERNA', '/artefactos-internos/')
+# Tamaño máximo (MB) de la caché de reportes generados; al superarlo se expulsan
+# los reportes usados hace más tiempo (LRU).
+RECIBOS_CACHE_REPORTES_MAX_MB = int(os.getenv('RECIBOS_CACHE_REPORTES_MAX_MB', '500'))
+# Ídem para los PDF de recibos individuales (uno por versión de cada recibo).
+RECIBOS_CACHE_RECIBOS_MAX_MB = int(os.getenv('RECIBOS_CACHE_RECIBOS_MAX_MB', '200'))
+
+# Exportaciones de las vistas asíncronas (ASGI): cupo de renders simultáneos por
+# proceso y tipo de ejecutor, 'hilos' o 'procesos'.
+RECIBOS_EXPORTACIONES_MAX = int(os.getenv('RECIBOS_EXPORTACIONES_MAX', '2'))
+RECIBOS_EXPORTACIONES_EJECUTOR = os.getenv('RECIBOS_EXPORTACIONES_EJECUTOR', 'hilos')
+
+# Control de admisión de operaciones pesadas (importación, ZIP/PDF masivos,
+# reportes): cupo simultáneo entre todos los procesos, segundos máximos de
+# espera en cola y cantidad máxima de peticiones esperando antes de rechazar.
+# Cada petición en cola ocupa un worker: la cola se acota además para que cupo
+# + cola quede por debajo de RECIBOS_WORKERS_WEB (workers síncronos de
+# gunicorn, que también lee WEB_CONCURRENCY).
+RECIBOS_PESADAS_MAX = int(os.getenv('RECIBOS_PESADAS_MAX', '2'))
+RECIBOS_PESADAS_ESPERA_SEGUNDOS = float(os.getenv('RECIBOS_PESADAS_ESPERA_SEGUNDOS', '5'))
+RECIBOS_PESADAS_COLA_MAX = int(os.getenv('RECIBOS_PESADAS_COLA_MAX', '1'))
+RECIBOS_WORKERS_WEB = int(os.getenv('WEB_CONCURRENCY', '4'))
+
+# Particionado por año de `recibos_pago` (solo PostgreSQL). Se aplica en la
+# migración 0005 o después con `manage.py crear_particiones --convertir`.
+# RECIBOS_PARTICIONES_ANTICIPADAS: años futuros con partición ya creada.
+RECIBOS_PARTICIONAR_POR_ANIO = os.getenv('RECIBOS_PARTICIONAR_POR_ANIO', 'False') == 'True'
+RECIBOS_PARTICIONES_ANTICIPADAS = int(os.getenv('RECIBOS_PARTICIONES_ANTICIPADAS', '2'))
+
+# Archivo frío de años cerrados: un Parquet por año (requiere pyarrow) y su
+# compresión ('zstd', 'snappy', 'gzip'...). Ver `manage.py archivar_recibos`.
+RECIBOS_ARCHIVO_DIR = os.getenv('RECIBOS_ARCHIVO_DIR', str(BASE_DIR / 'archivo'))
+RECIBOS_ARCHIVO_COMPRESION = os.getenv('RECIBOS_ARCHIVO_COMPRESION', 'zstd')
+
+# Respaldos (CSV gzip) que se generan antes de vaciar la tabla de recibos.
+RECIBOS_RESPALDOS_DIR = os.getenv('RECIBOS_RESPALDOS_DIR', str(BASE_DIR / 'respaldos'))
+
+# Tabla de tasas BCV: segundos que cada proceso reutiliza su copia en memoria
+# (fecha -> tasa) antes de volver a leerla de la base.
+RECIBOS_TASAS_CACHE_SEGUNDOS = int(os.getenv('RECIBOS_TASAS_CACHE_SEGUNDOS', '300'))
+
+# Fuente de cambios (/recibos/cambios/): además del personal autenticado
+# (is_staff), acepta este token en "Authorization: Bearer <token>". Vacío:
+# solo personal autenticado.
+RECIBOS_CAMBIOS_TOKEN = os.getenv('RECIBOS_CAMBIOS_TOKEN', '')
+
+# Registro de consultas lentas: las que tardan al menos RECIBOS_CONSULTAS_LENTAS_MS
+# (0 desactiva) se guardan con su plan en un archivo JSON rotativo.
+# RECIBOS_CONSULTAS_LENTAS_EXPLAIN: 'plan' (EXPLAIN sin ejecutar, por defecto),
+# 'analyze' (EXPLAIN ANALYZE, BUFFERS: vuelve a ejecutar el SELECT en la
+# primaria; activarlo solo mientras se diagnostica) o '' (sin plan).
+RECIBOS_CONSULTAS_LENTAS_MS = float(os.getenv('RECIBOS_CONSULTAS_LENTAS_MS', '500'))
+RECIBOS_CONSULTAS_LENTAS_EXPLAIN = os.getenv('RECIBOS_CONSULTAS_LENTAS_EXPLAIN', 'plan')
+RECIBOS_CONSULTAS_LENTAS_ARCHIVO = os.getenv(
+    'RECIBOS_CONSULTAS_LENTAS_ARCHIVO', str(BASE_DIR / 'logs' / 'consultas_lentas.jsonl')
+)
+RECIBOS_CONSULTAS_LENTAS_MAX_MB = int(os.getenv('RECIBOS_CONSULTAS_LENTAS_MAX_MB', '20'))
+RECIBOS_CONSULTAS_LENTAS_RESPALDOS = int(os.getenv('RECIBOS_CONSULTAS_LENTAS_RESPALDOS', '5'))
+
+# Perfilado bajo demanda: el personal (is_staff) puede perfilar una petición con
+# la cabecera "X-Perfilar: 1" o ?perfilar=1 (?perfilar=muestreo: solo muestreo
+# de pilas). Se conservan las últimas RECIBOS_PERFILES_MAX capturas.
+# Desactivado por defecto: se habilita por entorno (RECIBOS_PERFILADO_ACTIVO=True).
+RECIBOS_PERFILADO_ACTIVO = os.getenv('RECIBOS_PERFILADO_ACTIVO', 'False') == 'True'
+RECIBOS_PERFILADO_INTERVALO_MS = float(os.getenv('RECIBOS_PERFILADO_INTERVALO_MS', '5'))
+RECIBOS_PERFILES_DIR = os.getenv('RECIBOS_PERFILES_DIR', str(BASE_DIR / 'perfiles'))
+RECIBOS_PERFILES_MAX = int(os.getenv('RECIBOS_PERFILES_MAX', '50'))
+
+# Perfil de memoria por etapa (tracemalloc) de la importación y los reportes.
+# Solo para diagnóstico: tracemalloc hace mucho más lentas las etapas medidas.
+RECIBOS_PERFIL_MEMORIA = os.getenv('RECIBOS_PERFIL_MEMORIA', 'False') == 'True'
+# Marcos de pila guardados por asignación (1 = solo la línea que asigna).
+RECIBOS_PERFIL_MEMORIA_MARCOS = int(os.getenv('RECIBOS_PERFIL_MEMORIA_MARCOS', '1'))
@@ -28,4 +28,10 @@ DATABASES = {
         'HOST': os.environ.get('DB_HOST', 'localhost'), # Si no está en .env, usa 'localhost'
         'PORT': os.environ.get('DB_PORT', '5432'),     # Si no está en .env, usa '5432'
     }
-}
\ No newline at end of file
+}
+
+# Conexiones persistentes y réplica opcional (DB_REPLICA_HOST, DB_REPLICA_PORT...)
+configurar_conexiones(DATABASES)
+
+# Perfilado bajo demanda habilitado en desarrollo (en producción, por entorno).
+RECIBOS_PERFILADO_ACTIVO = os.getenv('RECIBOS_PERFILADO_ACTIVO', 'True') == 'True'
@@ -15,7 +15,36 @@ DATABASES = {
     }
 }
 
+# Conexiones persistentes y réplica opcional (DB_REPLICA_HOST, DB_REPLICA_PORT...)
+configurar_conexiones(DATABASES)
+
+# Caché compartida entre workers de gunicorn (fragmentos del dashboard). La versión
+# de los datos que forma sus claves se guarda en la base (VersionDatos), no aquí.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('RECIBOS_CACHE_DIR', str(BASE_DIR / 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
+# Loader de templates con caché: cada template se compila una sola vez por proceso.
+# (Se construye una copia para no alterar la configuración importada desde base.py)
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
 # Seguridad adicional
 SECURE_SSL_REDIRECT = True
 SESSION_COOKIE_SECURE = True
-CSRF_COOKIE_SECURE = True
\ No newline at end of file
+CSRF_COOKIE_SECURE = True
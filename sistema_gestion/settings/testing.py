@@ -0,0 +1,49 @@
+import tempfile
+
+from .base import *
+
+# -----------------------------------------------------------------
+# Configuración para ejecutar la suite de tests localmente
+# Uso: python manage.py test --settings=sistema_gestion.settings.testing
+# -----------------------------------------------------------------
+
+DEBUG = False
+
+# SQLite: la suite no necesita un servidor PostgreSQL. La réplica es un
+# "stand-in" que apunta a la misma base de datos para ejercitar el enrutador.
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('TEST_DB_NAME', str(BASE_DIR / 'test_db.sqlite3')),
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('TEST_DB_NAME', str(BASE_DIR / 'test_db.sqlite3')),
+        'TEST': {'MIRROR': 'default'},
+        # Ambas conexiones comparten la caché de SQLite en memoria; la réplica debe
+        # ver los datos aún no confirmados de la transacción de cada test.
+        'OPTIONS': {'init_command': 'PRAGMA read_uncommitted = 1;'},
+    },
+}
+
+# Hash rápido para que la creación de usuarios no domine el tiempo de los tests
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Multiplicador aplicado a los presupuestos de tiempo de los tests de rendimiento.
+# Subirlo en máquinas lentas o en CI compartido (ej: RECIBOS_TEST_FACTOR_TIEMPO=3).
+RECIBOS_TEST_FACTOR_TIEMPO = float(os.getenv('RECIBOS_TEST_FACTOR_TIEMPO', '1'))
+
+# Los artefactos generados por la suite no se mezclan con los del proyecto.
+RECIBOS_ARTEFACTOS_DIR = os.getenv(
+    'RECIBOS_ARTEFACTOS_DIR', os.path.join(tempfile.gettempdir(), 'recibos-artefactos-test')
+)
+RECIBOS_ARCHIVO_DIR = os.getenv(
+    'RECIBOS_ARCHIVO_DIR', os.path.join(tempfile.gettempdir(), 'recibos-archivo-test')
+)
+RECIBOS_RESPALDOS_DIR = os.getenv(
+    'RECIBOS_RESPALDOS_DIR', os.path.join(tempfile.gettempdir(), 'recibos-respaldos-test')
+)
+RECIBOS_CONSULTAS_LENTAS_ARCHIVO = os.getenv(
+    'RECIBOS_CONSULTAS_LENTAS_ARCHIVO', os.path.join(tempfile.gettempdir(), 'recibos-consultas-lentas-test.jsonl')
+)
+RECIBOS_PERFILES_DIR = os.getenv('RECIBOS_PERFILES_DIR', os.path.join(tempfile.gettempdir(), 'recibos-perfiles-test'))
@@ -2,4 +2,14 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sistema_gestion.settings.development')
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Con `gunicorn --preload` este módulo se importa en el proceso maestro antes del
+# fork: precargar aquí pandas/reportlab deja las páginas compartidas copy-on-write
+# entre todos los workers. Sin --preload cada worker pagaría la carga al arrancar,
+# por eso solo se activa explícitamente (RECIBOS_PRECARGAR_MOTORES=True).
+from django.conf import settings
+
+if getattr(settings, 'RECIBOS_PRECARGAR_MOTORES', False):
+    from apps.recibos.utils import precargar_motores
+    precargar_motores()